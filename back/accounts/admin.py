@@ -30,8 +30,7 @@ class CustomUserAdmin(UserAdmin):
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal info'), {'fields': ('first_name', 'last_name', 'phone_number', 'date_of_birth')}),
-        (_('Verification'), {'fields': ('is_verified', 'verification_code', 'verification_code_created', 
-                                       'reset_code', 'reset_code_created')}),
+        (_('Verification'), {'fields': ('is_verified',)}),
         (_('Security'), {'fields': ('last_login_ip', 'failed_login_attempts', 'last_failed_login', 
                                    'account_locked_until')}),
         (_('Permissions'), {'fields': ('is_active', 'is_staff', 'is_superuser',
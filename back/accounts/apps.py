@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import ensure_user_search_index
+
+        post_migrate.connect(ensure_user_search_index, sender=self)
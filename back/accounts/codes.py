@@ -0,0 +1,126 @@
+"""
+One-time codes (email verification and password reset)
+
+Codes live in the cache, never on the user row: only an HMAC of the code is
+stored, under a key that expires after OTP_CODE_TTL seconds. Issuing,
+checking and consuming a code are cache operations, so none of them writes
+to the database.
+
+- Each email may be issued OTP_ISSUE_LIMIT codes per purpose within
+  OTP_ISSUE_WINDOW seconds; more raise CodeRateLimited with the seconds left
+  in the window.
+- A code accepts OTP_MAX_ATTEMPTS checks; after that it is discarded and a
+  new one must be requested.
+- A correct code is consumed by the check that accepts it.
+
+Counters use cache.add()/incr(), which are atomic on the shared cache
+backends (Redis, Memcached) and per process on the local-memory cache.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare, salted_hmac
+import hashlib
+import math
+import secrets
+import time
+
+VERIFICATION = 'verification'
+PASSWORD_RESET = 'reset'
+PURPOSES = (VERIFICATION, PASSWORD_RESET)
+
+# Results of OneTimeCodes.check()
+VALID = 'valid'
+INVALID = 'invalid'
+MISSING = 'missing'
+TOO_MANY_ATTEMPTS = 'too_many_attempts'
+
+
+class CodeRateLimited(Exception):
+    """
+    Too many codes were issued for this email recently
+    """
+
+    def __init__(self, wait):
+        super().__init__(f"Too many codes requested; try again in {wait} seconds")
+        self.wait = wait
+
+
+def _key(kind, purpose, email):
+    # Hash the address: cache keys must not carry personal data or unsafe characters
+    digest = hashlib.sha256(email.lower().strip().encode()).hexdigest()
+    return f'otp:{kind}:{purpose}:{digest}'
+
+
+def _digest(purpose, email, code):
+    return salted_hmac(f'otp:{purpose}', f'{email.lower().strip()}:{code}').hexdigest()
+
+
+def _increment(key, timeout):
+    """
+    Atomically increment a counter created with the given timeout
+    """
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.add(key, 1, timeout)
+        return 1
+
+
+class OneTimeCodes:
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'OTP_CODE_TTL', 900)
+
+    def issue(self, purpose, email):
+        """
+        Create a new code for the email, replacing any outstanding code for
+        the same purpose, and return it
+
+        Raises CodeRateLimited when the email's issuance limit is reached.
+        """
+        window = getattr(settings, 'OTP_ISSUE_WINDOW', 3600)
+        now = time.time()
+        # The window opens with the first code and expires with the counter
+        cache.add(_key('window', purpose, email), now, window)
+        if _increment(_key('issued', purpose, email), window) > getattr(settings, 'OTP_ISSUE_LIMIT', 5):
+            opened = cache.get(_key('window', purpose, email), now)
+            raise CodeRateLimited(max(1, math.ceil(opened + window - now)))
+
+        code = f'{secrets.randbelow(10 ** 6):06d}'
+        # A code for the other purpose (e.g. a pending verification) stays valid
+        cache.delete_many([_key('code', purpose, email), _key('attempts', purpose, email)])
+        cache.set(_key('code', purpose, email), _digest(purpose, email, code), self.ttl)
+        return code
+
+    def check(self, purpose, email, code):
+        """
+        Check a code, consuming it when it is correct
+
+        Returns VALID, INVALID, MISSING (none issued, or expired) or
+        TOO_MANY_ATTEMPTS (the code has been discarded).
+        """
+        code_key = _key('code', purpose, email)
+        stored = cache.get(code_key)
+        if stored is None:
+            return MISSING
+
+        if _increment(_key('attempts', purpose, email), self.ttl) > getattr(settings, 'OTP_MAX_ATTEMPTS', 5):
+            cache.delete(code_key)
+            return TOO_MANY_ATTEMPTS
+        if not constant_time_compare(stored, _digest(purpose, email, code)):
+            return INVALID
+
+        # Only the request that removes the code may use it
+        if not cache.delete(code_key):
+            return MISSING
+        cache.delete(_key('attempts', purpose, email))
+        return VALID
+
+    def discard(self, purpose, email):
+        cache.delete_many([_key('code', purpose, email), _key('attempts', purpose, email)])
+
+
+one_time_codes = OneTimeCodes()
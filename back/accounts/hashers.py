@@ -0,0 +1,152 @@
+"""
+Password hashing policy
+
+The hashers take their cost parameters from settings (PASSWORD_ARGON2_*,
+PASSWORD_PBKDF2_ITERATIONS), so retuning only needs a settings change: hashes
+stored with other parameters report must_update and are rehashed the next
+time their user logs in. `manage.py tune_password_hasher` measures candidate
+parameters on the current machine.
+
+Hashing is slow by design, so the views hash on a dedicated pool of
+PASSWORD_HASHING_WORKERS threads (hashlib and argon2-cffi release the GIL
+while hashing). At most PASSWORD_HASHING_QUEUE_SIZE jobs wait for a worker;
+past that PasswordHashingBusy is raised and the request is answered at once,
+so a login storm cannot tie up every request worker and CPU.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, make_password, verify_password
+)
+from django.db import connection
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """
+    Argon2id with the costs configured in settings
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_TIME_COST', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'PASSWORD_ARGON2_MEMORY_COST', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', Argon2PasswordHasher.parallelism)
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the iteration count configured in settings
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_PBKDF2_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class PasswordHashingBusy(Exception):
+    """
+    The hashing pool's queue is full (or the wait for a worker timed out)
+    """
+
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', 2)
+            _slots = threading.BoundedSemaphore(workers + getattr(settings, 'PASSWORD_HASHING_QUEUE_SIZE', 32))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+    return _executor, _slots
+
+
+def _submit(func, *args):
+    """
+    Run func(*args) on the hashing pool, or raise PasswordHashingBusy when
+    the queue is full
+    """
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+
+    def run():
+        try:
+            return func(*args)
+        finally:
+            slots.release()
+
+    return executor.submit(run)
+
+
+def _run(func, *args):
+    try:
+        return _submit(func, *args).result(timeout=getattr(settings, 'PASSWORD_HASHING_TIMEOUT', 10))
+    except FutureTimeoutError as e:
+        raise PasswordHashingBusy() from e
+
+
+def hash_password(password):
+    """
+    Hash a password with the preferred hasher on the hashing pool
+    """
+    return _run(make_password, password)
+
+
+def set_user_password(user, password):
+    """
+    user.set_password() with the hashing done on the hashing pool
+    """
+    user.password = hash_password(password)
+    # Picked up by save() to notify the password validators
+    user._password = password
+
+
+def check_user_password(user, password, rehash=True):
+    """
+    user.check_password() with the hashing done on the hashing pool
+
+    A correct password stored with outdated parameters (or hasher) is
+    rehashed in the background unless `rehash` is False; the request does
+    not wait for it.
+    """
+    is_correct, must_update = _run(verify_password, password, user.password)
+    if is_correct and must_update and rehash:
+        schedule_rehash(user, password)
+    return is_correct
+
+
+def _rehash(user_model, user_pk, password, old_encoded):
+    try:
+        # Only replace the hash that was verified: the password may have
+        # been changed in the meantime
+        user_model.objects.filter(pk=user_pk, password=old_encoded).update(password=make_password(password))
+    except Exception as e:
+        logger.error(f"Error rehashing password of user {user_pk}: {str(e)}")
+    finally:
+        connection.close()
+
+
+def schedule_rehash(user, password):
+    """
+    Queue a rehash of the user's password with the preferred hasher
+
+    Skipped when the hashing pool is busy; the next login retries.
+    """
+    try:
+        _submit(_rehash, type(user), user.pk, password, user.password)
+    except PasswordHashingBusy:
+        logger.info(f"Hashing pool busy, not rehashing the password of user {user.pk}")
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from accounts.revocation import purge_expired_tokens
+from back.schedule import ScheduledCommand
+
+
+class Command(ScheduledCommand):
+    help = "Delete expired outstanding and blacklisted refresh tokens in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'TOKEN_PURGE_BATCH_SIZE', 1000),
+            help="Tokens deleted per transaction",
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches, to leave room for other writers",
+        )
+        parser.add_argument(
+            '--schedule',
+            nargs='?',
+            const=getattr(settings, 'TOKEN_PURGE_SCHEDULE', '30 3 * * *'),
+            help="Keep running and purge on this cron schedule (default: TOKEN_PURGE_SCHEDULE)",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        self.batch_size = options['batch_size']
+        self.pause = options['pause']
+
+        if not options['schedule']:
+            self.run()
+            return
+
+        self.run_on_schedule(options['schedule'], "Token purge")
+
+    def run(self):
+        deleted = purge_expired_tokens(batch_size=self.batch_size, pause=self.pause)
+        self.stdout.write(f"{timezone.localtime().isoformat()} deleted {deleted} expired tokens")
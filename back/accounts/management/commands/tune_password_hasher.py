@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+import importlib.util
+import os
+import time
+
+from accounts.hashers import TunedArgon2PasswordHasher, TunedPBKDF2PasswordHasher
+from projects.benchmarking import measure_callable
+
+PASSWORD = 'correct horse battery staple'
+ARGON2_TIME_COSTS = (1, 2, 3, 4)
+ARGON2_MEMORY_COSTS = (19456, 47104, 65536, 102400, 262144)  # KiB
+PBKDF2_BASE_ITERATIONS = 100000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password hashing cost on this machine and suggest the strongest "
+        "hasher parameters that hash within the target time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hasher', choices=('argon2', 'pbkdf2'),
+                            help="Hasher to tune (default: argon2 when argon2-cffi is installed)")
+        parser.add_argument('--target-ms', type=float, default=250, help="Time budget of one hash")
+        parser.add_argument('--iterations', type=int, default=5, help="Timed hashes per candidate")
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'PASSWORD_HASHING_WORKERS', 2),
+                            help="Hashing threads for the throughput measurement")
+
+    def handle(self, *args, **options):
+        hasher = options['hasher'] or ('argon2' if importlib.util.find_spec('argon2') else 'pbkdf2')
+        if hasher == 'argon2' and importlib.util.find_spec('argon2') is None:
+            raise CommandError("argon2-cffi is not installed")
+
+        self.stdout.write(f"{os.cpu_count()} CPUs, target {options['target_ms']:.0f}ms per hash")
+        if hasher == 'argon2':
+            overrides = self.tune_argon2(options)
+        else:
+            overrides = self.tune_pbkdf2(options)
+        if overrides is None:
+            raise CommandError("No candidate hashes within the target; raise --target-ms")
+
+        with override_settings(**overrides):
+            rate = self.throughput(hasher, options['workers'])
+        self.stdout.write(f"Throughput with {options['workers']} hashing threads: {rate:.1f} hashes/s")
+        self.stdout.write(self.style.SUCCESS("Suggested settings:"))
+        for name, value in overrides.items():
+            self.stdout.write(f"{name} = {value}")
+
+    def measure(self, hasher_class, overrides, iterations):
+        with override_settings(**overrides):
+            hasher = hasher_class()
+            salt = hasher.salt()
+            return measure_callable(lambda: hasher.encode(PASSWORD, salt), iterations)['p50_ms']
+
+    def tune_argon2(self, options):
+        parallelism = getattr(settings, 'PASSWORD_ARGON2_PARALLELISM', 8)
+        best = None
+        for memory_cost in ARGON2_MEMORY_COSTS:
+            for time_cost in ARGON2_TIME_COSTS:
+                overrides = {
+                    'PASSWORD_ARGON2_TIME_COST': time_cost,
+                    'PASSWORD_ARGON2_MEMORY_COST': memory_cost,
+                    'PASSWORD_ARGON2_PARALLELISM': parallelism,
+                }
+                p50 = self.measure(TunedArgon2PasswordHasher, overrides, options['iterations'])
+                within = p50 <= options['target_ms']
+                self.stdout.write(
+                    f"argon2id m={memory_cost:>6}KiB t={time_cost} p={parallelism}  "
+                    f"p50={p50:7.1f}ms{'' if within else '  over target'}"
+                )
+                # Memory hardness first, then passes
+                if within and (best is None or (memory_cost, time_cost) > best[0]):
+                    best = ((memory_cost, time_cost), overrides)
+                if not within:
+                    break
+        return best and best[1]
+
+    def tune_pbkdf2(self, options):
+        base = self.measure(
+            TunedPBKDF2PasswordHasher, {'PASSWORD_PBKDF2_ITERATIONS': PBKDF2_BASE_ITERATIONS}, options['iterations']
+        )
+        # Cost is linear in the iteration count; confirm the extrapolation
+        iterations = int(options['target_ms'] / base * PBKDF2_BASE_ITERATIONS) // 10000 * 10000
+        while iterations > 0:
+            overrides = {'PASSWORD_PBKDF2_ITERATIONS': iterations}
+            p50 = self.measure(TunedPBKDF2PasswordHasher, overrides, options['iterations'])
+            self.stdout.write(f"pbkdf2_sha256 iterations={iterations:>8}  p50={p50:7.1f}ms")
+            if p50 <= options['target_ms']:
+                return overrides
+            iterations = int(iterations * 0.9) // 10000 * 10000
+        return None
+
+    def throughput(self, hasher, workers, hashes=20):
+        hasher_class = TunedArgon2PasswordHasher if hasher == 'argon2' else TunedPBKDF2PasswordHasher
+        instance = hasher_class()
+        salt = instance.salt()
+        with ThreadPoolExecutor(workers) as executor:
+            started = time.perf_counter()
+            list(executor.map(lambda _: instance.encode(PASSWORD, salt), range(hashes)))
+            return hashes / (time.perf_counter() - started)
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install_index(apps, schema_editor):
+    from accounts.search import install_user_search_index
+    install_user_search_index(schema_editor.connection.alias)
+
+
+def drop_index(apps, schema_editor):
+    from accounts.search import drop_user_search_index
+    drop_user_search_index(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_remove_customuser_verification_token_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_index, drop_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:27
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_search_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='customuser',
+            name='reset_code',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='reset_code_created',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='verification_code',
+        ),
+        migrations.RemoveField(
+            model_name='customuser',
+            name='verification_code_created',
+        ),
+    ]
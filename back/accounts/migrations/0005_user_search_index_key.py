@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def reinstall_index(apps, schema_editor):
+    # Replace the SQLite index keyed on accounts_customuser's implicit rowid
+    from accounts.search import drop_user_search_index, install_user_search_index
+    drop_user_search_index(schema_editor.connection.alias)
+    install_user_search_index(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_remove_customuser_one_time_codes'),
+    ]
+
+    operations = [
+        migrations.RunPython(reinstall_index, migrations.RunPython.noop),
+    ]
@@ -6,7 +6,6 @@ from django.conf import settings
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 from django.db import transaction
-import random
 import uuid
 from datetime import timedelta
 
@@ -208,12 +207,6 @@ class CustomUser(AbstractUser):
         help_text=_('Indicates if the user\'s email has been verified.')
     )
     
-    # Authentication fields
-    verification_code = models.CharField(max_length=6, blank=True)
-    verification_code_created = models.DateTimeField(null=True, blank=True)
-    reset_code = models.CharField(max_length=6, blank=True)
-    reset_code_created = models.DateTimeField(null=True, blank=True)
-    
     # Add related_names to fix clashes
     groups = models.ManyToManyField(
         Group,
@@ -256,73 +249,13 @@ class CustomUser(AbstractUser):
         full_name = f"{self.first_name} {self.last_name}"
         return full_name.strip()
 
-    def generate_verification_code(self):
-        """
-        Generate a random 6-digit verification code
-        """
-        code = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        self.verification_code = code
-        self.verification_code_created = timezone.now()
-        
-        # Expire any existing reset code if it exists
-        if self.reset_code and not self.is_reset_code_expired():
-            self.reset_code = ""
-            self.reset_code_created = None
-        
-        self.save(update_fields=['verification_code', 'verification_code_created', 
-                                'reset_code', 'reset_code_created'])
-        return code
-
-    def generate_reset_code(self):
-        """
-        Generate a random 6-digit reset code
-        """
-        code = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-        self.reset_code = code
-        self.reset_code_created = timezone.now()
-        
-        # Clear verification code if exists
-        self.verification_code = ""
-        self.verification_code_created = None
-        
-        self.save(update_fields=['reset_code', 'reset_code_created',
-                                'verification_code', 'verification_code_created'])
-        return code
-
-    def is_verification_code_valid(self):
-        """
-        Check if verification code is valid and not expired
-        """
-        if not self.verification_code_created:
-            return False
-        return timezone.now() - self.verification_code_created <= timedelta(minutes=15)
-
-    def is_reset_code_valid(self):
-        """
-        Check if reset code is valid and not expired
-        """
-        if not self.reset_code_created:
-            return False
-        return timezone.now() - self.reset_code_created <= timedelta(minutes=15)
-
-    def is_reset_code_expired(self):
-        """
-        Check if the reset code has expired
-        """
-        if not self.reset_code_created:
-            return True
-        return timezone.now() - self.reset_code_created > timedelta(minutes=15)
-
     def verify_email(self):
         """
         Verify user's email and set up their profile
         """
         with transaction.atomic():
             self.is_verified = True
-            self.verification_code = ""
-            self.verification_code_created = None
-            self.save(update_fields=['is_verified', 'verification_code', 
-                                   'verification_code_created'])
+            self.save(update_fields=['is_verified'])
             
             # Create or update profile with appropriate role
             default_role = Role.get_default_client_role()
@@ -488,6 +421,13 @@ class UserProfile(models.Model):
         """
         self.last_active = timezone.now()
         self.save(update_fields=['last_active'])
+    
+    async def aupdate_last_active(self):
+        """
+        Async version of update_last_active(), as a single UPDATE
+        """
+        self.last_active = timezone.now()
+        await UserProfile.objects.filter(pk=self.pk).aupdate(last_active=self.last_active)
         
     def is_client(self):
         """
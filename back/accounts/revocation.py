@@ -0,0 +1,160 @@
+"""
+Refresh-token revocation
+
+simplejwt checks every refresh token against the BlacklistedToken table. Each
+process here keeps a bloom filter of the JTIs of blacklisted, unexpired
+tokens instead: a JTI missing from the filter is certainly not blacklisted,
+so only possible hits (blacklisted tokens, plus about
+REVOCATION_BLOOM_ERROR_RATE of the others) reach the database.
+
+Blacklisting bumps a generation counter in the cache; a process that sees a
+new generation adds the rows blacklisted since its last sync before
+answering, so revocations take effect everywhere immediately (across
+processes this needs a shared cache backend). The filter is rebuilt from the
+table every REVOCATION_BLOOM_REBUILD_INTERVAL seconds, which drops expired
+JTIs and resizes it.
+
+purge_expired_tokens() deletes expired outstanding tokens (and their
+blacklist entries) in batches; run it with `manage.py purge_expired_tokens`.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+from datetime import timedelta
+import hashlib
+import math
+import threading
+import time
+
+GENERATION_CACHE_KEY = 'token-revocation-generation'
+
+# Blacklist rows are stamped before their transaction commits; re-read this
+# far back on every sync so none is missed
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter of strings
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationIndex:
+    """
+    Per-process bloom filter over the token blacklist
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._built_at = 0
+        self._synced_at = None
+        self._generation = None
+
+    def _rebuild(self):
+        now = timezone.now()
+        jtis = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=now).values_list('token__jti', flat=True)
+        )
+        # Room for the tokens blacklisted before the next rebuild
+        capacity = max(2 * len(jtis), getattr(settings, 'REVOCATION_BLOOM_MIN_CAPACITY', 10000))
+        bloom = BloomFilter(capacity, getattr(settings, 'REVOCATION_BLOOM_ERROR_RATE', 0.001))
+        for jti in jtis:
+            bloom.add(jti)
+
+        self._filter = bloom
+        self._built_at = time.monotonic()
+        self._synced_at = now
+
+    def _sync(self):
+        now = timezone.now()
+        for jti in BlacklistedToken.objects.filter(
+            blacklisted_at__gte=self._synced_at - SYNC_OVERLAP
+        ).values_list('token__jti', flat=True):
+            self._filter.add(jti)
+        self._synced_at = now
+
+    def refresh(self):
+        """
+        Bring the filter up to date with the blacklist table
+        """
+        generation = cache.get(GENERATION_CACHE_KEY)
+        rebuild_interval = getattr(settings, 'REVOCATION_BLOOM_REBUILD_INTERVAL', 300)
+        with self._lock:
+            if self._filter is None or time.monotonic() - self._built_at > rebuild_interval:
+                self._rebuild()
+            elif generation != self._generation:
+                self._sync()
+            self._generation = generation
+
+    def might_be_revoked(self, jti):
+        self.refresh()
+        return jti in self._filter
+
+    def is_revoked(self, jti):
+        """
+        Whether the token with this JTI is blacklisted; queries the database
+        only when the filter reports a possible hit
+        """
+        return self.might_be_revoked(jti) and BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def add(self, jti):
+        """
+        Record a JTI that has just been blacklisted
+        """
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+        try:
+            cache.incr(GENERATION_CACHE_KEY)
+        except ValueError:
+            cache.set(GENERATION_CACHE_KEY, 1, None)
+
+
+revocations = RevocationIndex()
+
+
+def purge_expired_tokens(batch_size=1000, pause=0):
+    """
+    Delete expired outstanding tokens and their blacklist entries, batch_size
+    tokens per transaction, sleeping `pause` seconds between batches
+
+    Expired tokens fail verification on their own, so their rows only take
+    space. Returns the number of outstanding tokens deleted.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,210 @@
+"""
+Indexed user search
+
+Users are searched by substring over email, first name, last name and phone
+number using a trigram index:
+
+- SQLite: an FTS5 table using the trigram tokenizer, kept in sync with
+  accounts_customuser by triggers and keyed through accounts_user_fts_key;
+- PostgreSQL: a pg_trgm GIN index over the concatenated columns;
+- other backends fall back to icontains lookups.
+
+Trigram indexes need at least 3 characters, so shorter terms are matched as
+name/email prefixes instead.
+"""
+from django.db import connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+import base64
+import json
+import re
+
+USER_TABLE = 'accounts_customuser'
+FTS_TABLE = 'accounts_user_fts'
+FTS_KEY_TABLE = 'accounts_user_fts_key'
+SEARCH_COLUMNS = ('email', 'first_name', 'last_name', 'phone_number')
+MIN_TRIGRAM_LENGTH = 3
+
+DIRECTORY_FIELDS = (
+    'id', 'email', 'first_name', 'last_name', 'phone_number',
+    'is_active', 'is_verified', 'date_joined', 'profile__role__name'
+)
+DIRECTORY_ORDERINGS = ('email', '-email')
+
+PG_SEARCH_EXPRESSION = " || ' ' || ".join(f'"{USER_TABLE}"."{column}"' for column in SEARCH_COLUMNS)
+
+_columns = ', '.join(SEARCH_COLUMNS)
+_new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_assignments = ', '.join(f'{column} = new.{column}' for column in SEARCH_COLUMNS)
+
+# The user table's primary key is a UUID and its implicit rowid can change
+# (VACUUM, table rebuilds), so FTS rows are keyed on an explicit integer from
+# a key table mapping each user id to a stable FTS rowid.
+SQLITE_INDEX_SQL = [
+    f"CREATE TABLE IF NOT EXISTS {FTS_KEY_TABLE} ("
+    f"id INTEGER PRIMARY KEY, user_id CHAR(32) NOT NULL UNIQUE)",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5({_columns}, tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {USER_TABLE} BEGIN "
+    f"INSERT INTO {FTS_KEY_TABLE}(user_id) VALUES (new.id); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES ("
+    f"(SELECT id FROM {FTS_KEY_TABLE} WHERE user_id = new.id), {_new_values}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {USER_TABLE} BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = (SELECT id FROM {FTS_KEY_TABLE} WHERE user_id = old.id); "
+    f"DELETE FROM {FTS_KEY_TABLE} WHERE user_id = old.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON {USER_TABLE} BEGIN "
+    f"UPDATE {FTS_TABLE} SET {_assignments} "
+    f"WHERE rowid = (SELECT id FROM {FTS_KEY_TABLE} WHERE user_id = new.id); END",
+    # Rebuild the contents from scratch
+    f"DELETE FROM {FTS_TABLE}",
+    f"DELETE FROM {FTS_KEY_TABLE}",
+    f"INSERT INTO {FTS_KEY_TABLE}(user_id) SELECT id FROM {USER_TABLE}",
+    f"INSERT INTO {FTS_TABLE}(rowid, {_columns}) SELECT k.id, {', '.join(f'u.{column}' for column in SEARCH_COLUMNS)} "
+    f"FROM {USER_TABLE} u JOIN {FTS_KEY_TABLE} k ON k.user_id = u.id",
+]
+SQLITE_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_KEY_TABLE}",
+]
+
+POSTGRES_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS accounts_user_search_trgm ON {USER_TABLE} "
+    f"USING gin (({PG_SEARCH_EXPRESSION}) gin_trgm_ops)",
+]
+POSTGRES_DROP_SQL = [
+    "DROP INDEX IF EXISTS accounts_user_search_trgm",
+]
+
+
+def install_user_search_index(using='default'):
+    """
+    Create the vendor-specific search index and (re)build its contents
+    """
+    connection = connections[using]
+    statements = {'sqlite': SQLITE_INDEX_SQL, 'postgresql': POSTGRES_INDEX_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_user_search_index(using='default'):
+    connection = connections[using]
+    statements = {'sqlite': SQLITE_DROP_SQL, 'postgresql': POSTGRES_DROP_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def ensure_user_search_index(using='default', **kwargs):
+    """
+    Reinstall the SQLite index if its triggers are missing
+
+    SQLite migrations that alter accounts_customuser rebuild the table, which
+    drops the triggers. Connected to post_migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or USER_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{FTS_TABLE}_%'],
+        )
+        if cursor.fetchone()[0] == 3:
+            return
+    drop_user_search_index(using)
+    install_user_search_index(using)
+
+
+def split_terms(search):
+    """
+    Split a search string into lower-cased terms
+    """
+    return [term for term in re.split(r'\s+', search.strip().lower()) if term]
+
+
+def _fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def filter_users_by_search(queryset, search):
+    """
+    Restrict a CustomUser queryset to users matching every search term
+    """
+    terms = split_terms(search)
+    if not terms:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        for term in terms:
+            queryset = queryset.filter(
+                Q(email__icontains=term) | Q(first_name__icontains=term) |
+                Q(last_name__icontains=term) | Q(phone_number__icontains=term)
+            )
+        return queryset
+
+    indexed = [term for term in terms if len(term) >= MIN_TRIGRAM_LENGTH]
+    if indexed and vendor == 'sqlite':
+        match = ' AND '.join(_fts_phrase(term) for term in indexed)
+        queryset = queryset.filter(RawSQL(
+            f'"{USER_TABLE}"."id" IN (SELECT k.user_id FROM {FTS_TABLE} '
+            f'JOIN {FTS_KEY_TABLE} k ON k.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s)',
+            [match],
+            output_field=BooleanField(),
+        ))
+    elif indexed:
+        for term in indexed:
+            queryset = queryset.filter(RawSQL(
+                f"({PG_SEARCH_EXPRESSION}) ILIKE %s", [_like_pattern(term)], output_field=BooleanField()
+            ))
+
+    for term in terms:
+        if len(term) < MIN_TRIGRAM_LENGTH:
+            queryset = queryset.filter(
+                Q(email__istartswith=term) | Q(first_name__istartswith=term) | Q(last_name__istartswith=term)
+            )
+    return queryset
+
+
+def encode_cursor(email):
+    return base64.urlsafe_b64encode(json.dumps({'email': email}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a directory cursor; raises ValueError if it is malformed
+    """
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))['email']
+    except (TypeError, KeyError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def get_directory_page(queryset, ordering='email', cursor=None, limit=50):
+    """
+    Get one keyset-paginated page of directory rows
+
+    Rows are ordered by the unique, indexed email column and the cursor holds
+    the last email of the previous page, so every page is an index range scan
+    no matter how deep. Returns (rows, next_cursor or None).
+    """
+    if ordering not in DIRECTORY_ORDERINGS:
+        raise ValueError(f"Ordering must be one of: {', '.join(DIRECTORY_ORDERINGS)}")
+
+    if cursor:
+        after = decode_cursor(cursor)
+        lookup = 'email__lt' if ordering.startswith('-') else 'email__gt'
+        queryset = queryset.filter(**{lookup: after})
+
+    rows = list(queryset.order_by(ordering).values(*DIRECTORY_FIELDS)[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1]['email']) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db import transaction
+from .codes import VERIFICATION, PASSWORD_RESET, VALID, MISSING, TOO_MANY_ATTEMPTS, one_time_codes
 from .models import Role, UserProfile, CustomUser
 
 
@@ -80,6 +81,19 @@ class UserDetailSerializer(serializers.ModelSerializer):
             return None
 
 
+class UserDirectorySerializer(serializers.Serializer):
+    """Lean read-only serializer for user directory rows (.values() dictionaries)"""
+    id = serializers.UUIDField(read_only=True)
+    email = serializers.EmailField(read_only=True)
+    first_name = serializers.CharField(read_only=True)
+    last_name = serializers.CharField(read_only=True)
+    phone_number = serializers.CharField(read_only=True)
+    is_active = serializers.BooleanField(read_only=True)
+    is_verified = serializers.BooleanField(read_only=True)
+    date_joined = serializers.DateTimeField(read_only=True)
+    role = serializers.CharField(source='profile__role__name', read_only=True, allow_null=True)
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating a new user with optional profile data"""
     password = serializers.CharField(write_only=True, required=True, style={'input_type': 'password'})
@@ -232,6 +246,19 @@ class ProfileUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
+def check_code(purpose, email, code, field, label):
+    """
+    Validate and consume a one-time code, raising ValidationError on `field`
+    """
+    result = one_time_codes.check(purpose, email, code)
+    if result == MISSING:
+        raise serializers.ValidationError({field: f"{label} has expired or was never requested. Please request a new one."})
+    if result == TOO_MANY_ATTEMPTS:
+        raise serializers.ValidationError({field: f"Too many attempts. Please request a new {label.lower()}."})
+    if result != VALID:
+        raise serializers.ValidationError({field: f"Invalid {label.lower()}."})
+
+
 class VerificationSerializer(serializers.Serializer):
     """Serializer for email verification"""
     verification_code = serializers.CharField(required=True, min_length=6, max_length=6)
@@ -246,14 +273,7 @@ class VerificationSerializer(serializers.Serializer):
             if user.is_verified:
                 raise serializers.ValidationError({"email": "This account is already verified."})
                 
-            if not user.verification_code:
-                raise serializers.ValidationError({"verification_code": "No verification code has been generated."})
-                
-            if not user.is_verification_code_valid():
-                raise serializers.ValidationError({"verification_code": "Verification code has expired. Please request a new one."})
-                
-            if user.verification_code != data['verification_code']:
-                raise serializers.ValidationError({"verification_code": "Invalid verification code."})
+            check_code(VERIFICATION, email, data['verification_code'], 'verification_code', "Verification code")
                 
             data['user'] = user
             return data
@@ -287,18 +307,12 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
             email = data['email'].lower().strip()
             user = CustomUser.objects.get(email=email)
             
-            if not user.reset_code:
-                raise serializers.ValidationError({"reset_code": "No reset code has been generated."})
-                
-            if not user.is_reset_code_valid():
-                raise serializers.ValidationError({"reset_code": "Reset code has expired. Please request a new one."})
-                
-            if user.reset_code != data['reset_code']:
-                raise serializers.ValidationError({"reset_code": "Invalid reset code."})
-                
+            # Before the code check, which consumes a correct code
             if data['new_password'] != data['confirm_password']:
                 raise serializers.ValidationError({"confirm_password": "Passwords do not match."})
                 
+            check_code(PASSWORD_RESET, email, data['reset_code'], 'reset_code', "Reset code")
+                
             data['user'] = user
             return data
             
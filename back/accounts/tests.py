@@ -1,3 +1,275 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from unittest import mock
+import time
 
-# Create your tests here.
+from back.caching import CACHE_ALIASES
+from .codes import (
+    CodeRateLimited, one_time_codes, INVALID, MISSING, PASSWORD_RESET, TOO_MANY_ATTEMPTS, VALID, VERIFICATION
+)
+from .models import CustomUser
+from .search import filter_users_by_search
+from .utils import get_tokens_for_user
+
+
+class AsyncAccountViewTests(TestCase):
+    """The ASGI-native profile and token views keep the DRF request policies"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='async@example.com', password='x', first_name='Async', last_name='User'
+        )
+        cls.user.verify_email()
+
+    def setUp(self):
+        for alias in CACHE_ALIASES:
+            caches[alias].clear()
+        self.access = get_tokens_for_user(self.user)['access']
+        self.auth = {'Authorization': f'Bearer {self.access}'}
+
+    def test_profile_with_bearer_token(self):
+        response = self.client.get(reverse('accounts:get_profile'), headers=self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'async@example.com')
+        self.assertEqual(response.json()['user']['role']['name'], 'client')
+        self.user.profile.refresh_from_db()
+        self.assertIsNotNone(self.user.profile.last_active)
+
+    async def test_profile_under_asgi(self):
+        response = await self.async_client.get(reverse('accounts:get_profile'), headers=self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'async@example.com')
+
+    def test_profile_with_forced_authentication(self):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+        response = client.get(reverse('accounts:get_profile'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['role']['name'], 'client')
+
+    def test_profile_requires_authentication(self):
+        response = self.client.get(reverse('accounts:get_profile'))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+    def test_profile_rejects_invalid_token(self):
+        response = self.client.get(reverse('accounts:get_profile'), headers={'Authorization': 'Bearer nope'})
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_profile_rejects_unsafe_methods(self):
+        response = self.client.post(reverse('accounts:get_profile'), headers=self.auth)
+
+        self.assertEqual(response.status_code, 405)
+
+    def test_profile_is_throttled_under_read_scope(self):
+        rates = {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'read': '2/min'}
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates}):
+            statuses = [
+                self.client.get(reverse('accounts:get_profile'), headers=self.auth).status_code
+                for _ in range(2)
+            ]
+            response = self.client.get(reverse('accounts:get_profile'), headers=self.auth)
+
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(response['RateLimit-Remaining'], '0')
+
+    def test_validate_token(self):
+        response = self.client.post(
+            reverse('accounts:validate_token'), {'token': self.access}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'async@example.com')
+
+    def test_validate_token_rejects_invalid_token(self):
+        response = self.client.post(
+            reverse('accounts:validate_token'), {'token': 'nope'}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_validate_token_requires_token(self):
+        response = self.client.post(reverse('accounts:validate_token'), {}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(OTP_ISSUE_LIMIT=2, OTP_ISSUE_WINDOW=3600)
+class CodeRateLimitTests(TestCase):
+    """Rate-limited code requests report the time left in the window"""
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_wait_is_remaining_window(self):
+        # Only the module's clock moves; the cache keeps real time
+        with mock.patch('accounts.codes.time') as clock:
+            clock.time.return_value = 1000.0
+            one_time_codes.issue(VERIFICATION, 'otp@example.com')
+            clock.time.return_value = 1600.0
+            one_time_codes.issue(VERIFICATION, 'otp@example.com')
+            clock.time.return_value = 2000.5
+            with self.assertRaises(CodeRateLimited) as raised:
+                one_time_codes.issue(VERIFICATION, 'otp@example.com')
+
+        self.assertEqual(raised.exception.wait, 2600)
+
+    def test_retry_after_header(self):
+        user = CustomUser.objects.create_user(
+            email='otp@example.com', password='x', first_name='Otp', last_name='User'
+        )
+        for _ in range(2):
+            one_time_codes.issue(VERIFICATION, user.email)
+
+        response = self.client.post(
+            reverse('accounts:resend_verification'), {'email': user.email}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 429)
+        self.assertLessEqual(int(response['Retry-After']), 3600)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+
+class UserSearchTests(TestCase):
+    """Indexed user search matches substrings of every term"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ada = CustomUser.objects.create_user(
+            email='ada.lovelace@example.com', password='x', first_name='Ada', last_name='Lovelace',
+            phone_number='+441234567890'
+        )
+        cls.alan = CustomUser.objects.create_user(
+            email='alan@turing.org', password='x', first_name='Alan', last_name='Turing'
+        )
+        cls.grace = CustomUser.objects.create_user(
+            email='grace@navy.mil', password='x', first_name='Grace', last_name='Hopper'
+        )
+
+    def emails(self, search):
+        return sorted(filter_users_by_search(CustomUser.objects.all(), search).values_list('email', flat=True))
+
+    def test_substring_terms(self):
+        self.assertEqual(self.emails('ovela'), ['ada.lovelace@example.com'])
+        self.assertEqual(self.emails('4567'), ['ada.lovelace@example.com'])
+        self.assertEqual(self.emails('URING'), ['alan@turing.org'])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.emails('ada example'), ['ada.lovelace@example.com'])
+        self.assertEqual(self.emails('ada turing'), [])
+
+    def test_short_terms_match_prefixes(self):
+        self.assertEqual(self.emails('al'), ['alan@turing.org'])
+        self.assertEqual(self.emails('ho'), ['grace@navy.mil'])
+        self.assertEqual(self.emails('ce'), [])
+
+    def test_query_syntax_is_literal(self):
+        self.assertEqual(self.emails('"ada'), [])
+        self.assertEqual(self.emails('lovelace OR turing'), [])
+
+    def test_index_follows_updates(self):
+        self.grace.last_name = 'Brewster'
+        self.grace.save()
+
+        self.assertEqual(self.emails('hopper'), [])
+        self.assertEqual(self.emails('brewster'), ['grace@navy.mil'])
+        self.grace.delete()
+        self.assertEqual(self.emails('brewster'), [])
+
+    def test_fallback_without_trigram_index(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            self.assertEqual(self.emails('ovela'), ['ada.lovelace@example.com'])
+            self.assertEqual(self.emails('ce'), ['ada.lovelace@example.com', 'grace@navy.mil'])
+
+    def test_directory(self):
+        admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', password='x', first_name='Root', last_name='Admin'
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        first = client.get(reverse('accounts:user_directory'), {'search': 'a', 'limit': 1}).json()
+        second = client.get(
+            reverse('accounts:user_directory'), {'search': 'a', 'limit': 1, 'cursor': first['next_cursor']}
+        ).json()
+
+        self.assertEqual([row['email'] for row in first['users']], ['ada.lovelace@example.com'])
+        self.assertEqual([row['email'] for row in second['users']], ['admin@example.com'])
+
+
+@override_settings(OTP_CODE_TTL=900, OTP_MAX_ATTEMPTS=3)
+class OneTimeCodeTests(TestCase):
+    """One-time codes are single use, attempt limited and expire"""
+
+    email = 'otp@example.com'
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_issue_and_verify(self):
+        code = one_time_codes.issue(VERIFICATION, self.email)
+
+        self.assertRegex(code, r'^\d{6}$')
+        self.assertEqual(one_time_codes.check(VERIFICATION, 'OTP@example.com ', code), VALID)
+        # Consumed by the check that accepted it
+        self.assertEqual(one_time_codes.check(VERIFICATION, self.email, code), MISSING)
+
+    def test_reissue_replaces_code(self):
+        with mock.patch('accounts.codes.secrets.randbelow', side_effect=[111111, 222222]):
+            old = one_time_codes.issue(VERIFICATION, self.email)
+            new = one_time_codes.issue(VERIFICATION, self.email)
+
+        self.assertEqual(one_time_codes.check(VERIFICATION, self.email, old), INVALID)
+        self.assertEqual(one_time_codes.check(VERIFICATION, self.email, new), VALID)
+
+    def test_purposes_are_independent(self):
+        code = one_time_codes.issue(VERIFICATION, self.email)
+        one_time_codes.issue(PASSWORD_RESET, self.email)
+
+        self.assertEqual(one_time_codes.check(VERIFICATION, self.email, code), VALID)
+
+    def test_attempt_limit_discards_code(self):
+        code = one_time_codes.issue(VERIFICATION, self.email)
+        wrong = f'{(int(code) + 1) % 10 ** 6:06d}'
+
+        results = [one_time_codes.check(VERIFICATION, self.email, wrong) for _ in range(4)]
+
+        self.assertEqual(results, [INVALID, INVALID, INVALID, TOO_MANY_ATTEMPTS])
+        self.assertEqual(one_time_codes.check(VERIFICATION, self.email, code), MISSING)
+
+    def test_code_expires(self):
+        code = one_time_codes.issue(VERIFICATION, self.email)
+
+        with mock.patch('django.core.cache.backends.locmem.time') as clock:
+            clock.time.return_value = time.time() + 901
+            self.assertEqual(one_time_codes.check(VERIFICATION, self.email, code), MISSING)
+
+    def test_verify_email_endpoint(self):
+        user = CustomUser.objects.create_user(
+            email=self.email, password='x', first_name='Otp', last_name='User'
+        )
+        code = one_time_codes.issue(VERIFICATION, user.email)
+        data = {'email': user.email, 'verification_code': code}
+
+        response = self.client.post(reverse('accounts:verify_email'), data, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.is_verified)
+        self.assertEqual(
+            self.client.post(reverse('accounts:verify_email'), data, content_type='application/json').status_code,
+            400
+        )
@@ -0,0 +1,24 @@
+"""
+JWT token classes
+
+RefreshToken checks the blacklist through the revocation bloom filter
+(accounts.revocation) rather than querying it on every use.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .revocation import revocations
+
+
+class RefreshToken(tokens.RefreshToken):
+
+    def check_blacklist(self):
+        if revocations.is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        revocations.add(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -18,8 +18,8 @@ urlpatterns = [
     path('request-password-reset/', views.request_password_reset, name='request_password_reset'),
     path('confirm-password-reset/', views.confirm_password_reset, name='confirm_password_reset'),
     
-    # User profile
-    path('profile/', views.get_user_profile, name='get_profile'),
+    # User profile (profile/ is ASGI-native; get_user_profile is its WSGI equivalent)
+    path('profile/', views.aget_user_profile, name='get_profile'),
     path('profile/update/', views.update_user_profile, name='update_profile'),
     path('change-password/', views.change_password, name='change_password'),
     path('deactivate-account/', views.deactivate_account, name='deactivate_account'),
@@ -30,13 +30,14 @@ urlpatterns = [
     
     # User management (admin only)
     path('users/', views.get_users, name='get_users'),
+    path('users/directory/', views.user_directory, name='user_directory'),
     path('users/<uuid:user_id>/', views.get_user_detail, name='get_user_detail'),
     path('users/<uuid:user_id>/update/', views.update_user, name='update_user'),
     path('users/create/', views.create_user, name='create_user'),
     path('users/<uuid:user_id>/delete/', views.delete_user, name='delete_user'),
     
-    # Token validation
-    path('validate-token/', views.validate_token, name='validate_token'),
+    # Token validation (ASGI-native; validate_token is its WSGI equivalent)
+    path('validate-token/', views.avalidate_token, name='validate_token'),
     
     # Permission check
     path('check-permission/', views.check_permission, name='check_permission'),
@@ -162,6 +163,17 @@ GET /accounts/users/
         is_verified: boolean (filter by verification status)
         search: string (search in email, name, phone)
 
+GET /accounts/users/directory/
+    Search and page through users (keyset pagination)
+    Query parameters:
+        search: string (substring match on email, name, phone)
+        role: string (filter by role)
+        is_active: boolean (filter by active status)
+        is_verified: boolean (filter by verification status)
+        ordering: string (email or -email, default email)
+        limit: integer (page size, 1-200, default 50)
+        cursor: string (next_cursor from the previous page)
+
 GET /accounts/users/<uuid:user_id>/
     Get specific user details
 
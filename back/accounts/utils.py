@@ -8,11 +8,13 @@ from django.contrib.auth.tokens import default_token_generator
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
 import uuid
 import re
 import logging
 from datetime import timedelta
 
+from .codes import VERIFICATION, PASSWORD_RESET, one_time_codes
 from .models import CustomUser, UserProfile, Role
 
 logger = logging.getLogger(__name__)
@@ -72,9 +74,8 @@ def send_verification_email(user, request=None):
     if not user or not user.email:
         return False
     
-    # Generate verification code if needed
-    if not user.verification_code or not user.is_verification_code_valid():
-        user.generate_verification_code()
+    # Replaces any outstanding code; raises CodeRateLimited past the issuance limit
+    code = one_time_codes.issue(VERIFICATION, user.email)
     
     try:
         # Get site domain
@@ -87,10 +88,10 @@ def send_verification_email(user, request=None):
         # Prepare email context
         context = {
             'user': user,
-            'code': user.verification_code,
+            'code': code,
             'domain': domain,
             'site_name': settings.SITE_NAME if hasattr(settings, 'SITE_NAME') else 'Our Platform',
-            'expiry_minutes': 15  # Code expires after 15 minutes
+            'expiry_minutes': one_time_codes.ttl // 60
         }
         
         # Render email template
@@ -123,8 +124,8 @@ def send_password_reset_email(user, request=None):
     if not user or not user.email:
         return False
     
-    # Generate reset code
-    user.generate_reset_code()
+    # Replaces any outstanding code; raises CodeRateLimited past the issuance limit
+    code = one_time_codes.issue(PASSWORD_RESET, user.email)
     
     try:
         # Get site domain
@@ -137,10 +138,10 @@ def send_password_reset_email(user, request=None):
         # Prepare email context
         context = {
             'user': user,
-            'code': user.reset_code,
+            'code': code,
             'domain': domain,
             'site_name': settings.SITE_NAME if hasattr(settings, 'SITE_NAME') else 'Our Platform',
-            'expiry_minutes': 15  # Code expires after 15 minutes
+            'expiry_minutes': one_time_codes.ttl // 60
         }
         
         # Render email template
@@ -225,6 +226,11 @@ def get_client_ip(request):
 def record_login(user, success, request=None):
     """
     Record a login attempt and handle account locking
+    
+    A successful login also stamps the profile's last_active (creating the
+    profile if the user has none); load the user with select_related('profile')
+    so this needs no extra SELECT. The user and profile rows are written with
+    one UPDATE each, committed together.
     """
     if not user:
         return
@@ -233,16 +239,14 @@ def record_login(user, success, request=None):
     if request:
         ip_address = get_client_ip(request)
     
-    user.record_login_attempt(success=success, ip_address=ip_address)
-    
-    if success and hasattr(user, 'profile'):
-        # Update last active timestamp
-        try:
-            profile = user.profile
-            profile.update_last_active()
-        except UserProfile.DoesNotExist:
-            # Create profile if it doesn't exist
-            UserProfile.objects.create(user=user, last_active=timezone.now())
+    with transaction.atomic():
+        user.record_login_attempt(success=success, ip_address=ip_address)
+        
+        if success:
+            try:
+                user.profile.update_last_active()
+            except UserProfile.DoesNotExist:
+                user.profile = UserProfile.objects.create(user=user, last_active=timezone.now())
 
 
 def assign_role(user, role_name):
@@ -364,7 +368,7 @@ def get_tokens_for_user(user):
     """
     Generate JWT tokens for a user
     """
-    from rest_framework_simplejwt.tokens import RefreshToken
+    from .tokens import RefreshToken
     
     refresh = RefreshToken.for_user(user)
     
@@ -1,7 +1,7 @@
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.conf import settings
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
@@ -11,9 +11,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 
 import jwt
@@ -27,8 +25,15 @@ from .serializers import (
     UserSerializer, UserDetailSerializer, UserCreateSerializer, 
     UserUpdateSerializer, ProfileUpdateSerializer, VerificationSerializer,
     PasswordResetRequestSerializer, PasswordResetConfirmSerializer,
-    RoleAssignmentSerializer, RoleSerializer
+    RoleAssignmentSerializer, RoleSerializer, UserDirectorySerializer
 )
+from .search import filter_users_by_search, get_directory_page
+from .codes import CodeRateLimited
+from .hashers import PasswordHashingBusy, check_user_password, set_user_password
+from .tokens import RefreshToken
+from back.async_api import async_api_view, run_side_effects
+from back.authentication import JWTAuthentication
+from back.throttling import throttle_scope
 from .utils import (
     validate_password_strength, normalize_email, send_verification_email,
     send_password_reset_email, send_welcome_email, get_client_ip,
@@ -39,8 +44,23 @@ from .utils import (
 logger = logging.getLogger(__name__)
 
 
+def code_rate_limited_response(exc):
+    return Response({
+        'success': False,
+        'message': 'Too many codes requested for this email. Please try again later.'
+    }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(exc.wait)})
+
+
+def password_hashing_busy_response():
+    return Response({
+        'success': False,
+        'message': 'Too many password checks in progress. Please try again shortly.'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_scope('register')
 def register_user(request):
     """
     Register a new user
@@ -141,6 +161,9 @@ def resend_verification(request):
             'message': 'Verification email sent successfully.'
         }, status=status.HTTP_200_OK)
         
+    except CodeRateLimited as e:
+        return code_rate_limited_response(e)
+    
     except CustomUser.DoesNotExist:
         return Response({
             'success': False,
@@ -157,6 +180,7 @@ def resend_verification(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_scope('login')
 def login_user(request):
     """
     Login user and generate JWT token
@@ -171,9 +195,9 @@ def login_user(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        # Get user by email
+        # Get user by email, with everything the response needs
         try:
-            user = CustomUser.objects.get(email=email)
+            user = CustomUser.objects.select_related('profile__role').get(email=email)
         except CustomUser.DoesNotExist:
             record_login(None, False, request)
             return Response({
@@ -206,32 +230,30 @@ def login_user(request):
                 'unverified': True
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Authenticate user
-        authenticated_user = authenticate(email=email, password=password)
-        
-        if authenticated_user is None:
+        # Verify the password against the loaded user; authenticate() would
+        # fetch the same row again. Outdated hashes are upgraded in the background.
+        if not check_user_password(user, password):
             record_login(user, False, request)
             return Response({
                 'success': False,
                 'message': 'Invalid email or password.'
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Record successful login and update user's last_login
+        # Record successful login, creating the profile if needed
         record_login(user, True, request)
         
-        # Get user profile data
-        user_profile = authenticated_user.get_profile()
-        
         # Generate tokens
-        tokens = get_tokens_for_user(authenticated_user)
+        tokens = get_tokens_for_user(user)
         
         return Response({
             'success': True,
             'message': 'Login successful.',
             'tokens': tokens,
-            'user': UserDetailSerializer(authenticated_user).data
+            'user': UserDetailSerializer(user).data
         }, status=status.HTTP_200_OK)
     
+    except PasswordHashingBusy:
+        return password_hashing_busy_response()
     except Exception as e:
         logger.error(f"Error in user login: {str(e)}")
         return Response({
@@ -341,6 +363,7 @@ def logout_user(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_scope('password_reset')
 def request_password_reset(request):
     """
     Request password reset by email
@@ -359,6 +382,9 @@ def request_password_reset(request):
                 'message': 'Password reset email sent successfully. Please check your email for instructions.'
             }, status=status.HTTP_200_OK)
             
+        except CodeRateLimited as e:
+            return code_rate_limited_response(e)
+        
         except CustomUser.DoesNotExist:
             # Return success even if user doesn't exist for security reasons
             return Response({
@@ -385,11 +411,10 @@ def confirm_password_reset(request):
         new_password = serializer.validated_data['new_password']
         
         # Set new password
-        user.set_password(new_password)
-        
-        # Clear reset code
-        user.reset_code = ""
-        user.reset_code_created = None
+        try:
+            set_user_password(user, new_password)
+        except PasswordHashingBusy:
+            return password_hashing_busy_response()
         
         # Reset failed login attempts
         user.failed_login_attempts = 0
@@ -442,6 +467,43 @@ def get_user_profile(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+async def aget_user_details(user):
+    """
+    Get the user with the profile and role UserDetailSerializer reads,
+    loading them with the async ORM unless they already are
+    """
+    if CustomUser.profile.is_cached(user):
+        return user
+    return await CustomUser.objects.select_related('profile__role').aget(pk=user.pk)
+
+
+@async_api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAuthenticated])
+async def aget_user_profile(request):
+    """
+    Get user profile data (ASGI-native get_user_profile)
+    """
+    try:
+        user = await aget_user_details(request.user)
+        
+        # Update last active timestamp
+        if hasattr(user, 'profile'):
+            await run_side_effects(user.profile.aupdate_last_active())
+            
+        return Response({
+            'success': True,
+            'user': UserDetailSerializer(user).data
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        logger.error(f"Error getting user profile: {str(e)}")
+        return Response({
+            'success': False,
+            'message': 'An error occurred while retrieving user profile.'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(['PUT'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
@@ -529,7 +591,12 @@ def change_password(request):
     
     # Check if current password is correct
     user = request.user
-    if not user.check_password(current_password):
+    try:
+        # No upgrade of the current hash: it is replaced right away
+        password_correct = check_user_password(user, current_password, rehash=False)
+    except PasswordHashingBusy:
+        return password_hashing_busy_response()
+    if not password_correct:
         return Response({
             'success': False,
             'message': 'Current password is incorrect.'
@@ -537,7 +604,7 @@ def change_password(request):
     
     try:
         # Set new password
-        user.set_password(new_password)
+        set_user_password(user, new_password)
         user.save(update_fields=['password'])
         
         # Generate new tokens
@@ -549,6 +616,8 @@ def change_password(request):
             'tokens': tokens
         }, status=status.HTTP_200_OK)
         
+    except PasswordHashingBusy:
+        return password_hashing_busy_response()
     except Exception as e:
         logger.error(f"Error changing password: {str(e)}")
         return Response({
@@ -701,6 +770,63 @@ def get_users(request):
     }, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@authentication_classes([JWTAuthentication])
+@permission_classes([IsAdminUser])
+def user_directory(request):
+    """
+    Search and page through users (admin only)
+    
+    Keyset-paginated by email: pass the returned next_cursor as ?cursor= to get
+    the following page. Search uses the indexed user search (see accounts.search).
+    """
+    role = request.query_params.get('role')
+    is_active = request.query_params.get('is_active')
+    is_verified = request.query_params.get('is_verified')
+    search = request.query_params.get('search')
+    
+    try:
+        limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'limit must be an integer.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    users = CustomUser.objects.all()
+    
+    if role:
+        users = users.filter(profile__role__name=role)
+    
+    if is_active is not None:
+        users = users.filter(is_active=is_active.lower() == 'true')
+    
+    if is_verified is not None:
+        users = users.filter(is_verified=is_verified.lower() == 'true')
+    
+    if search:
+        users = filter_users_by_search(users, search)
+    
+    try:
+        rows, next_cursor = get_directory_page(
+            users,
+            ordering=request.query_params.get('ordering', 'email'),
+            cursor=request.query_params.get('cursor'),
+            limit=limit
+        )
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'next_cursor': next_cursor,
+        'users': UserDirectorySerializer(rows, many=True).data
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['GET'])
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAdminUser])
@@ -890,7 +1016,7 @@ def validate_token(request):
         
         # Get user from token
         user_id = payload.get('user_id')
-        user = CustomUser.objects.get(id=user_id)
+        user = CustomUser.objects.select_related('profile__role').get(id=user_id)
         
         # Check if user is active
         if not user.is_active:
@@ -935,6 +1061,75 @@ def validate_token(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@async_api_view(['POST'])
+@permission_classes([AllowAny])
+async def avalidate_token(request):
+    """
+    Validate JWT token and return user data (ASGI-native validate_token)
+    """
+    token = request.data.get('token')
+    
+    if not token:
+        return Response({
+            'success': False,
+            'message': 'Token is required.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # Decode token
+        payload = jwt.decode(
+            token, 
+            settings.SIMPLE_JWT['SIGNING_KEY'],
+            algorithms=[settings.SIMPLE_JWT['ALGORITHM']]
+        )
+        
+        # Get user from token
+        user_id = payload.get('user_id')
+        user = await CustomUser.objects.select_related('profile__role').aget(id=user_id)
+        
+        # Check if user is active
+        if not user.is_active:
+            return Response({
+                'success': False,
+                'message': 'User is inactive.'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        # Update last active timestamp
+        if hasattr(user, 'profile'):
+            await run_side_effects(user.profile.aupdate_last_active())
+        
+        return Response({
+            'success': True,
+            'message': 'Token is valid.',
+            'user': UserDetailSerializer(user).data
+        }, status=status.HTTP_200_OK)
+        
+    except jwt.ExpiredSignatureError:
+        return Response({
+            'success': False,
+            'message': 'Token has expired.'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+        
+    except jwt.InvalidTokenError:
+        return Response({
+            'success': False,
+            'message': 'Invalid token.'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+        
+    except CustomUser.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'User not found.'
+        }, status=status.HTTP_404_NOT_FOUND)
+        
+    except Exception as e:
+        logger.error(f"Error validating token: {str(e)}")
+        return Response({
+            'success': False,
+            'message': 'An error occurred while validating token.'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 # Check permissions endpoint
 @api_view(['POST'])
 @authentication_classes([JWTAuthentication])
@@ -0,0 +1,193 @@
+"""
+ASGI-native DRF views
+
+DRF views are synchronous, so under ASGI every request to them pays a
+sync_to_async thread hop. AsyncViewMixin runs an APIView (or viewset) on the
+event loop instead, keeping DRF's request lifecycle:
+
+- the same request wrapping, content negotiation and exception handling;
+- the view's authentication classes: authenticators with an `aauthenticate`
+  method (back.authentication.JWTAuthentication, the default) are awaited,
+  others run in a worker thread;
+- the view's permission classes, checked on the event loop (they must not
+  query; request.user is already loaded);
+- the view's throttles, scopes included, run in a worker thread since
+  throttle state lives in the cache.
+
+Handlers are `async def` and use the async ORM; apaginate_queryset() pages a
+queryset with `acount()` and async iteration. async_api_view() is the
+@api_view equivalent for `async def` function views, and async_reads()
+serves an endpoint's reads from an async view and its other methods from the
+synchronous one.
+
+The views work under WSGI too (Django runs them with async_to_sync), but
+WSGI deployments are better served by the synchronous views;
+benchmark_asgi compares the two.
+"""
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.core.exceptions import ImproperlyConfigured
+from django.core.paginator import InvalidPage
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.decorators import api_view
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.views import APIView
+import asyncio
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncViewMixin:
+    """
+    Run a DRF view's request lifecycle on the event loop; see the module docstring
+    """
+    view_is_async = True
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        # Viewsets build their view function without View.as_view(), which
+        # is what marks async views
+        return markcoroutinefunction(super().as_view(*args, **initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        APIView.dispatch(), awaiting authentication, throttles and the handler
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        # With request.user set, initial() runs no queries; throttles are
+        # deferred to here (see check_throttles)
+        await self.aperform_authentication(request)
+        self.initial(request, *args, **kwargs)
+        await sync_to_async(super().check_throttles, thread_sensitive=False)(request)
+
+    async def aperform_authentication(self, request):
+        """
+        Request._authenticate(), awaiting authenticators that support it
+        """
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    def check_throttles(self, request):
+        # Called by initial(); ainitial() runs the throttles off the event loop
+        pass
+
+    async def apaginate_queryset(self, queryset):
+        """
+        Async paginate_queryset() for PageNumberPagination: the count and the
+        page are read with the async ORM
+        """
+        paginator = self.paginator
+        if paginator is None:
+            return None
+        if not isinstance(paginator, PageNumberPagination):
+            raise ImproperlyConfigured(f"{type(self).__name__} can only page with PageNumberPagination")
+
+        paginator.request = self.request
+        page_size = paginator.get_page_size(self.request)
+        if not page_size:
+            return None
+
+        django_paginator = paginator.django_paginator_class(queryset, page_size)
+        django_paginator.count = await queryset.acount()
+        page_number = paginator.get_page_number(self.request, django_paginator)
+        try:
+            paginator.page = django_paginator.page(page_number)
+        except InvalidPage as exc:
+            raise exceptions.NotFound(
+                paginator.invalid_page_message.format(page_number=page_number, message=str(exc))
+            )
+
+        paginator.page.object_list = [item async for item in paginator.page.object_list]
+        return paginator.page.object_list
+
+
+class AsyncAPIView(AsyncViewMixin, APIView):
+    """APIView with `async def` handlers"""
+
+
+def async_api_view(http_method_names=None):
+    """
+    @api_view for `async def` function views; honours the same policy
+    decorators (@permission_classes, @throttle_scope, ...)
+    """
+    def decorator(func):
+        view_class = api_view(http_method_names)(func).cls
+
+        async def handler(self, *args, **kwargs):
+            return await func(*args, **kwargs)
+
+        attrs = {method: handler for method in view_class.http_method_names if method != 'options'}
+        async_view_class = type(view_class.__name__, (AsyncViewMixin, view_class), attrs)
+        async_view_class.__module__ = func.__module__
+        return async_view_class.as_view()
+
+    return decorator
+
+
+def async_reads(async_view, sync_view):
+    """
+    Serve GET and HEAD requests with `async_view` and the other methods with
+    `sync_view` (in a worker thread)
+    """
+    run_sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await run_sync_view(request, *args, **kwargs)
+
+    # Viewset action maps, for route introspection (projects.benchmarking)
+    view.actions = {**getattr(sync_view, 'actions', {}), **getattr(async_view, 'actions', {})}
+    return csrf_exempt(view)
+
+
+async def run_side_effects(*aws):
+    """
+    Await side effects (emails, activity timestamps, ...) concurrently
+
+    Failures are logged rather than raised: they must not fail the request
+    that triggered them.
+    """
+    for result in await asyncio.gather(*aws, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error(f"Side effect failed: {result!r}")
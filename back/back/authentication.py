@@ -0,0 +1,60 @@
+"""
+JWT authentication for the API (DEFAULT_AUTHENTICATION_CLASSES)
+
+simplejwt's JWTAuthentication, plus aauthenticate() for the ASGI-native views
+(back.async_api): the user is loaded with the async ORM together with its
+profile and role, which the async views serialize without further queries.
+"""
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    simplejwt's JWTAuthentication with an async variant; see the module docstring
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """
+        Async get_user(), with the same checks
+        """
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        user_model = get_user_model()
+        try:
+            user = await user_model.objects.select_related('profile__role').aget(
+                **{jwt_settings.USER_ID_FIELD: user_id}
+            )
+        except user_model.DoesNotExist as e:
+            raise exceptions.AuthenticationFailed("User not found", code='user_not_found') from e
+
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise exceptions.AuthenticationFailed("User is inactive", code='user_inactive')
+
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise exceptions.AuthenticationFailed(
+                    "The user's password has been changed.", code='password_changed'
+                )
+
+        return user
@@ -0,0 +1,348 @@
+"""
+Cache configuration
+
+build_caches() turns one CACHE_URL into the CACHES setting:
+
+- redis://host:6379/0 (or rediss://): Django's RedisCache, needs redis-py;
+- memcached://host:11211[,host:11211]: PyMemcacheCache, needs pymemcache;
+- sqlite:///path/to/cache.sqlite3: SQLiteCache below, a zero-dependency
+  cache shared by every process on the host (the local default);
+- file:///path/to/dir: FileBasedCache, also shared but without atomic incr();
+- locmem://: per-process memory, for tests and benchmarks.
+
+Every URL yields the same named caches:
+
+- default: general purpose (one-time codes, token revocation generation);
+- throttle: request rate counters, and sessions if they are cache-backed;
+- payloads: large rendered responses (back.compression.cached_json_response).
+
+Keys are namespaced "<CACHE_KEY_PREFIX>:<alias>" and carry CACHE_VERSION, so
+bumping the version invalidates every entry at deploy time.
+
+All backends count lookups per cache; render_metrics() exposes them on the
+metrics endpoint (PROFILING_METRICS_COLLECTORS).
+
+All backends also have update(key, func, timeout), an atomic
+read-modify-write of one key (func gets the current value, or None, and
+returns the new one). It is atomic across processes on Redis (WATCH/MULTI),
+Memcached (gets/cas) and SQLite (an IMMEDIATE transaction), and within the
+process on the local-memory and file caches.
+"""
+from django.core.cache.backends import filebased, locmem, memcached, redis
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.exceptions import ImproperlyConfigured
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+
+CACHE_ALIASES = ('default', 'throttle', 'payloads')
+
+_MISSING = object()
+
+
+class CacheStats:
+    """
+    Thread-safe, process-local counts of cache lookups per cache and result
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, cache, hits, misses):
+        with self._lock:
+            self._counts[(cache, 'hit')] += hits
+            self._counts[(cache, 'miss')] += misses
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+def render_metrics():
+    """
+    Render the cache lookup counts in the Prometheus text exposition format
+    """
+    lines = [
+        '# HELP cache_requests_total Cache lookups, by cache and result.',
+        '# TYPE cache_requests_total counter',
+    ]
+    for (cache, result), count in sorted(stats.snapshot().items()):
+        lines.append(f'cache_requests_total{{cache="{cache}",result="{result}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+class InstrumentedCacheMixin:
+    """
+    Count get() / get_many() hits and misses under the cache's ALIAS
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        self.alias = params.get('ALIAS') or self.key_prefix or 'cache'
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version=version)
+        if value is _MISSING:
+            stats.record(self.alias, 0, 1)
+            return default
+        stats.record(self.alias, 1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version=version)
+        # BaseCache.get_many() goes through get(), which already counted
+        if super().get_many.__func__ is not BaseCache.get_many:
+            stats.record(self.alias, len(values), len(keys) - len(values))
+        return values
+
+
+class _SQLiteCache(BaseCache):
+    """
+    Cache stored in a SQLite file, shared by all processes on the host
+
+    Writes run in IMMEDIATE transactions, so add() and incr() are atomic
+    across processes. Expired rows are deleted on write; past MAX_ENTRIES,
+    1/CULL_FREQUENCY of the entries closest to expiry are dropped.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    cull_every = 100  # Writes between entry count checks
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        table = params.get('OPTIONS', {}).get('TABLE', 'cache')
+        if not re.fullmatch(r'\w+', table):
+            raise ImproperlyConfigured(f"Invalid SQLite cache table name '{table}'")
+        self._index = f'"{table}_expires"'
+        self._table = f'"{table}"'
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # sqlite3 connections must stay on the thread (and process: servers
+        # fork workers) that opened them
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {self._table} (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)'
+            )
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {self._index} ON {self._table} (expires)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _write(self):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _live_value(self, connection, key):
+        row = connection.execute(
+            f'SELECT value FROM {self._table} WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return _MISSING if row is None else pickle.loads(row[0])
+
+    def _store(self, connection, key, value, timeout):
+        connection.execute(
+            f'INSERT INTO {self._table} (key, value, expires) VALUES (?, ?, ?) '
+            f'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+            (key, pickle.dumps(value, self.pickle_protocol), self.get_backend_timeout(timeout)),
+        )
+        self._writes += 1
+        if self._writes % self.cull_every == 0:
+            self._cull(connection)
+
+    def _cull(self, connection):
+        connection.execute(f'DELETE FROM {self._table} WHERE expires <= ?', (time.time(),))
+        count = connection.execute(f'SELECT COUNT(*) FROM {self._table}').fetchone()[0]
+        if count > self._max_entries:
+            connection.execute(
+                f'DELETE FROM {self._table} WHERE key IN ('
+                f'SELECT key FROM {self._table} ORDER BY expires IS NULL, expires LIMIT ?)',
+                (count // self._cull_frequency if self._cull_frequency else count,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        value = self._live_value(self._connection(), key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            self._store(connection, key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            if self._live_value(connection, key) is not _MISSING:
+                return False
+            self._store(connection, key, value, timeout)
+            return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            cursor = connection.execute(
+                f'UPDATE {self._table} SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            )
+            return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            value = self._live_value(connection, key)
+            if value is _MISSING:
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            connection.execute(
+                f'UPDATE {self._table} SET value = ? WHERE key = ?',
+                (pickle.dumps(value, self.pickle_protocol), key),
+            )
+            return value
+
+    def update(self, key, func, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            value = self._live_value(connection, key)
+            value = func(None if value is _MISSING else value)
+            self._store(connection, key, value, timeout)
+            return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._write() as connection:
+            return connection.execute(f'DELETE FROM {self._table} WHERE key = ?', (key,)).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._live_value(self._connection(), key) is not _MISSING
+
+    def clear(self):
+        with self._write() as connection:
+            connection.execute(f'DELETE FROM {self._table}')
+
+
+class ProcessLockedUpdateMixin:
+    """
+    update() serialized by a lock, so only atomic within the process
+    """
+    _update_lock = threading.Lock()
+
+    def update(self, key, func, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._update_lock:
+            value = func(self.get(key, version=version))
+            self.set(key, value, timeout, version=version)
+            return value
+
+
+class SQLiteCache(InstrumentedCacheMixin, _SQLiteCache):
+    pass
+
+
+class LocMemCache(InstrumentedCacheMixin, ProcessLockedUpdateMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(InstrumentedCacheMixin, ProcessLockedUpdateMixin, filebased.FileBasedCache):
+    pass
+
+
+class RedisCache(InstrumentedCacheMixin, redis.RedisCache):
+
+    def update(self, key, func, timeout=DEFAULT_TIMEOUT, version=None):
+        from redis.exceptions import WatchError
+
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        serializer = self._cache._serializer
+        with self._cache.get_client(key, write=True).pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    value = func(None if raw is None else serializer.loads(raw))
+                    pipe.multi()
+                    pipe.set(key, serializer.dumps(value), ex=None if timeout is None else max(timeout, 1))
+                    pipe.execute()
+                    return value
+                except WatchError:
+                    # Written by another client since the WATCH; retry
+                    continue
+
+
+class PyMemcacheCache(InstrumentedCacheMixin, memcached.PyMemcacheCache):
+
+    def update(self, key, func, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self.get_backend_timeout(timeout)
+        while True:
+            current, cas_token = self._cache.gets(key)
+            value = func(current)
+            if cas_token is None:
+                stored = self._cache.add(key, value, timeout)
+            else:
+                stored = self._cache.cas(key, value, cas_token, timeout)
+            if stored:
+                return value
+
+
+def build_caches(url, key_prefix='', version=1, timeout=300):
+    """
+    Build the CACHES setting for a cache URL (see the module docstring)
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme
+
+    caches = {}
+    for alias in CACHE_ALIASES:
+        config = {
+            'KEY_PREFIX': f'{key_prefix}:{alias}' if key_prefix else alias,
+            'VERSION': version,
+            'TIMEOUT': timeout,
+            'ALIAS': alias,
+        }
+        if scheme in ('redis', 'rediss'):
+            config.update(BACKEND='back.caching.RedisCache', LOCATION=url)
+        elif scheme == 'memcached':
+            config.update(BACKEND='back.caching.PyMemcacheCache', LOCATION=parts.netloc.split(','))
+        elif scheme == 'sqlite':
+            # One table per alias, so clearing one cache leaves the others
+            config.update(BACKEND='back.caching.SQLiteCache', LOCATION=parts.path, OPTIONS={'TABLE': alias})
+        elif scheme == 'file':
+            config.update(BACKEND='back.caching.FileBasedCache', LOCATION=os.path.join(parts.path, alias))
+        elif scheme == 'locmem':
+            config.update(BACKEND='back.caching.LocMemCache', LOCATION=f'{parts.netloc}{alias}')
+        else:
+            raise ImproperlyConfigured(f"Unsupported cache URL scheme '{scheme}'")
+        caches[alias] = config
+    return caches
@@ -0,0 +1,268 @@
+"""
+Response compression
+
+CompressionMiddleware negotiates Content-Encoding from Accept-Encoding among
+COMPRESSION_ENCODINGS (server preference order, ties on q-value go to the
+first): zstd (needs the `zstandard` package), br (needs `brotli`) and gzip.
+Encodings whose package is missing are skipped. Bodies smaller than
+COMPRESSION_MIN_SIZE and content types outside COMPRESSION_CONTENT_TYPES are
+sent as is; StreamingHttpResponse content is compressed incrementally.
+
+cached_json_response() (acached_json_response() in async views) stores a
+rendered JSON payload in the 'payloads' cache together with its compressed
+variants, so a cache hit is served without rendering or compressing anything.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+    def compressobj(self):
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+class BrotliCompressor:
+    """
+    brotli.Compressor with the compress()/flush() interface of zlib
+    """
+
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def compress(self, data):
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+
+    def compressobj(self):
+        return BrotliCompressor()
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+
+    def compressobj(self):
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+
+CODECS = {'gzip': GzipCodec()}
+if brotli is not None:
+    CODECS['br'] = BrotliCodec()
+if zstandard is not None:
+    CODECS['zstd'] = ZstdCodec()
+
+
+def get_codecs():
+    """
+    Get the usable codecs in server preference order
+    """
+    encodings = getattr(settings, 'COMPRESSION_ENCODINGS', ('zstd', 'br', 'gzip'))
+    return [CODECS[encoding] for encoding in encodings if encoding in CODECS]
+
+
+def parse_accept_encoding(header):
+    """
+    Parse an Accept-Encoding header into {coding: q-value}
+    """
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def select_codec(header):
+    """
+    Pick the codec to use for an Accept-Encoding header, or None for identity
+    """
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for codec in get_codecs():
+        weight = weights.get(codec.name, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = codec, weight
+    return best
+
+
+def compress_stream(codec, chunks):
+    compressor = codec.compressobj()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def compress_stream_async(codec, chunks):
+    compressor = codec.compressobj()
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return any(
+        content_type == allowed or (allowed.endswith('/') and content_type.startswith(allowed))
+        for allowed in getattr(settings, 'COMPRESSION_CONTENT_TYPES', ('application/json', 'text/'))
+    )
+
+
+def precompress(body):
+    """
+    Get {encoding: bytes} for a payload, 'identity' being the raw bytes
+    """
+    variants = {'identity': body}
+    if len(body) >= getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+        for codec in get_codecs():
+            variants[codec.name] = codec.compress(body)
+    return variants
+
+
+def _render_variants(data):
+    from .renderers import ORJSONRenderer
+
+    return precompress(ORJSONRenderer().render(data))
+
+
+def _variants_response(variants):
+    response = HttpResponse(variants['identity'], content_type='application/json')
+    response.compressed_variants = variants
+    return response
+
+
+def cached_json_response(key, build, timeout=None):
+    """
+    Get a JSON response for build()'s data, cached with its compressed variants
+
+    build() is only called on a miss; a falsy result is neither cached nor
+    rendered and None is returned.
+    """
+    cache = caches['payloads']
+    variants = cache.get(key)
+    if variants is None:
+        data = build()
+        if not data:
+            return None
+        variants = _render_variants(data)
+        cache.set(key, variants, timeout or getattr(settings, 'PRECOMPRESSED_CACHE_TIMEOUT', 60))
+    return _variants_response(variants)
+
+
+async def acached_json_response(key, build, timeout=None):
+    """
+    Async cached_json_response(); build is a coroutine function
+    """
+    cache = caches['payloads']
+    variants = await cache.aget(key)
+    if variants is None:
+        data = await build()
+        if not data:
+            return None
+        variants = _render_variants(data)
+        await cache.aset(key, variants, timeout or getattr(settings, 'PRECOMPRESSED_CACHE_TIMEOUT', 60))
+    return _variants_response(variants)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codec = select_codec(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_stream_async(codec, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(codec, response.streaming_content)
+            del response['Content-Length']
+        else:
+            variants = getattr(response, 'compressed_variants', None) or {}
+            compressed = variants.get(codec.name) or codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # The compressed representation differs byte-wise from the original
+        # (projects.conditional accepts the weak tag in If-Match)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codec.name
+        return response
+
@@ -0,0 +1,203 @@
+"""
+Read-replica routing
+
+build_replicas() adds one DATABASES entry (replica_1, replica_2, ...) per
+name in DATABASE_REPLICA_NAMES, and ReplicaRouter sends writes, migrations
+and by default every read to the primary. Heavy read-only views opt in to
+replicas for the rest of the request with use_replica(request), or take an
+alias from get_read_database(request) for querysets evaluated after the view
+returns (streamed responses).
+
+Read-your-writes: a request that writes pins its client to the primary for
+REPLICA_PIN_SECONDS, longer than replicas are expected to lag. The pin is a
+cookie (REPLICA_PIN_COOKIE) and, for token-authenticated API clients that
+drop cookies, a key per user in the default cache. A request that has
+written reads from the primary too.
+
+Locally the replicas are SQLite files kept up to date by
+`manage.py sync_replicas`, which copies the primary into them (once, or every
+--interval seconds to mimic replication lag). Under the test runner replicas
+mirror the primary's test database.
+"""
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+import random
+import sqlite3
+
+# Per-request routing state, set by ReplicaRoutingMiddleware; a dict so the
+# router's changes are seen through the context copies of sync_to_async
+_state = ContextVar('db_routing_state', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def build_replicas(primary, names):
+    """
+    Build the DATABASES entries of replicas of the `primary` database config
+    """
+    return {
+        f'replica_{number}': {**primary, 'NAME': name, 'TEST': {'MIRROR': DEFAULT_DB_ALIAS}}
+        for number, name in enumerate(names, start=1)
+    }
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sync_sqlite_replicas():
+    """
+    Copy the primary SQLite database into every replica file (the local
+    stand-in for replication); returns the aliases copied to
+    """
+    primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+    if primary['ENGINE'] != 'django.db.backends.sqlite3':
+        raise ValueError("Replicas can only be synced from a SQLite primary")
+
+    source = sqlite3.connect(primary['NAME'])
+    try:
+        for alias in get_replicas():
+            target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+    finally:
+        source.close()
+    return get_replicas()
+
+
+def _pin_key(user_pk):
+    return f'db-primary-pin:{user_pk}'
+
+
+def is_pinned(request):
+    """
+    Whether the request's client wrote recently and must read from the primary
+    """
+    if getattr(settings, 'REPLICA_PIN_COOKIE', 'db_primary') in request.COOKIES:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and cache.get(_pin_key(user.pk)) is not None
+
+
+def get_read_database(request):
+    """
+    Get the alias to read from for this request: a replica, unless there is
+    none or the client is pinned to the primary
+    """
+    replicas = get_replicas()
+    if not replicas or is_pinned(request):
+        return DEFAULT_DB_ALIAS
+    return random.choice(replicas)
+
+
+def use_replica(request):
+    """
+    Route the remaining reads of this request to get_read_database(request)
+
+    Has no effect on unsafe methods or outside ReplicaRoutingMiddleware.
+    """
+    state = _state.get()
+    if state is None or request.method not in SAFE_METHODS:
+        return
+    alias = get_read_database(request)
+    if alias != DEFAULT_DB_ALIAS:
+        state['replica'] = alias
+
+
+class ReplicaRouter:
+    """
+    Route reads to the request's replica (see use_replica), everything else
+    to the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state['wrote']:
+            return None
+        return state['replica']
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track each request's routing state, and pin clients that wrote to the
+    primary
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = {'replica': None, 'wrote': False}
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.process_response(request, response, state)
+
+    async def __acall__(self, request):
+        state = {'replica': None, 'wrote': False}
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.process_response(request, response, state)
+
+    def process_response(self, request, response, state):
+        if not state['wrote'] or response.status_code >= 400 or not get_replicas():
+            return response
+
+        seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+        response.set_cookie(
+            getattr(settings, 'REPLICA_PIN_COOKIE', 'db_primary'), '1', max_age=seconds,
+            secure=request.is_secure(), httponly=True, samesite='Lax',
+        )
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            cache.set(_pin_key(user.pk), True, seconds)
+        return response
+
+
+class ReplicaReadsMixin:
+    """
+    Serve a DRF view's `replica_actions` (every safe request when None) from
+    a replica
+    """
+    replica_actions = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.replica_actions is None or getattr(self, 'action', None) in self.replica_actions:
+            use_replica(request)
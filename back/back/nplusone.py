@@ -0,0 +1,179 @@
+"""
+N+1 query detection
+
+Queries are grouped by normalized SQL fingerprint and by the first call site
+in project code that issued them. The same fingerprint repeated from the same
+call site more than NPLUSONE_THRESHOLD times within one request is reported:
+
+- 'raise' mode (enabled by NPlusOneTestRunner) raises NPlusOneError, failing
+  the test that made the request;
+- 'log' mode checks a NPLUSONE_SAMPLE_RATE fraction of requests and logs the
+  offenders with the view name;
+- 'off' disables detection.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+from contextlib import contextmanager
+from collections import Counter
+import logging
+import os
+import random
+import sys
+
+from .profiling import fingerprint_sql, get_view_name, observe_queries
+
+logger = logging.getLogger(__name__)
+
+# Instrumentation frames are never the call site
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SKIPPED_PATHS = (
+    os.path.join(_HERE, 'nplusone.py'),
+    os.path.join(_HERE, 'profiling.py'),
+    'site-packages',
+)
+
+
+class NPlusOneError(AssertionError):
+    """
+    Raised when a query is repeated past the threshold in 'raise' mode
+    """
+
+
+def find_call_site():
+    """
+    Get 'path:line (function)' of the innermost project frame on the stack
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(base_dir) and not any(path in filename for path in _SKIPPED_PATHS):
+            return f"{os.path.relpath(filename, base_dir)}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return '<unknown>'
+
+
+class QueryTracker:
+    """
+    Execute wrapper counting queries per (fingerprint, call site)
+    """
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counts[(fingerprint_sql(sql), find_call_site())] += 1
+        return execute(sql, params, many, context)
+
+    def offenders(self, threshold):
+        """
+        Get (fingerprint, call site, count) for groups above the threshold
+        """
+        return [
+            (fingerprint, call_site, count)
+            for (fingerprint, call_site), count in self.counts.most_common()
+            if count > threshold
+        ]
+
+
+def format_offenders(offenders, label):
+    lines = [f"Possible N+1 queries in {label}:"]
+    for fingerprint, call_site, count in offenders:
+        lines.append(f"  {count}x from {call_site}: {fingerprint[:300]}")
+    return '\n'.join(lines)
+
+
+@contextmanager
+def track_queries():
+    """
+    Track the queries run on every database connection inside the block
+    """
+    with observe_queries(QueryTracker()) as tracker:
+        yield tracker
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None, label='block'):
+    """
+    Raise NPlusOneError if the block repeats a query past the threshold
+
+    For tests exercising code outside of a request, e.g.
+
+        with detect_n_plus_one():
+            get_project_statistics_by_client()
+    """
+    if threshold is None:
+        threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+    with track_queries() as tracker:
+        yield tracker
+    offenders = tracker.offenders(threshold)
+    if offenders:
+        raise NPlusOneError(format_offenders(offenders, label))
+
+
+class NPlusOneMiddleware:
+    """
+    Detect N+1 query patterns per request according to NPLUSONE_MODE
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def should_track(self):
+        mode = getattr(settings, 'NPLUSONE_MODE', 'off')
+        return mode == 'raise' or (
+            mode == 'log' and random.random() < getattr(settings, 'NPLUSONE_SAMPLE_RATE', 0.05)
+        )
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_track():
+            return self.get_response(request)
+
+        with track_queries() as tracker:
+            response = self.get_response(request)
+        self.report(request, tracker)
+        return response
+
+    async def __acall__(self, request):
+        if not self.should_track():
+            return await self.get_response(request)
+
+        with track_queries() as tracker:
+            response = await self.get_response(request)
+        self.report(request, tracker)
+        return response
+
+    def report(self, request, tracker):
+        offenders = tracker.offenders(getattr(settings, 'NPLUSONE_THRESHOLD', 5))
+        if not offenders:
+            return
+        message = format_offenders(
+            offenders, f"{request.method} {request.path} (view {get_view_name(request)})"
+        )
+        if getattr(settings, 'NPLUSONE_MODE', 'off') == 'raise':
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+class NPlusOneTestRunner(DiscoverRunner):
+    """
+    Test runner that makes N+1 query patterns fail the test that triggers them
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._nplusone_settings = override_settings(NPLUSONE_MODE='raise')
+        self._nplusone_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._nplusone_settings.disable()
+        super().teardown_test_environment(**kwargs)
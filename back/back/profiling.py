@@ -0,0 +1,443 @@
+"""
+Request-level profiling
+
+ProfilingMiddleware records, for every request, the wall time, database time,
+query count, duplicate query fingerprints, serializer time and response size.
+Measurements are aggregated per view in a process-local registry exported by
+`metrics_view` in Prometheus text format, and written one JSON line per
+request to the 'back.profiling' logger (a rotating file, see LOGGING).
+
+Staff users can additionally send the PROFILING_HEADER header to run the
+request under cProfile; the stats are dumped to PROFILING_PROFILE_DIR.
+
+Queries are observed through one execute wrapper installed on every database
+connection, which forwards to the observers registered in the current context
+(observe_queries). Context variables follow async ORM calls into their worker
+threads, so this works for async views too.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.utils.module_loading import import_string
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+import cProfile
+import functools
+import hmac
+import io
+import json
+import logging
+import logging.handlers
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_metrics = ContextVar('request_metrics', default=None)
+_query_observers = ContextVar('query_observers', default=())
+
+_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERALS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RotatingLogFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    RotatingFileHandler that opens its file, creating the directory, on the
+    first record rather than when logging is configured
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        kwargs['delay'] = True
+        super().__init__(filename, *args, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+def fingerprint_sql(sql):
+    """
+    Normalize a SQL statement so that queries differing only in their
+    parameters (including the length of IN lists) share one fingerprint
+    """
+    sql = _STRING_LITERALS.sub('?', sql)
+    sql = _NUMBER_LITERALS.sub('?', sql.replace('%s', '?'))
+    sql = _PLACEHOLDER_LISTS.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    """
+    Measurements collected while a single request is processed
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.fingerprints = Counter()
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Execute wrapper, see observe_queries()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint_sql(sql)] += 1
+
+    def duplicates(self):
+        """
+        Get the fingerprints executed more than once, most repeated first
+        """
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+
+def _dispatch_query(execute, sql, params, many, context):
+    for observer in reversed(_query_observers.get()):
+        execute = functools.partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatch(sender=None, connection=None, **kwargs):
+    """
+    Add the observer dispatch wrapper to a connection (connection_created receiver)
+    """
+    if _dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch_query)
+
+
+connection_created.connect(install_query_dispatch, dispatch_uid='profiling_query_dispatch')
+
+
+@contextmanager
+def observe_queries(observer):
+    """
+    Pass the queries run in the current context (on any connection, from any
+    thread the context is carried to) through `observer`, an execute wrapper
+    """
+    for connection in connections.all(initialized_only=True):
+        install_query_dispatch(connection=connection)
+    token = _query_observers.set(_query_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        _query_observers.reset(token)
+
+
+def get_current_metrics():
+    """
+    Get the metrics of the request being processed, if it is being profiled
+    """
+    return _current_metrics.get()
+
+
+def _timed_data(data_property):
+    fget = data_property.fget
+
+    def data(self):
+        metrics = _current_metrics.get()
+        # Nested serializers are already counted by the outermost one
+        if metrics is None or metrics.serializing:
+            return fget(self)
+
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return fget(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializing = False
+
+    data._profiled = True
+    return property(data)
+
+
+def instrument_serializers():
+    """
+    Time serializer `.data` evaluation for requests being profiled
+    """
+    from rest_framework import serializers
+
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(serializer_class.data.fget, '_profiled', False):
+            serializer_class.data = _timed_data(serializer_class.data)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe, process-local aggregation of request metrics per view
+
+    Each worker process keeps its own registry; scrape every worker (or run a
+    single one) to get complete numbers.
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = Counter()
+            self._views = {}
+
+    def observe(self, view, method, status, record):
+        with self._lock:
+            self._requests[(view, method, str(status))] += 1
+            stats = self._views.setdefault(view, {
+                'buckets': [0] * len(self.buckets),
+                'count': 0,
+                'duration': 0.0,
+                'db': 0.0,
+                'serializer': 0.0,
+                'queries': 0,
+                'duplicate_queries': 0,
+                'response_bytes': 0,
+            })
+            for index, bound in enumerate(self.buckets):
+                if record['wall_seconds'] <= bound:
+                    stats['buckets'][index] += 1
+            stats['count'] += 1
+            stats['duration'] += record['wall_seconds']
+            stats['db'] += record['db_seconds']
+            stats['serializer'] += record['serializer_seconds']
+            stats['queries'] += record['queries']
+            stats['duplicate_queries'] += record['duplicate_queries']
+            stats['response_bytes'] += record['response_bytes']
+
+    def render(self):
+        """
+        Render the registry in the Prometheus text exposition format
+        """
+        with self._lock:
+            requests = dict(self._requests)
+            views = {view: {**stats, 'buckets': list(stats['buckets'])} for view, stats in self._views.items()}
+
+        lines = [
+            '# HELP http_requests_total Requests processed, by view, method and status.',
+            '# TYPE http_requests_total counter',
+        ]
+        for (view, method, status), count in sorted(requests.items()):
+            lines.append(
+                f'http_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}'
+            )
+
+        lines += [
+            '# HELP http_request_duration_seconds Wall time spent handling requests.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for view, stats in sorted(views.items()):
+            for bound, count in zip(self.buckets, stats['buckets']):
+                lines.append(f'http_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+            lines.append(f'http_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {stats["count"]}')
+            lines.append(f'http_request_duration_seconds_sum{{view="{view}"}} {stats["duration"]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{{view="{view}"}} {stats["count"]}')
+
+        counters = [
+            ('http_request_db_seconds_total', 'db', 'Time spent executing database queries.'),
+            ('http_request_serializer_seconds_total', 'serializer', 'Time spent evaluating serializer data.'),
+            ('http_request_queries_total', 'queries', 'Database queries executed.'),
+            ('http_request_duplicate_queries_total', 'duplicate_queries',
+             'Queries repeating a fingerprint already executed in the same request.'),
+            ('http_response_bytes_total', 'response_bytes', 'Response body bytes sent.'),
+        ]
+        for name, key, help_text in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for view, stats in sorted(views.items()):
+                value = stats[key]
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{view="{view}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def get_view_name(request):
+    """
+    Label a request by its resolved view; unresolved paths share one label
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>'
+    return match.view_name.replace('"', '')
+
+
+def is_staff_request(request):
+    """
+    Check whether the request comes from a staff user
+
+    JWT authentication normally happens inside the DRF view, so the bearer
+    token is validated here when there is no session user.
+    """
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework.exceptions import AuthenticationFailed
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return False
+    return bool(result and result[0].is_staff)
+
+
+class ProfilingMiddleware:
+    """
+    Collect per-request timing and query metrics
+
+    Disabled entirely when PROFILING_ENABLED is False.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+        self.profile_header = 'HTTP_' + getattr(settings, 'PROFILING_HEADER', 'X-Profile').upper().replace('-', '_')
+        self.profile_dir = getattr(settings, 'PROFILING_PROFILE_DIR', None)
+        if self.enabled:
+            instrument_serializers()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        profiler = None
+        if request.META.get(self.profile_header) and self.profile_dir and is_staff_request(request):
+            profiler = cProfile.Profile()
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with observe_queries(metrics):
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            _current_metrics.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - started, profiler)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        profiler = None
+        if request.META.get(self.profile_header) and self.profile_dir and await sync_to_async(is_staff_request)(request):
+            profiler = cProfile.Profile()
+
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with observe_queries(metrics):
+                # Only profiles the event loop thread
+                if profiler:
+                    profiler.enable()
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            _current_metrics.reset(token)
+        return self.record(request, response, metrics, time.perf_counter() - started, profiler)
+
+    def record(self, request, response, metrics, wall_time, profiler=None):
+        """
+        Aggregate, log and (if profiled) dump the measurements of a request
+        """
+        view = get_view_name(request)
+        if view == 'metrics':
+            return response
+
+        duplicates = metrics.duplicates()
+        record = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'wall_seconds': round(wall_time, 6),
+            'db_seconds': round(metrics.db_time, 6),
+            'serializer_seconds': round(metrics.serializer_time, 6),
+            'queries': metrics.queries,
+            'duplicate_queries': sum(count - 1 for _, count in duplicates),
+            'duplicate_fingerprints': [
+                {'sql': sql, 'count': count} for sql, count in duplicates[:5]
+            ],
+            'response_bytes': 0 if response.streaming else len(response.content),
+        }
+        registry.observe(view, request.method, response.status_code, record)
+
+        if profiler:
+            record['profile'] = self.dump_profile(profiler, view)
+            response['X-Profile-File'] = record['profile']
+
+        logger.info(json.dumps(record))
+        return response
+
+    def dump_profile(self, profiler, view):
+        """
+        Write the cProfile stats of a request to the profile directory
+        """
+        os.makedirs(self.profile_dir, exist_ok=True)
+        label = re.sub(r'[^\w.-]', '_', view)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, name))
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats('cumulative').print_stats(20)
+        logger.debug(f"Profile {name}:\n{summary.getvalue()}")
+        return name
+
+
+def metrics_view(request):
+    """
+    Expose the request metrics in Prometheus text format, followed by the
+    output of each PROFILING_METRICS_COLLECTORS function
+
+    Scrapers authenticate with `Authorization: Bearer <PROFILING_METRICS_TOKEN>`;
+    without a token configured the endpoint does not exist (404). The client
+    address is not checked: behind a proxy or tunnel every request comes
+    from localhost.
+    """
+    token = getattr(settings, 'PROFILING_METRICS_TOKEN', None)
+    if not token:
+        raise Http404
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.strip().encode(), token.encode()):
+        response = HttpResponse('Unauthorized', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    body = registry.render() + ''.join(
+        import_string(collector)() for collector in getattr(settings, 'PROFILING_METRICS_COLLECTORS', [])
+    )
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,92 @@
+"""
+orjson-backed JSON renderer and parser for the REST API
+
+ORJSONRenderer and ORJSONParser are drop-in replacements for DRF's
+JSONRenderer/JSONParser serving `application/json`. Strings, numbers, UUIDs, dicts and lists
+(including ReturnDict/ReturnList) are encoded natively by orjson; datetimes,
+dates and times go through DRF's encoder so their wire format (millisecond
+precision, 'Z' suffix) is unchanged, as do Decimals, lazy translation strings
+and querysets.
+
+Both classes fall back to the stdlib implementation when orjson is not
+installed, when orjson cannot encode the data (e.g. integers wider than 64
+bits) and for pretty-printed output (`Accept: application/json; indent=4`).
+Clients can also ask for the stdlib encoder explicitly with
+`Accept: application/json; encoder=stdlib`.
+"""
+from django.utils.http import parse_header_parameters
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# DRF escapes these so the output stays a strict JavaScript subset
+_LINE_SEPARATOR = '\u2028'.encode()
+_PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    if orjson is not None else 0
+)
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    Render `application/json` with orjson
+    """
+
+    def __init__(self):
+        self._encoder = self.encoder_class()
+
+    def use_stdlib(self, accepted_media_type, renderer_context):
+        """
+        Whether this response has to be rendered by DRF's json-module renderer
+        """
+        if orjson is None or self.ensure_ascii:
+            return True
+        if accepted_media_type and parse_header_parameters(accepted_media_type)[1].get('encoder') == 'stdlib':
+            return True
+        return self.get_indent(accepted_media_type, renderer_context or {}) is not None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.use_stdlib(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if _LINE_SEPARATOR in ret or _PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(_LINE_SEPARATOR, b'\\u2028').replace(_PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class ORJSONParser(parsers.JSONParser):
+    """
+    Parse `application/json` request bodies with orjson
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        encoding = parsers.get_encoding(parser_context or {})
+        body = stream.read()
+        if encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            try:
+                body = body.decode(encoding).encode()
+            except (LookupError, UnicodeError) as exc:
+                raise ParseError('JSON parse error - %s' % str(exc))
+
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
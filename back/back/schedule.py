@@ -0,0 +1,151 @@
+"""
+Cron-style scheduling for long-running management commands
+
+CronSchedule parses a five-field cron expression and finds its next run.
+ScheduledCommand is a BaseCommand whose run_on_schedule() calls its run()
+method at every matching time until interrupted: a run that raises is
+logged and reported, and the command waits for the next one.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+from datetime import timedelta
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CronSchedule:
+    """
+    Minimal cron-style schedule ("minute hour day-of-month month day-of-week")
+
+    Supports '*', '*/step', 'a-b', 'a-b/step' and comma separated lists.
+    Day-of-week uses 0-6 with 0 as Sunday (7 is accepted as Sunday too).
+    """
+    FIELD_RANGES = [
+        (0, 59),   # minute
+        (0, 23),   # hour
+        (1, 31),   # day of month
+        (1, 12),   # month
+        (0, 7),    # day of week
+    ]
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression must have 5 fields, got {len(parts)}: '{expression}'")
+
+        self.expression = expression
+        values = [
+            self._parse_field(part, low, high)
+            for part, (low, high) in zip(parts, self.FIELD_RANGES)
+        ]
+        self.minutes, self.hours, self.days, self.months, weekdays = values
+        self.weekdays = {day % 7 for day in weekdays}
+
+        # Standard cron semantics: if both day fields are restricted, either may match
+        self.days_restricted = parts[2] != '*'
+        self.weekdays_restricted = parts[4] != '*'
+
+    def __str__(self):
+        return self.expression
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for item in field.split(','):
+            step = 1
+            if '/' in item:
+                item, step_str = item.split('/', 1)
+                step = int(step_str)
+                if step < 1:
+                    raise ValueError(f"Invalid step in cron field '{field}'")
+
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start_str, end_str = item.split('-', 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = end = int(item)
+
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field '{field}' out of range {low}-{high}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _matches_day(self, moment):
+        if moment.month not in self.months:
+            return False
+
+        day_match = moment.day in self.days
+        # Python weekday() is Monday=0, cron is Sunday=0
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+
+        if self.days_restricted and self.weekdays_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def next_run(self, after):
+        """
+        Return the first datetime strictly after `after` matching the schedule
+        """
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+        # Scan at most a little over four years of days (covers Feb 29 schedules)
+        for _ in range(366 * 4 + 1):
+            if self._matches_day(moment):
+                for hour in sorted(self.hours):
+                    if hour < moment.hour:
+                        continue
+                    for minute in sorted(self.minutes):
+                        if hour == moment.hour and minute < moment.minute:
+                            continue
+                        return moment.replace(hour=hour, minute=minute)
+            moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
+
+
+class ScheduledCommand(BaseCommand):
+    """
+    Management command that can run its work on a cron schedule
+
+    Subclasses implement run(), which does one run and reports it.
+    """
+
+    def run(self):
+        raise NotImplementedError("Subclasses of ScheduledCommand must implement run()")
+
+    def run_on_schedule(self, expression, name):
+        """
+        Call run() at every time matching the cron `expression` until
+        interrupted; `name` labels the command's output
+        """
+        try:
+            schedule = CronSchedule(expression)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{name} started with schedule '{schedule}'")
+        try:
+            while True:
+                next_run = schedule.next_run(timezone.localtime())
+                self.stdout.write(f"Next run at {next_run.isoformat()}")
+
+                delay = (next_run - timezone.localtime()).total_seconds()
+                if delay > 0:
+                    time.sleep(delay)
+                try:
+                    # Long-running process: don't reuse connections the server has dropped
+                    close_old_connections()
+                    self.run()
+                except Exception as e:
+                    # One failed run must not stop the schedule
+                    logger.exception(f"{name} run failed")
+                    self.stderr.write(f"{timezone.localtime().isoformat()} run failed: {e}")
+                finally:
+                    close_old_connections()
+        except KeyboardInterrupt:
+            self.stdout.write(f"{name} stopped")
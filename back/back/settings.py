@@ -11,9 +11,13 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from datetime import timedelta
 
+from back.caching import build_caches
+from back.db_routing import build_replicas
+
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,10 +51,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'back.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'back.db_routing.ReplicaRoutingMiddleware',
+    'back.profiling.ProfilingMiddleware',
+    'back.throttling.RateLimitHeadersMiddleware',
+    'back.nplusone.NPlusOneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -86,6 +95,15 @@ DATABASES = {
     }
 }
 
+# Read replicas (see back.db_routing); comma-separated database names, SQLite files
+# locally (e.g. db.replica.sqlite3, filled by `manage.py sync_replicas`)
+DATABASE_REPLICA_NAMES = [name for name in os.environ.get('DATABASE_REPLICA_NAMES', '').split(',') if name]
+DATABASES.update(build_replicas(DATABASES['default'], DATABASE_REPLICA_NAMES))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['back.db_routing.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10  # After a write the client reads from the primary this long; above the replica lag
+REPLICA_PIN_COOKIE = 'db_primary'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -105,28 +123,62 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (see accounts.hashers); pick costs with `manage.py tune_password_hasher`
+# Argon2 is preferred when argon2-cffi is installed; other stored hashes are upgraded on login
+PASSWORD_HASHERS = [
+    'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if importlib.util.find_spec('argon2') is not None:
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(2))
+PASSWORD_ARGON2_TIME_COST = 2
+PASSWORD_ARGON2_MEMORY_COST = 102400  # KiB
+PASSWORD_ARGON2_PARALLELISM = 8
+PASSWORD_PBKDF2_ITERATIONS = 1000000
+PASSWORD_HASHING_WORKERS = 2  # Threads hashing passwords; keep below the CPU count
+PASSWORD_HASHING_QUEUE_SIZE = 32  # Hashing jobs allowed to wait; more get a 503
+PASSWORD_HASHING_TIMEOUT = 10  # Seconds a request waits for its hash
+
+# Email verification and password reset codes (see accounts.codes); kept in the cache only
+OTP_CODE_TTL = 900  # Seconds a code stays valid
+OTP_MAX_ATTEMPTS = 5  # Checks allowed per code before it is discarded
+OTP_ISSUE_LIMIT = 5  # Codes per email and purpose within OTP_ISSUE_WINDOW
+OTP_ISSUE_WINDOW = 3600  # Seconds
+
 
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'back.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'back.renderers.ORJSONRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'back.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
     'EXCEPTION_HANDLER': 'rest_framework.views.exception_handler',
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'back.throttling.TokenBucketThrottle'
     ],
+    # Scopes of back.throttling.TokenBucketThrottle
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/day',
-        'user': '1000/day'
+        'user': '1000/day',
+        'read': '300/min',
+        'login': '5/min',
+        'register': '10/hour',
+        'password_reset': '5/hour'
     }
 }
 
@@ -176,6 +228,13 @@ INSTALLED_APPS += [
     'rest_framework_simplejwt.token_blacklist',
 ]
 
+# Refresh-token revocation (see accounts.revocation)
+REVOCATION_BLOOM_ERROR_RATE = 0.001  # Share of valid tokens still checked against the blacklist table
+REVOCATION_BLOOM_MIN_CAPACITY = 10000  # JTIs the filter is sized for at least
+REVOCATION_BLOOM_REBUILD_INTERVAL = 300  # Seconds; rebuilds drop expired JTIs
+TOKEN_PURGE_SCHEDULE = '30 3 * * *'  # Cron expression used by `purge_expired_tokens --schedule`
+TOKEN_PURGE_BATCH_SIZE = 1000  # Expired tokens deleted per transaction
+
 # CORS settings (if using CORS)
 CORS_ALLOW_CREDENTIALS = True
 # CORS_ALLOWED_ORIGINS = [
@@ -186,6 +245,73 @@ CORS_ALLOW_CREDENTIALS = True
 
 
 
+# Milestone notifications
+# PROJECT_NOTIFICATION_EMAIL (staff inbox) is optional; clients always get their own digest
+MILESTONE_NOTIFICATION_SCHEDULE = '0 8 * * *'  # Cron expression used by run_milestone_scheduler
+MILESTONE_DUE_SOON_DAYS = 2
+MILESTONE_NOTIFICATION_BATCH_SIZE = 50  # Messages sent per SMTP batch
+MILESTONE_NOTIFICATION_SHARDS = 1  # > 1 fans digests out over a process pool
+MILESTONE_NOTIFICATION_WORKERS = None  # Pool size for sharded runs (None = CPU count)
+MILESTONE_BATCH_LIMIT = 500  # Milestones per batch completion request
+
+
+
+# Performance budgets enforced by `manage.py benchmark_api`
+# Limits: queries, p50_ms, p99_ms, peak_memory_kb; per-route entries override the default
+BENCHMARK_BUDGETS = {
+    'default': {
+        'queries': 50,
+        'p99_ms': 1000,
+    },
+    'routes': {
+        # Three grouped queries whatever the number of clients
+        'projects:project-statistics-by-client': {'queries': 3},
+    },
+}
+
+
+
+# Request profiling (back.profiling.ProfilingMiddleware)
+# Metrics are served in Prometheus format at /metrics; per-request records go to PROFILING_LOG_FILE
+PROFILING_ENABLED = True
+PROFILING_METRICS_TOKEN = os.environ.get('PROFILING_METRICS_TOKEN')  # Bearer token scrapers send to /metrics; unset disables it
+PROFILING_METRICS_COLLECTORS = ['back.caching.render_metrics', 'back.throttling.render_metrics']  # Extra Prometheus text appended to /metrics
+PROFILING_HEADER = 'X-Profile'  # Staff requests sending this header are run under cProfile
+PROFILING_LOG_DIR = os.path.join(BASE_DIR, 'logs')
+PROFILING_LOG_FILE = os.path.join(PROFILING_LOG_DIR, 'profiling.log')
+PROFILING_PROFILE_DIR = os.path.join(PROFILING_LOG_DIR, 'profiles')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'profiling_file': {
+            'class': 'back.profiling.RotatingLogFileHandler',  # Creates PROFILING_LOG_DIR on first write
+            'filename': PROFILING_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+        },
+    },
+    'loggers': {
+        'back.profiling': {
+            'handlers': ['profiling_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
+
+# N+1 query detection (back.nplusone.NPlusOneMiddleware)
+NPLUSONE_MODE = 'log'  # 'raise' (set by the test runner), 'log' (sampled) or 'off'
+NPLUSONE_THRESHOLD = 5  # Repeats of one query from one call site allowed per request
+NPLUSONE_SAMPLE_RATE = 0.05  # Fraction of requests checked in 'log' mode
+
+TEST_RUNNER = 'back.test_runner.TestRunner'
+
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
@@ -245,3 +371,17 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 
+# Caches (see back.caching); one URL configures the default, throttle and payloads caches
+# redis://host:6379/0, memcached://host:11211, sqlite:///path (shared by local processes), file:///dir, locmem://
+CACHE_URL = os.environ.get('CACHE_URL', f"sqlite:///{BASE_DIR / 'cache' / 'cache.sqlite3'}")
+CACHE_KEY_PREFIX = 'back'
+CACHE_VERSION = 1  # Bump to invalidate every cached entry
+CACHES = build_caches(CACHE_URL, key_prefix=CACHE_KEY_PREFIX, version=CACHE_VERSION)
+TEST_CACHE_URL = 'locmem://'  # Replaces CACHE_URL under the test runner (back.test_runner)
+SESSION_CACHE_ALIAS = 'throttle'  # Used if SESSION_ENGINE is switched to a cache backend
+
+# Response compression (see back.compression)
+COMPRESSION_ENCODINGS = ('zstd', 'br', 'gzip')  # Preference order; zstd/br need zstandard/brotli installed
+COMPRESSION_MIN_SIZE = 1024  # Bytes; smaller bodies are sent uncompressed
+COMPRESSION_CONTENT_TYPES = ('application/json', 'text/')  # Exact types, or prefixes ending in '/'
+PRECOMPRESSED_CACHE_TIMEOUT = 60  # Seconds cached_json_response() keeps dashboard data and summaries
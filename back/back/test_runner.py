@@ -0,0 +1,28 @@
+"""
+Test runner
+
+Runs the suite with N+1 query detection raising (see back.nplusone) and with
+every cache alias built from TEST_CACHE_URL, so tests never share cached
+data, throttle counters or cache files with a development server.
+"""
+from django.conf import settings
+from django.test.utils import override_settings
+
+from .caching import build_caches
+from .nplusone import NPlusOneTestRunner
+
+
+class TestRunner(NPlusOneTestRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_settings = override_settings(CACHES=build_caches(
+            getattr(settings, 'TEST_CACHE_URL', 'locmem://'),
+            key_prefix=getattr(settings, 'CACHE_KEY_PREFIX', ''),
+            version=getattr(settings, 'CACHE_VERSION', 1),
+        ))
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
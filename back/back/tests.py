@@ -0,0 +1,185 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.test.client import RequestFactory
+from rest_framework.test import APIRequestFactory
+from types import SimpleNamespace
+
+from .db_routing import ReplicaRouter, ReplicaRoutingMiddleware, use_replica
+from .throttling import RateLimitHeadersMiddleware, TokenBucketThrottle, stats
+
+
+class MetricsViewTests(TestCase):
+    """/metrics is only served to scrapers sending the bearer token"""
+
+    @override_settings(PROFILING_METRICS_TOKEN='s3cret')
+    def test_scrape_with_token(self):
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer s3cret'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn(b'cache_requests_total', response.content)
+
+    @override_settings(PROFILING_METRICS_TOKEN='s3cret')
+    def test_scrape_without_token(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+    @override_settings(PROFILING_METRICS_TOKEN='s3cret')
+    def test_scrape_with_wrong_token(self):
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer guess'})
+
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(PROFILING_METRICS_TOKEN=None)
+    def test_disabled_without_configured_token(self):
+        response = self.client.get(reverse('metrics'), headers={'Authorization': 'Bearer '})
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], 'read': '3/m', 'anon': '1/m'},
+})
+class TokenBucketThrottleTests(SimpleTestCase):
+    """GCRA buckets drain per request and refill one token per interval"""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        stats.reset()
+        self.now = 1000.0
+
+    def request(self, method='get', ip='10.0.0.1'):
+        request = getattr(APIRequestFactory(), method)('/', REMOTE_ADDR=ip)
+        throttle = TokenBucketThrottle()
+        throttle.timer = lambda: self.now
+        return throttle.allow_request(request, view=None), throttle, request
+
+    def test_burst_then_throttled(self):
+        allowed = [self.request()[0] for _ in range(3)]
+        denied, throttle, request = self.request()
+
+        self.assertEqual(allowed, [True, True, True])
+        self.assertFalse(denied)
+        self.assertAlmostEqual(throttle.wait(), 20)
+        self.assertEqual(request.rate_limit['remaining'], 0)
+
+    def test_refills_one_token_per_interval(self):
+        for _ in range(3):
+            self.request()
+
+        self.now += 20
+        self.assertTrue(self.request()[0])
+        self.assertFalse(self.request()[0])
+
+        self.now += 60
+        self.assertEqual([self.request()[0] for _ in range(4)], [True, True, True, False])
+
+    def test_clients_and_scopes_have_separate_buckets(self):
+        for _ in range(3):
+            self.request()
+
+        self.assertTrue(self.request(ip='10.0.0.2')[0])
+        # Unsafe anonymous requests fall under the 'anon' scope
+        self.assertTrue(self.request(method='post')[0])
+        self.assertFalse(self.request(method='post')[0])
+        self.assertEqual(stats.snapshot()[('anon', 'throttled')], 1)
+
+    def test_rate_limit_headers(self):
+        _, _, request = self.request()
+        response = RateLimitHeadersMiddleware(lambda request: HttpResponse())(request)
+
+        self.assertEqual(response['RateLimit-Limit'], '3')
+        self.assertEqual(response['RateLimit-Remaining'], '2')
+        self.assertEqual(response['RateLimit-Reset'], '20')
+        self.assertEqual(response['RateLimit-Policy'], '3;w=60')
+
+    def test_unthrottled_response_has_no_headers(self):
+        request = APIRequestFactory().get('/')
+        response = RateLimitHeadersMiddleware(lambda request: HttpResponse())(request)
+
+        self.assertFalse(response.has_header('RateLimit-Limit'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_PIN_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Opted-in reads go to a replica until the client writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+        self.user = SimpleNamespace(pk=1, is_authenticated=True)
+
+    def handle(self, request, view, status=200):
+        """
+        Run `view` inside ReplicaRoutingMiddleware; returns (view result, response)
+        """
+        result = {}
+
+        def get_response(request):
+            result['value'] = view(request)
+            return HttpResponse(status=status)
+
+        response = ReplicaRoutingMiddleware(get_response)(request)
+        return result['value'], response
+
+    def read_after_use_replica(self, request):
+        use_replica(request)
+        return self.router.db_for_read(None)
+
+    def test_safe_request_reads_from_replica(self):
+        alias, _ = self.handle(RequestFactory().get('/'), self.read_after_use_replica)
+
+        self.assertEqual(alias, 'replica_1')
+
+    def test_reads_stay_on_primary_without_opt_in(self):
+        alias, _ = self.handle(RequestFactory().get('/'), lambda request: self.router.db_for_read(None))
+
+        self.assertIsNone(alias)
+
+    def test_unsafe_request_reads_from_primary(self):
+        alias, _ = self.handle(RequestFactory().post('/'), self.read_after_use_replica)
+
+        self.assertIsNone(alias)
+
+    def test_write_moves_request_reads_to_primary_and_pins_client(self):
+        request = RequestFactory().post('/')
+        request.user = self.user
+
+        def write_then_read(request):
+            use_replica(request)
+            self.router.db_for_write(None)
+            return self.router.db_for_read(None)
+
+        alias, response = self.handle(request, write_then_read)
+
+        self.assertIsNone(alias)
+        self.assertEqual(response.cookies['db_primary']['max-age'], 10)
+
+        # Pinned by cookie, and by user for clients that drop cookies
+        request = RequestFactory().get('/')
+        request.COOKIES['db_primary'] = '1'
+        self.assertIsNone(self.handle(request, self.read_after_use_replica)[0])
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertIsNone(self.handle(request, self.read_after_use_replica)[0])
+
+    def test_failed_write_does_not_pin(self):
+        request = RequestFactory().post('/')
+        request.user = self.user
+
+        _, response = self.handle(request, lambda request: self.router.db_for_write(None), status=400)
+
+        self.assertNotIn('db_primary', response.cookies)
+        request = RequestFactory().get('/')
+        request.user = self.user
+        self.assertEqual(self.handle(request, self.read_after_use_replica)[0], 'replica_1')
+
+    def test_routing_outside_a_request(self):
+        self.assertIsNone(self.router.db_for_read(None))
+        self.assertEqual(self.router.db_for_write(None), 'default')
@@ -0,0 +1,217 @@
+"""
+Token-bucket throttling in the shared 'throttle' cache (see back.caching)
+
+TokenBucketThrottle implements the generic cell rate algorithm (GCRA): a
+rate of N/period is a bucket of N requests refilled at one request every
+period/N seconds. The only state per client and scope is the bucket's
+"theoretical arrival time", a float stored under one cache key and updated
+with the cache's atomic update(), so concurrent requests in any process
+cannot both take the last token. (DRF's SimpleRateThrottle stores the
+timestamp of every request in the window and rewrites the whole list each
+time.)
+
+Each request is throttled under one scope, with the rate from
+DEFAULT_THROTTLE_RATES:
+
+- the scope set with @throttle_scope() on a function view, or a view's
+  `throttle_scope` attribute;
+- else 'read' for GET/HEAD/OPTIONS requests;
+- else 'user' for authenticated requests, 'anon' for the others.
+
+Clients are identified by user id when authenticated, else by IP address.
+The remaining allowance of the request is sent in RateLimit-* headers
+(RateLimitHeadersMiddleware), and decisions are counted per scope for the
+metrics endpoint (render_metrics, in PROFILING_METRICS_COLLECTORS).
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.connection import ConnectionProxy
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+from collections import Counter
+import math
+import threading
+import time
+
+throttle_cache = ConnectionProxy(caches, 'throttle')
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class ThrottleStats:
+    """
+    Thread-safe, process-local counts of throttle decisions per scope
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def record(self, scope, allowed):
+        with self._lock:
+            self._counts[(scope, 'allowed' if allowed else 'throttled')] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = ThrottleStats()
+
+
+def render_metrics():
+    """
+    Render the throttle decision counts in the Prometheus text exposition format
+    """
+    lines = [
+        '# HELP throttle_decisions_total Throttle decisions, by scope and result.',
+        '# TYPE throttle_decisions_total counter',
+    ]
+    for (scope, result), count in sorted(stats.snapshot().items()):
+        lines.append(f'throttle_decisions_total{{scope="{scope}",result="{result}"}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def parse_rate(rate):
+    """
+    Parse '<requests>/<period>' (period s, m, h or d, e.g. '5/min') into
+    (requests, seconds), or None for no limit
+    """
+    if rate is None:
+        return None
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    GCRA throttle; see the module docstring
+    """
+    scope = None  # Fixed scope; resolved per request when None
+    cache = throttle_cache
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+    timer = time.time
+
+    def get_scope(self, request, view):
+        if self.scope:
+            return self.scope
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        if request.method in SAFE_METHODS:
+            return 'read'
+        user = getattr(request, 'user', None)
+        return 'user' if user is not None and user.is_authenticated else 'anon'
+
+    def get_rate(self, scope):
+        try:
+            return parse_rate(api_settings.DEFAULT_THROTTLE_RATES[scope])
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{scope}' scope")
+
+    def get_cache_key(self, request, scope):
+        user = getattr(request, 'user', None)
+        ident = user.pk if user is not None and user.is_authenticated else self.get_ident(request)
+        return self.cache_format % {'scope': scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = self.get_scope(request, view)
+        rate = self.get_rate(scope)
+        if rate is None:
+            return True
+
+        limit, period = rate
+        interval = period / limit
+        now = self.timer()
+        decision = {}
+
+        def take(arrival):
+            # The bucket is empty when one more request would put the
+            # arrival time more than a period ahead
+            arrival = max(arrival or now, now)
+            decision['allowed'] = arrival + interval - now <= period
+            if decision['allowed']:
+                arrival += interval
+            decision['arrival'] = arrival
+            return arrival
+
+        # Past `period` seconds without requests the bucket is full again,
+        # so the key can expire then
+        self.cache.update(self.get_cache_key(request, scope), take, period)
+
+        allowed, arrival = decision['allowed'], decision['arrival']
+        if not allowed:
+            self.wait_time = arrival + interval - period - now
+        stats.record(scope, allowed)
+        record_rate_limit(request, {
+            'limit': limit,
+            'period': period,
+            'remaining': max(0, math.floor((now + period - arrival) / interval + 1e-9)),
+            'reset': math.ceil(arrival - now),
+        })
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+def record_rate_limit(request, rate_limit):
+    """
+    Keep the tightest rate limit applied to the request, for the headers
+    """
+    # DRF's Request proxies reads, not writes, to the HttpRequest
+    request = getattr(request, '_request', request)
+    current = getattr(request, 'rate_limit', None)
+    if current is None or rate_limit['remaining'] < current['remaining']:
+        request.rate_limit = rate_limit
+
+
+def throttle_scope(scope):
+    """
+    Throttle a function view under `scope` (use below @api_view, like
+    DRF's @throttle_classes)
+    """
+    throttle_class = type('TokenBucketThrottle', (TokenBucketThrottle,), {'scope': scope})
+
+    def decorator(func):
+        func.throttle_classes = [throttle_class]
+        return func
+    return decorator
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Send the rate limit of throttled requests in RateLimit-* headers
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            response['RateLimit-Limit'] = str(rate_limit['limit'])
+            response['RateLimit-Remaining'] = str(rate_limit['remaining'])
+            response['RateLimit-Reset'] = str(rate_limit['reset'])
+            response['RateLimit-Policy'] = f"{rate_limit['limit']};w={rate_limit['period']}"
+        return response
@@ -3,11 +3,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .profiling import metrics_view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls', namespace='accounts')),
     path('api/projects/', include('projects.urls', namespace='projects')),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # Serve static and media files in development
@@ -9,6 +9,7 @@ from .models import (
     DashboardPackage, MediaPackage, SalesPackage, Documentation,
     ProjectApplication, ProjectMilestone
 )
+from .milestones import complete_milestones
 
 
 class ProjectMilestoneInline(admin.TabularInline):
@@ -213,10 +214,8 @@ class ProjectMilestoneAdmin(admin.ModelAdmin):
     
     def mark_completed(self, request, queryset):
         """Mark selected milestones as completed"""
-        from django.utils import timezone
-        for milestone in queryset:
-            milestone.mark_completed()
-        self.message_user(request, _(f"{queryset.count()} milestones marked as completed."))
+        completed = complete_milestones(queryset)
+        self.message_user(request, _(f"{len(completed)} milestones marked as completed."))
     mark_completed.short_description = _("Mark selected milestones as completed")
     
     def mark_incomplete(self, request, queryset):
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .search import connect_search_signals, ensure_search_index
+        from .conditional import connect_revision_signals
+
+        # Search index and ETag revision receivers; projects.signals is not connected
+        connect_search_signals()
+        connect_revision_signals()
+        post_migrate.connect(ensure_search_index, sender=self)
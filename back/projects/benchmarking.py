@@ -0,0 +1,214 @@
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import get_resolver, reverse
+from urllib.parse import urlencode
+import statistics
+import time
+import tracemalloc
+
+ROUTE_NAMESPACES = ('accounts', 'projects')
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete')
+
+# Non-GET routes that are safe to replay against the benchmark database.
+# Maps route name to (method, name of the request body builder in the fixtures).
+REPLAYABLE_REQUESTS = {
+    'accounts:login': ('post', 'login'),
+    'accounts:refresh_token': ('post', 'refresh_token'),
+    'accounts:validate_token': ('post', 'validate_token'),
+    'accounts:check_permission': ('post', 'check_permission'),
+}
+
+
+def _walk_patterns(patterns, namespace=None):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            yield from _walk_patterns(pattern.url_patterns, pattern.namespace or namespace)
+        else:
+            yield namespace, pattern
+
+
+def get_view_methods(callback):
+    """
+    Get the HTTP methods a resolved view callback accepts
+
+    Returns an empty list for plain function views, whose methods cannot be
+    told without calling them.
+    """
+    actions = getattr(callback, 'actions', None)
+    if actions:
+        return sorted(actions)
+
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    if view_class is None:
+        return []
+    return [
+        method for method in HTTP_METHODS
+        if method in view_class.http_method_names and hasattr(view_class, method)
+    ]
+
+
+def discover_routes(namespaces=ROUTE_NAMESPACES):
+    """
+    List the named routes of the given URL namespaces
+
+    Format-suffix duplicates added by the DRF router are skipped.
+    Returns a list of dictionaries with name, methods and URL kwargs.
+    """
+    routes = []
+    seen = set()
+    for namespace, pattern in _walk_patterns(get_resolver().url_patterns):
+        if namespace not in namespaces or not pattern.name:
+            continue
+
+        kwargs = list(pattern.pattern.regex.groupindex)
+        if 'format' in kwargs:
+            continue
+
+        name = f'{namespace}:{pattern.name}'
+        if name in seen:
+            continue
+        seen.add(name)
+
+        routes.append({
+            'name': name,
+            'methods': get_view_methods(pattern.callback),
+            'kwargs': kwargs,
+        })
+    return routes
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a list of samples
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure_route(client, method, url, data=None, iterations=20, warmup=1):
+    """
+    Measure query count, latency and peak memory for one request
+
+    Latency samples are taken without tracemalloc running; peak memory comes
+    from one extra traced request.
+    Returns a dictionary of measurements.
+    """
+    request = getattr(client, method)
+    kwargs = {'data': data, 'format': 'json'} if data is not None else {}
+
+    for _ in range(warmup):
+        request(url, **kwargs)
+
+    latencies = []
+    query_counts = []
+    status_code = None
+    response_bytes = 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request(url, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+        status_code = response.status_code
+        response_bytes = len(getattr(response, 'content', b'') or b'')
+
+    tracemalloc.start()
+    try:
+        request(url, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'method': method.upper(),
+        'url': url,
+        'status': status_code,
+        'iterations': iterations,
+        'queries': max(query_counts),
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'peak_memory_kb': round(peak / 1024, 1),
+        'response_bytes': response_bytes,
+    }
+
+
+def measure_callable(func, iterations=20, warmup=1):
+    """
+    Measure the latency of a callable taking no arguments
+
+    Returns a dictionary with p50_ms and p99_ms.
+    """
+    for _ in range(warmup):
+        func()
+
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'iterations': iterations,
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+    }
+
+
+def route_url(route, lookups, query_params=None):
+    """
+    Build the URL for a route
+
+    `lookups` is a list of (route name prefix, kwargs) pairs; the first prefix
+    matching the route and providing all of its kwargs is used.
+    `query_params` maps route names to the query string parameters they need.
+    Returns None when the route's kwargs cannot be filled.
+    """
+    if not route['kwargs']:
+        url = reverse(route['name'])
+    else:
+        for prefix, kwargs in lookups:
+            if route['name'].startswith(prefix) and set(route['kwargs']) <= set(kwargs):
+                url = reverse(
+                    route['name'], kwargs={kwarg: kwargs[kwarg] for kwarg in route['kwargs']}
+                )
+                break
+        else:
+            return None
+
+    params = (query_params or {}).get(route['name'])
+    if params:
+        url = f'{url}?{urlencode(params)}'
+    return url
+
+
+def check_budgets(results, budgets):
+    """
+    Compare results with the configured budgets
+
+    Budgets have a 'default' entry and optional per-route overrides under
+    'routes', each limiting any of queries, p50_ms, p99_ms, peak_memory_kb.
+    A route answering with a non-2xx status is a violation whatever its
+    measurements: an error response is usually cheaper than the real one.
+    Returns a list of human readable violations.
+    """
+    defaults = budgets.get('default', {})
+    overrides = budgets.get('routes', {})
+    violations = []
+
+    for result in results:
+        if result.get('skipped'):
+            continue
+        if not 200 <= result['status'] < 300:
+            violations.append(f"{result['route']} {result['method']}: status {result['status']} is not 2xx")
+            continue
+        limits = {**defaults, **overrides.get(result['route'], {})}
+        for metric, limit in limits.items():
+            value = result.get(metric)
+            if value is not None and value > limit:
+                violations.append(
+                    f"{result['route']} {result['method']}: {metric}={value} exceeds budget {limit}"
+                )
+    return violations
@@ -0,0 +1,180 @@
+"""
+Conditional requests (ETag / If-None-Match / If-Match) for project resources
+
+A project's version stamp is its updated_date plus `revision`, a counter bumped
+by post_save/post_delete receivers on every child object (packages,
+documentation, milestones, page designs, applications). The stamp is read with
+one small query, so unchanged resources are answered with 304 before any
+object is loaded or serialized, and stale If-Match writes get 412.
+
+The current day is part of the ETag because the project payloads contain
+date-relative fields (days_active, has_overdue_milestones, ...). Changes to
+the nested client or applicant users do not change the stamp.
+
+CompressionMiddleware sends compressed responses with the weak form of the
+tag (W/"..."). Both forms name the same version stamp, so If-Match accepts
+either (see strip_weak_if_match).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_etags, quote_etag
+from django.core.exceptions import ValidationError
+import hashlib
+
+REVISION_SOURCES = (
+    'BrandingPackage', 'FrontEndPackage', 'BackEndPackage', 'DashboardPackage',
+    'MediaPackage', 'SalesPackage', 'Documentation', 'PageDesign',
+    'ProjectApplication', 'ProjectMilestone',
+)
+
+
+def bump_project_revision(project_ids):
+    """
+    Increment the revision of the given projects in a single UPDATE
+    """
+    from .models import Project
+
+    return Project.objects.filter(pk__in=project_ids).update(revision=F('revision') + 1)
+
+
+_receivers_suspended = ContextVar('revision_receivers_suspended', default=False)
+
+
+@contextmanager
+def revision_receivers_suspended():
+    """
+    Skip the per-object revision receivers, for bulk operations that bump
+    each touched project once themselves
+    """
+    token = _receivers_suspended.set(True)
+    try:
+        yield
+    finally:
+        _receivers_suspended.reset(token)
+
+
+def bump_revision_receiver(sender, instance, raw=False, **kwargs):
+    if not raw and instance.project_id and not _receivers_suspended.get():
+        bump_project_revision([instance.project_id])
+
+
+def connect_revision_signals():
+    from django.apps import apps
+
+    for model_name in REVISION_SOURCES:
+        model = apps.get_model('projects', model_name)
+        post_save.connect(bump_revision_receiver, sender=model, dispatch_uid=f'revision_save_{model_name}')
+        post_delete.connect(bump_revision_receiver, sender=model, dispatch_uid=f'revision_delete_{model_name}')
+
+
+def make_etag(project_id, updated_date, revision):
+    """
+    Build the quoted ETag for a project version stamp
+    """
+    stamp = f"{project_id}:{updated_date.isoformat()}:{revision}:{timezone.now().date().isoformat()}"
+    return quote_etag(hashlib.blake2b(stamp.encode(), digest_size=12).hexdigest())
+
+
+def strip_weak_if_match(request):
+    """
+    Turn the weak tags of the request's If-Match header into strong ones, so
+    the strong comparison of get_conditional_response() matches them
+    """
+    if_match = request.META.get('HTTP_IF_MATCH')
+    if if_match:
+        request.META['HTTP_IF_MATCH'] = ', '.join(tag.removeprefix('W/') for tag in parse_etags(if_match))
+
+
+class ConditionalProjectMixin:
+    """
+    ETag support for views whose object belongs to a single project
+
+    `etag_project_path` is the lookup path from the view's model to its Project
+    ('' when the model is Project itself). Wrap handlers with
+    conditional_response().
+    """
+    etag_project_path = ''
+
+    def get_stamps(self, lock=False):
+        """
+        Get the version stamp query of the requested object, as
+        (pk, updated_date, revision) rows
+        """
+        prefix = f'{self.etag_project_path}__' if self.etag_project_path else ''
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().order_by().filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        if lock:
+            queryset = queryset.select_for_update()
+        return queryset.values_list(f'{prefix}pk', f'{prefix}updated_date', f'{prefix}revision')
+
+    def get_etag(self, lock=False):
+        """
+        Get the current ETag of the requested object, or None if it is not
+        visible to the user (the normal handler then produces the 404)
+        """
+        try:
+            stamp = self.get_stamps(lock).first()
+        except (TypeError, ValueError, ValidationError):
+            return None
+        return make_etag(*stamp) if stamp else None
+
+    async def aget_etag(self):
+        """
+        Async get_etag(), for reads in async views
+        """
+        try:
+            stamp = await self.get_stamps().afirst()
+        except (TypeError, ValueError, ValidationError):
+            return None
+        return make_etag(*stamp) if stamp else None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        """
+        Answer 304 (If-None-Match) or 412 (If-Match) from the version stamp,
+        otherwise run the handler and attach the resulting ETag
+        """
+        if request.method in ('GET', 'HEAD'):
+            etag = self.get_etag()
+            if etag is not None:
+                response = get_conditional_response(request, etag=etag)
+                if response is not None:
+                    return response
+            response = handler(request, *args, **kwargs)
+        else:
+            strip_weak_if_match(request)
+            # Hold the row between the If-Match check and the write
+            with transaction.atomic():
+                etag = self.get_etag(lock=True)
+                if etag is not None:
+                    response = get_conditional_response(request, etag=etag)
+                    if response is not None:
+                        return response
+                response = handler(request, *args, **kwargs)
+            etag = self.get_etag()
+
+        if etag is not None and 200 <= response.status_code < 300:
+            response['ETag'] = etag
+        return response
+
+    async def aconditional_response(self, handler, request, *args, **kwargs):
+        """
+        conditional_response() for reads in async views; `handler` is a
+        coroutine function
+        """
+        etag = await self.aget_etag()
+        if etag is not None:
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+        response = await handler(request, *args, **kwargs)
+
+        if etag is not None and 200 <= response.status_code < 300:
+            response['ETag'] = etag
+        return response
@@ -0,0 +1,217 @@
+"""
+Compiled read-only list serializers
+
+A CompiledListSerializer turns the field set of a DRF list serializer into a
+flat projection: the model fields it reads become one `.values()` query, and
+each output field becomes a precomputed converter, so no model instances are
+built and no per-field serializer machinery runs. Plain model fields reuse the
+bound DRF field's to_representation, so they format exactly like the source
+serializer; SerializerMethodFields have no generic equivalent and are declared
+in `computed` as functions of the row.
+
+The output must stay identical to the source serializer; projects/tests.py
+checks that for every compiled serializer.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+from rest_framework.response import Response
+
+from accounts.models import Role
+from .models import ProjectMilestone
+from .serializers import (
+    ProjectListSerializer, ProjectMilestoneListSerializer, ProjectApplicationListSerializer
+)
+
+ROLE_LABELS = dict(Role.ROLE_CHOICES)
+
+
+def _identity(value):
+    return value
+
+
+def full_name(first_name, last_name):
+    """Same as CustomUser.get_full_name()"""
+    return f"{first_name} {last_name}".strip()
+
+
+def role_display(name):
+    """Same as Role.get_name_display(); None when the user has no profile or role"""
+    if not name:
+        return None
+    return str(ROLE_LABELS.get(name, name))
+
+
+class CompiledListSerializer:
+    """
+    Read-only serializer producing the output of `serializer_class` from
+    `.values()` rows
+
+    Subclasses set `serializer_class`, may add queryset `annotations`, and map
+    every SerializerMethodField name in `computed` to (lookups, function); the
+    function is called as function(row, now) with the row dictionary and the
+    current time.
+
+    Usage mirrors DRF: prepare the queryset with get_rows(), paginate it, then
+    CompiledProjectListSerializer(page).data.
+    """
+    serializer_class = None
+    annotations = {}
+    computed = {}
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def compile(cls):
+        """
+        Get (lookups, fields) for the serializer class, where fields is a list
+        of (output name, row key, converter) and converter None marks a
+        computed field whose row key is its function
+        """
+        if '_compiled' in cls.__dict__:
+            return cls._compiled
+
+        lookups = list(cls.annotations)
+        fields = []
+        for name, field in cls.serializer_class().fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in cls.computed:
+                    raise ImproperlyConfigured(
+                        f"{cls.__name__} has no computed entry for method field '{name}'"
+                    )
+                field_lookups, function = cls.computed[name]
+                lookups.extend(field_lookups)
+                fields.append((name, function, None))
+                continue
+
+            lookup = '__'.join(field.source_attrs)
+            lookups.append(lookup)
+            if isinstance(field, (RelatedField, serializers.ReadOnlyField)):
+                # values() already returns the primary key / raw value
+                fields.append((name, lookup, _identity))
+            else:
+                fields.append((name, lookup, field.to_representation))
+
+        cls._compiled = (list(dict.fromkeys(lookups)), fields)
+        return cls._compiled
+
+    @classmethod
+    def get_rows(cls, queryset):
+        """
+        Get the values() queryset holding everything the fields need
+        """
+        lookups, _ = cls.compile()
+        if cls.annotations:
+            queryset = queryset.annotate(**cls.annotations)
+        return queryset.select_related(None).prefetch_related(None).values(*lookups)
+
+    @property
+    def data(self):
+        _, fields = self.compile()
+        now = timezone.now()
+        results = []
+        for row in self.rows:
+            item = {}
+            for name, key, converter in fields:
+                if converter is None:
+                    item[name] = key(row, now)
+                else:
+                    value = row[key]
+                    item[name] = None if value is None else converter(value)
+            results.append(item)
+        return results
+
+
+def _completion_estimated(row, now):
+    """Same as ProjectListSerializer.get_completion_estimated()"""
+    if row['status'] == 'completed':
+        return None
+    if row['latest_open_due_date'] is not None:
+        return row['latest_open_due_date']
+
+    progress = row['progress']
+    if progress < 10:
+        days = 60
+    elif progress < 50:
+        days = 45
+    elif progress < 80:
+        days = 30
+    else:
+        days = 14
+    return now + timezone.timedelta(days=days)
+
+
+class CompiledProjectListSerializer(CompiledListSerializer):
+    serializer_class = ProjectListSerializer
+    annotations = {
+        # Replaces one milestone query per unfinished project
+        'latest_open_due_date': Subquery(
+            ProjectMilestone.objects.filter(project=OuterRef('pk'), is_completed=False)
+            .order_by('-due_date').values('due_date')[:1]
+        ),
+    }
+    computed = {
+        'client_name': (
+            ['client__first_name', 'client__last_name'],
+            lambda row, now: full_name(row['client__first_name'], row['client__last_name']),
+        ),
+        'client_role': (
+            ['client__profile__role__name'],
+            lambda row, now: role_display(row['client__profile__role__name']),
+        ),
+        'days_active': (
+            ['created_date'],
+            lambda row, now: (now.date() - row['created_date'].date()).days,
+        ),
+        'completion_estimated': (['status', 'progress'], _completion_estimated),
+        'project_code': (
+            ['id', 'created_date'],
+            lambda row, now: f"PD-{row['created_date'].year}-{row['id'].hex[:4].upper()}",
+        ),
+    }
+
+
+class CompiledProjectMilestoneListSerializer(CompiledListSerializer):
+    serializer_class = ProjectMilestoneListSerializer
+    computed = {
+        'days_until': (
+            ['is_completed', 'due_date'],
+            lambda row, now: 0 if row['is_completed'] else (row['due_date'].date() - now.date()).days,
+        ),
+        'overdue': (
+            ['is_completed', 'due_date'],
+            lambda row, now: not row['is_completed'] and row['due_date'] < now,
+        ),
+    }
+
+
+class CompiledProjectApplicationListSerializer(CompiledListSerializer):
+    serializer_class = ProjectApplicationListSerializer
+    computed = {
+        'applicant_name': (
+            ['applicant__first_name', 'applicant__last_name'],
+            lambda row, now: full_name(row['applicant__first_name'], row['applicant__last_name']),
+        ),
+        'applicant_role': (
+            ['applicant__profile__role__name'],
+            lambda row, now: role_display(row['applicant__profile__role__name']),
+        ),
+    }
+
+
+class CompiledListMixin:
+    """
+    Serve a viewset's list action through `compiled_list_serializer`
+    """
+    compiled_list_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        rows = self.compiled_list_serializer.get_rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.compiled_list_serializer(page).data)
+        return Response(self.compiled_list_serializer(rows).data)
@@ -0,0 +1,207 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment, override_settings
+from django.core.cache import caches
+import json
+
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from accounts.utils import get_tokens_for_user
+from back.caching import build_caches
+from projects.benchmarking import (
+    REPLAYABLE_REQUESTS, discover_routes, measure_route, route_url, check_budgets
+)
+from projects.models import (
+    Project, ProjectMilestone, ProjectApplication, PageDesign, Documentation, PACKAGE_FLAGS
+)
+from projects.seeding import seed_dataset, PACKAGE_MODELS, SEED_PASSWORD
+
+# Benchmarks must never share throttle counters or cached payloads with a running server
+BENCHMARK_CACHES = build_caches('locmem://benchmark-')
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark query count, latency and peak memory of every accounts/projects route "
+        "against a throwaway database seeded with synthetic data"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1000,
+                            help="Rows to seed for each of users, projects, milestones, page designs and applications")
+        parser.add_argument('--users', type=int, help="Override the number of users")
+        parser.add_argument('--projects', type=int, help="Override the number of projects")
+        parser.add_argument('--milestones', type=int, help="Override the number of milestones")
+        parser.add_argument('--workers', type=int, default=1, help="Seeding worker processes")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the dataset")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per route")
+        parser.add_argument('--route', action='append', dest='routes',
+                            help="Only benchmark this route name (repeatable), e.g. projects:project-list")
+        parser.add_argument('--output', default='benchmark_results.json',
+                            help="Where to write the JSON results")
+        parser.add_argument('--budgets', help="JSON budgets file (defaults to settings.BENCHMARK_BUDGETS)")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Reuse the benchmark database and its data between runs")
+
+    def handle(self, *args, **options):
+        budgets = self.load_budgets(options['budgets'])
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options['keepdb']
+        )
+        try:
+            # Throttles stay on (their cost is part of each request) but no scope may run out
+            rest_framework = {
+                **settings.REST_FRAMEWORK,
+                'DEFAULT_THROTTLE_RATES': {scope: '1000000/day' for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']},
+            }
+            with override_settings(CACHES=BENCHMARK_CACHES, REST_FRAMEWORK=rest_framework):
+                results = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as f:
+            json.dump({'options': self.summary_options(options), 'results': results}, f, indent=2)
+        self.stdout.write(f"Results written to {options['output']}")
+
+        violations = check_budgets(results, budgets)
+        if violations:
+            for violation in violations:
+                self.stderr.write(violation)
+            raise CommandError(f"{len(violations)} benchmark budget(s) exceeded")
+        self.stdout.write(self.style.SUCCESS("All routes within budget"))
+
+    def load_budgets(self, path):
+        if not path:
+            return getattr(settings, 'BENCHMARK_BUDGETS', {})
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read budgets file {path}: {e}")
+
+    def summary_options(self, options):
+        keys = ['scale', 'users', 'projects', 'milestones', 'seed', 'iterations']
+        return {key: options[key] for key in keys}
+
+    def seed(self, options):
+        scale = options['scale']
+        counts = {
+            'users': options['users'] or scale,
+            'projects': options['projects'] or scale,
+            'milestones': options['milestones'] or scale,
+            'page_designs': scale,
+            'applications': scale,
+        }
+        if options['keepdb'] and Project.objects.exists():
+            self.stdout.write("Reusing existing benchmark data")
+            return
+
+        self.stdout.write(
+            f"Seeding {counts['users']} users, {counts['projects']} projects, "
+            f"{counts['milestones']} milestones, {scale} page designs and applications"
+        )
+        seed_dataset(seed=options['seed'], workers=options['workers'], **counts)
+
+    def build_fixtures(self):
+        admin, _ = CustomUser.objects.get_or_create(
+            email='benchmark-admin@example.com',
+            defaults={
+                'first_name': 'Benchmark', 'last_name': 'Admin',
+                'is_staff': True, 'is_superuser': True, 'is_verified': True,
+            },
+        )
+        project = Project.objects.order_by('pk').first()
+        client = project.client
+        milestone = ProjectMilestone.objects.order_by('pk').first()
+
+        application = ProjectApplication.objects.order_by('pk').first() or ProjectApplication.objects.create(
+            project=project, applicant=client, application_type='Benchmark'
+        )
+        page_design = PageDesign.objects.order_by('pk').first() or PageDesign.objects.create(
+            project=project, page_name='Benchmark'
+        )
+
+        # Package views are addressed by project; use one with every package
+        package_project = Project.objects.with_packages(include=list(PACKAGE_FLAGS)).order_by('pk').first()
+        if package_project is None:
+            package_project = project
+            for model in (*PACKAGE_MODELS.values(), Documentation):
+                model.objects.get_or_create(project=project)
+
+        tokens = get_tokens_for_user(admin)
+        lookups = [
+            ('projects:project-', {'pk': project.pk}),
+            ('projects:milestone-', {'pk': milestone.pk}),
+            ('projects:application-', {'pk': application.pk}),
+            ('projects:page-design-', {'pk': page_design.pk}),
+            *((f'projects:{name}-package', {'pk': package_project.pk}) for name in PACKAGE_MODELS),
+            ('projects:documentation', {'pk': package_project.pk}),
+            ('accounts:', {'user_id': client.pk}),
+        ]
+        query_params = {
+            'projects:search': {'q': project.name.split()[0]},
+        }
+        bodies = {
+            'login': {'email': client.email, 'password': SEED_PASSWORD},
+            'refresh_token': {'refresh': tokens['refresh']},
+            'validate_token': {'token': tokens['access']},
+            'check_permission': {'permission': 'can_manage_projects'},
+        }
+        return admin, lookups, query_params, bodies
+
+    def run_benchmarks(self, options):
+        self.seed(options)
+        admin, lookups, query_params, bodies = self.build_fixtures()
+
+        # Broken routes are reported with their 500 status instead of aborting the run
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=admin)
+
+        results = []
+        for route in discover_routes():
+            if options['routes'] and route['name'] not in options['routes']:
+                continue
+
+            if not route['methods']:
+                results.append(self.skipped(route, "accepted methods unknown"))
+                continue
+            if 'get' in route['methods']:
+                method, data = 'get', None
+            elif route['name'] in REPLAYABLE_REQUESTS:
+                method, body = REPLAYABLE_REQUESTS[route['name']]
+                data = bodies[body]
+            else:
+                results.append(self.skipped(route, "only unsafe methods"))
+                continue
+
+            url = route_url(route, lookups, query_params)
+            if url is None:
+                results.append(self.skipped(route, "no sample object for URL kwargs"))
+                continue
+
+            # Start every route with empty throttle counters and caches
+            for alias in BENCHMARK_CACHES:
+                caches[alias].clear()
+            result = measure_route(client, method, url, data, iterations=options['iterations'])
+            result['route'] = route['name']
+            results.append(result)
+
+            self.stdout.write(
+                f"{route['name']:<45} {result['method']:<5} {result['status']} "
+                f"q={result['queries']:<4} p50={result['p50_ms']:.1f}ms "
+                f"p99={result['p99_ms']:.1f}ms mem={result['peak_memory_kb']}KB"
+            )
+        return results
+
+    def skipped(self, route, reason):
+        self.stdout.write(f"{route['name']:<45} skipped ({reason})")
+        return {
+            'route': route['name'],
+            'methods': [method.upper() for method in route['methods']],
+            'skipped': reason,
+        }
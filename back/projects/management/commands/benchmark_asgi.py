@@ -0,0 +1,150 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, AsyncClient
+from django.test.utils import setup_test_environment, teardown_test_environment, override_settings
+from django.urls import include, path, resolve, reverse
+import asyncio
+import json
+import time
+import types
+
+from accounts import views as account_views
+from accounts.models import CustomUser
+from accounts.utils import get_tokens_for_user
+from projects.models import Project
+from projects.seeding import seed_dataset
+from projects.views import ProjectViewSet, DashboardDataView
+from .benchmark_api import BENCHMARK_CACHES
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests per second of the async profile, token validation, project and "
+        "dashboard views served through Django's ASGI handler with their synchronous DRF "
+        "equivalents served through the WSGI handler, on a throwaway seeded database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1000, help="Projects to seed")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the dataset")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint and handler")
+        parser.add_argument('--concurrency', type=int, default=10,
+                            help="Requests in flight (WSGI threads / concurrent ASGI tasks)")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Throttles still run, with rates the benchmark cannot exhaust
+            rest_framework = {
+                **settings.REST_FRAMEWORK,
+                'DEFAULT_THROTTLE_RATES': {
+                    scope: '1000000/day' for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+                },
+            }
+            with override_settings(CACHES=BENCHMARK_CACHES, REST_FRAMEWORK=rest_framework):
+                self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def build_requests(self, options):
+        """
+        Get (label, method, path, body, headers, sync view) for each benchmarked
+        request; the path is routed to the async view
+        """
+        scale = options['scale']
+        seed_dataset(
+            users=max(scale // 10, 1), projects=scale, milestones=scale * 2,
+            applications=scale // 2, seed=options['seed'],
+        )
+        admin = CustomUser.objects.filter(is_staff=True).first() or CustomUser.objects.create_superuser(
+            email='benchmark-admin@example.com', password='benchmark', first_name='Bench', last_name='Admin'
+        )
+        access = get_tokens_for_user(admin)['access']
+        auth = {'Authorization': f'Bearer {access}'}
+
+        project = Project.objects.order_by('pk').first()
+        detail = reverse('projects:project-detail', kwargs={'pk': project.pk})
+        etag = Client().get(detail, headers=auth)['ETag']
+        project_list = ProjectViewSet.as_view({'get': 'list'}, basename='project', detail=False)
+        project_detail = ProjectViewSet.as_view({'get': 'retrieve'}, basename='project', detail=True)
+        return [
+            ('profile', 'get', reverse('accounts:get_profile'), None, auth, account_views.get_user_profile),
+            ('validate_token', 'post', reverse('accounts:validate_token'), {'token': access}, {},
+             account_views.validate_token),
+            ('project list', 'get', reverse('projects:project-list'), None, auth, project_list),
+            ('project detail', 'get', detail, None, auth, project_detail),
+            ('project detail 304', 'get', detail, None, {**auth, 'If-None-Match': etag}, project_detail),
+            ('dashboard', 'get', reverse('projects:dashboard-data'), None, auth, DashboardDataView.as_view()),
+        ]
+
+    def build_sync_urlconf(self, requests):
+        """
+        Get a URLconf routing the benchmarked paths to the synchronous views,
+        and everything else like ROOT_URLCONF
+        """
+        urlconf = types.ModuleType('benchmark_asgi_sync_urls')
+        urlconf.urlpatterns = [
+            *(path(url.lstrip('/'), sync_view, resolve(url).kwargs) for _, _, url, _, _, sync_view in requests),
+            path('', include(settings.ROOT_URLCONF)),
+        ]
+        return urlconf
+
+    def run_benchmarks(self, options):
+        requests = self.build_requests(options)
+        sync_urlconf = self.build_sync_urlconf(requests)
+        count, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(f"{count} requests per endpoint, concurrency {concurrency}")
+
+        for label, method, url, body, headers, _ in requests:
+            kwargs = {'headers': headers}
+            if body is not None:
+                kwargs.update(data=json.dumps(body), content_type='application/json')
+
+            with override_settings(ROOT_URLCONF=sync_urlconf):
+                wsgi_rps, wsgi_status = self.run_wsgi(method, url, kwargs, count, concurrency)
+            asgi_rps, asgi_status = asyncio.run(self.run_asgi(method, url, kwargs, count, concurrency))
+            if wsgi_status != asgi_status:
+                raise CommandError(f"{label}: WSGI answered {wsgi_status}, ASGI answered {asgi_status}")
+            if not (200 <= asgi_status < 300 or asgi_status == 304):
+                raise CommandError(f"{label}: answered {asgi_status}")
+            self.stdout.write(
+                f"{label:<20} {asgi_status}  wsgi {wsgi_rps:8.1f} req/s  asgi {asgi_rps:8.1f} req/s  "
+                f"x{asgi_rps / wsgi_rps:.2f}"
+            )
+
+    def run_wsgi(self, method, url, kwargs, count, concurrency):
+        def send(_):
+            return getattr(Client(), method)(url, **kwargs).status_code
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            send(None)
+            started = time.perf_counter()
+            statuses = set(executor.map(send, range(count)))
+            elapsed = time.perf_counter() - started
+        return count / elapsed, self.single_status(statuses)
+
+    async def run_asgi(self, method, url, kwargs, count, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send():
+            async with semaphore:
+                return (await getattr(client, method)(url, **kwargs)).status_code
+
+        await send()
+        started = time.perf_counter()
+        statuses = set(await asyncio.gather(*(send() for _ in range(count))))
+        elapsed = time.perf_counter() - started
+        return count / elapsed, self.single_status(statuses)
+
+    def single_status(self, statuses):
+        if len(statuses) != 1:
+            raise CommandError(f"Inconsistent response statuses: {sorted(statuses)}")
+        return statuses.pop()
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+import io
+
+from back.renderers import ORJSONRenderer, ORJSONParser, orjson
+from projects.benchmarking import measure_callable
+from projects.models import Project, ProjectMilestone, ProjectApplication
+from projects.seeding import seed_dataset
+from projects.serializers import (
+    ProjectListSerializer, ProjectMilestoneListSerializer, ProjectApplicationListSerializer
+)
+
+# (label, serializer, queryset factory) of the large list payloads to render
+PAYLOADS = (
+    ('projects', ProjectListSerializer,
+     lambda: Project.objects.select_related('client__profile__role').order_by('pk')),
+    ('milestones', ProjectMilestoneListSerializer,
+     lambda: ProjectMilestone.objects.order_by('pk')),
+    ('applications', ProjectApplicationListSerializer,
+     lambda: ProjectApplication.objects.select_related('applicant__profile__role').order_by('pk')),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare JSON rendering and parsing speed of DRF's json-module classes with the "
+        "orjson renderer/parser on large list payloads from a throwaway seeded database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help="Rows per list payload")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the dataset")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed runs per measurement")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed; the API is using the stdlib JSON classes")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            rows = options['rows']
+            self.stdout.write(f"Seeding {rows} projects, milestones and applications")
+            seed_dataset(
+                users=max(rows // 10, 1), projects=rows, milestones=rows,
+                applications=rows, seed=options['seed'],
+            )
+            for label, serializer_class, queryset in PAYLOADS:
+                data = serializer_class(queryset(), many=True).data
+                self.compare(label, data, options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def compare(self, label, data, iterations):
+        stdlib_renderer, fast_renderer = JSONRenderer(), ORJSONRenderer()
+        body = stdlib_renderer.render(data)
+        if fast_renderer.render(data) != body:
+            raise CommandError(f"{label}: orjson output differs from the stdlib renderer")
+
+        results = {
+            'render': (
+                measure_callable(lambda: stdlib_renderer.render(data), iterations),
+                measure_callable(lambda: fast_renderer.render(data), iterations),
+            ),
+            'parse': (
+                measure_callable(lambda: JSONParser().parse(io.BytesIO(body)), iterations),
+                measure_callable(lambda: ORJSONParser().parse(io.BytesIO(body)), iterations),
+            ),
+        }
+        for operation, (stdlib, fast) in results.items():
+            speedup = stdlib['p50_ms'] / fast['p50_ms'] if fast['p50_ms'] else float('inf')
+            self.stdout.write(
+                f"{label:<13} {operation:<7} {len(data)} rows {len(body) // 1024}KB  "
+                f"json p50={stdlib['p50_ms']:.1f}ms  orjson p50={fast['p50_ms']:.1f}ms  "
+                f"x{speedup:.1f}"
+            )
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from back.schedule import ScheduledCommand
+from projects.notifications import run_milestone_notifications
+
+
+class Command(ScheduledCommand):
+    help = "Run the milestone notification scheduler (long-running, cron-style schedule)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--schedule',
+            default=getattr(settings, 'MILESTONE_NOTIFICATION_SCHEDULE', '0 8 * * *'),
+            help="Cron expression (minute hour day month weekday), evaluated in TIME_ZONE",
+        )
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=getattr(settings, 'MILESTONE_NOTIFICATION_SHARDS', 1),
+            help="Partition the run into N shards sent in parallel (1 = serial)",
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'MILESTONE_NOTIFICATION_WORKERS', None),
+            help="Maximum worker processes for sharded runs (default: CPU count)",
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help="Send pending notifications immediately and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options['shards'] < 1:
+            raise CommandError("--shards must be at least 1")
+        self.shards = options['shards']
+        self.workers = options['workers']
+
+        if options['once']:
+            self.run()
+            return
+
+        self.run_on_schedule(options['schedule'], "Milestone scheduler")
+
+    def run(self):
+        result = run_milestone_notifications(shards=self.shards, workers=self.workers)
+
+        for report in result.get('shards', []):
+            self.stdout.write(
+                f"  shard {report['shard']}: {report['milestones']} milestones, "
+                f"{report['sent']} sent, {report['failed']} failed, {report['seconds']}s"
+            )
+        self.stdout.write(
+            f"{timezone.localtime().isoformat()} sent {result['sent']} digests, "
+            f"{result['failed']} failed"
+        )
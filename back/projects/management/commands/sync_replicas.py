@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+import time
+
+from back.db_routing import get_replicas, sync_sqlite_replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into the replica files of DATABASE_REPLICA_NAMES, "
+        "the local stand-in for replication"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help="Keep running and copy every this many seconds (the replication lag to mimic)")
+
+    def handle(self, *args, **options):
+        if not get_replicas():
+            raise CommandError("No replicas configured; set DATABASE_REPLICA_NAMES")
+        if options['interval'] is not None and options['interval'] <= 0:
+            raise CommandError("--interval must be positive")
+
+        try:
+            while True:
+                try:
+                    aliases = sync_sqlite_replicas()
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f"{timezone.localtime().isoformat()} synced {', '.join(aliases)}")
+                if options['interval'] is None:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Replica sync stopped")
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:51
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+PACKAGE_FLAGS = {
+    'branding': 1 << 0,
+    'frontend': 1 << 1,
+    'backend': 1 << 2,
+    'dashboard': 1 << 3,
+    'media': 1 << 4,
+    'sales': 1 << 5,
+}
+
+
+def populate_package_flags(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    for name, bit in PACKAGE_FLAGS.items():
+        Project.objects.filter(**{f'includes_{name}': True}).update(
+            package_flags=F('package_flags') + bit
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='package_flags',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, help_text='Bitmask of included packages (see PACKAGE_FLAGS)'),
+        ),
+        migrations.RunPython(populate_package_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_package_flags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MilestoneNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254)),
+                ('kind', models.CharField(choices=[('overdue', 'Overdue'), ('due_soon', 'Due Soon')], max_length=20)),
+                ('sent_on', models.DateField(db_index=True, help_text='Day the notification was sent for')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='projectmilestone',
+            index=models.Index(fields=['is_completed', 'due_date'], name='milestone_open_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='milestonenotification',
+            name='milestone',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='projects.projectmilestone'),
+        ),
+        migrations.AddConstraint(
+            model_name='milestonenotification',
+            constraint=models.UniqueConstraint(fields=('milestone', 'recipient', 'kind', 'sent_on'), name='unique_milestone_notification_per_day'),
+        ),
+    ]
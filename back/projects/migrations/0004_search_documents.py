@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_index(apps, schema_editor):
+    from projects.search import rebuild_search_documents, install_search_index
+    rebuild_search_documents(apps)
+    install_search_index(schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    from projects.search import drop_search_index
+    drop_search_index(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_milestone_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('branding', 'Branding Package'), ('frontend', 'Frontend Package'), ('backend', 'Backend Package'), ('dashboard', 'Dashboard Package'), ('media', 'Media Package'), ('sales', 'Sales Package'), ('documentation', 'Documentation'), ('page_design', 'Page Design'), ('application', 'Application')], max_length=20)),
+                ('object_id', models.CharField(help_text='Primary key of the indexed object', max_length=36)),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='projects.project')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document')],
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0004_search_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Child-change counter used in the project's ETag"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:53
+
+from django.db import migrations, models
+import functools
+import operator
+
+
+PACKAGE_FLAGS = {
+    'branding': 1 << 0,
+    'frontend': 1 << 1,
+    'backend': 1 << 2,
+    'dashboard': 1 << 3,
+    'media': 1 << 4,
+    'sales': 1 << 5,
+}
+
+
+def package_flags_expression():
+    return functools.reduce(operator.add, [
+        models.Case(
+            models.When(**{f'includes_{name}': True}, then=models.Value(bit)),
+            default=models.Value(0),
+        )
+        for name, bit in PACKAGE_FLAGS.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_project_revision'),
+    ]
+
+    # A regular column cannot be altered into a generated one: replace it
+    operations = [
+        migrations.RemoveField(
+            model_name='project',
+            name='package_flags',
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='package_flags',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=package_flags_expression(), help_text='Bitmask of included packages (see PACKAGE_FLAGS)', output_field=models.PositiveSmallIntegerField()),
+        ),
+    ]
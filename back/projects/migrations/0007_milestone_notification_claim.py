@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_generated_package_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='milestonenotification',
+            name='claim',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, help_text='Run that claimed the notification for sending', null=True),
+        ),
+    ]
@@ -0,0 +1,114 @@
+"""
+Milestone completion and project progress
+
+A project's progress is the share of its milestones that are completed, in
+whole percent. refresh_project_progress() recomputes it for any number of
+projects with one UPDATE and a correlated subquery: no milestone or project
+is loaded, and Project's post_save receivers (search indexing) do not run
+for a field they do not use.
+
+The bulk operations (create, complete, reschedule, delete) each run in one
+transaction with a fixed number of statements whatever the number of
+milestones or projects, and end with a single UPDATE of the touched
+projects. That UPDATE also bumps each project's revision (see
+projects.conditional) once, in place of the milestones' per-object revision
+receivers.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import timedelta
+
+from .conditional import bump_project_revision, revision_receivers_suspended
+from .models import Project, ProjectMilestone
+
+
+def progress_expression():
+    """
+    Progress of the outer query's project, computed from its milestones
+    """
+    progress = ProjectMilestone.objects.filter(project=OuterRef('pk')).order_by().values('project').annotate(
+        progress=Count('pk', filter=Q(is_completed=True)) * 100 / Count('pk')
+    ).values('progress')
+    return Coalesce(Subquery(progress, output_field=IntegerField()), 0)
+
+
+def refresh_project_progress(project_ids, bump_revision=False):
+    """
+    Recompute the progress of the given projects in a single UPDATE
+
+    Returns the number of projects updated.
+    """
+    values = {'progress': progress_expression()}
+    if bump_revision:
+        values['revision'] = F('revision') + 1
+    return Project.objects.filter(pk__in=project_ids).update(**values)
+
+
+def _lock(milestones):
+    """
+    Get the (pk, project_id) pairs of a queryset's milestones, locking the rows
+    """
+    return list(milestones.select_for_update(of=('self',)).values_list('pk', 'project_id'))
+
+
+def complete_milestones(milestones, completion_date=None):
+    """
+    Mark the milestones of a queryset completed and refresh the progress of
+    their projects, atomically
+
+    Milestones that are already completed are left as they are. Returns the
+    (pk, project_id) pairs of the milestones this call completed.
+    """
+    completion_date = completion_date or timezone.now()
+    with transaction.atomic():
+        pending = _lock(milestones.filter(is_completed=False))
+        if not pending:
+            return []
+        ProjectMilestone.objects.filter(pk__in=[pk for pk, _ in pending]).update(
+            is_completed=True, completion_date=completion_date
+        )
+        refresh_project_progress({project_id for _, project_id in pending}, bump_revision=True)
+    return pending
+
+
+def create_milestones(milestones):
+    """
+    Insert unsaved ProjectMilestone instances with one bulk_create and
+    refresh the progress of their projects; returns the created milestones
+    """
+    with transaction.atomic():
+        created = ProjectMilestone.objects.bulk_create(milestones)
+        refresh_project_progress({milestone.project_id for milestone in created}, bump_revision=True)
+    return created
+
+
+def reschedule_milestones(milestones, days):
+    """
+    Shift the due dates of the milestones of a queryset by `days` (negative
+    to bring them forward); returns their (pk, project_id) pairs
+    """
+    with transaction.atomic():
+        rows = _lock(milestones)
+        if rows:
+            ProjectMilestone.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                due_date=F('due_date') + timedelta(days=days)
+            )
+            # Progress does not depend on due dates
+            bump_project_revision({project_id for _, project_id in rows})
+    return rows
+
+
+def delete_milestones(milestones):
+    """
+    Delete the milestones of a queryset (and their notification records) and
+    refresh the progress of their projects; returns their (pk, project_id)
+    pairs
+    """
+    with transaction.atomic(), revision_receivers_suspended():
+        rows = _lock(milestones)
+        if rows:
+            ProjectMilestone.objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+            refresh_project_progress({project_id for _, project_id in rows}, bump_revision=True)
+    return rows
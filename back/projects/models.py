@@ -1,9 +1,111 @@
 from django.db import models
 from django.conf import settings  # Add this import to reference AUTH_USER_MODEL
 from django.utils import timezone
+import functools
+import operator
 import uuid
 
 
+# Bit assigned to each package in Project.package_flags
+PACKAGE_FLAGS = {
+    'branding': 1 << 0,
+    'frontend': 1 << 1,
+    'backend': 1 << 2,
+    'dashboard': 1 << 3,
+    'media': 1 << 4,
+    'sales': 1 << 5,
+}
+ALL_PACKAGES_MASK = sum(PACKAGE_FLAGS.values())
+
+
+def package_mask(packages):
+    """
+    Build a bitmask from an iterable of package names
+    """
+    mask = 0
+    for name in packages:
+        try:
+            mask |= PACKAGE_FLAGS[name]
+        except KeyError:
+            raise ValueError(f"Unknown package '{name}'")
+    return mask
+
+
+def add_to_histogram(histogram, flags, total):
+    """
+    Add `total` projects with the package bitmask `flags` to a histogram
+    """
+    for name, bit in PACKAGE_FLAGS.items():
+        if flags & bit:
+            histogram[name] += total
+
+
+def package_flags_expression():
+    """
+    Database expression computing the package bitmask from the includes_*
+    columns (Project.package_flags)
+    """
+    terms = [
+        models.Case(
+            models.When(**{f'includes_{name}': True}, then=models.Value(bit)),
+            default=models.Value(0),
+        )
+        for name, bit in PACKAGE_FLAGS.items()
+    ]
+    return functools.reduce(operator.add, terms)
+
+
+class ProjectQuerySet(models.QuerySet):
+    """QuerySet with package-mix helpers backed by the package_flags bitmask"""
+
+    def with_packages(self, include=(), exclude=()):
+        """
+        Filter projects by package mix, e.g. include=['frontend', 'backend'],
+        exclude=['sales']
+
+        The mix is expanded to the (at most 64) bitmask values that satisfy it,
+        so the filter is a single IN predicate on the indexed column.
+        """
+        include_mask = package_mask(include)
+        exclude_mask = package_mask(exclude)
+        if include_mask & exclude_mask:
+            return self.none()
+        if not include_mask and not exclude_mask:
+            return self
+        
+        matching = [
+            mask for mask in range(ALL_PACKAGES_MASK + 1)
+            if mask & include_mask == include_mask and not mask & exclude_mask
+        ]
+        return self.filter(package_flags__in=matching)
+
+    def package_histogram(self):
+        """
+        Count projects per package in one grouped query over package_flags
+
+        Returns a dictionary mapping package name to project count
+        """
+        histogram = {name: 0 for name in PACKAGE_FLAGS}
+        rows = self.order_by().values('package_flags').annotate(total=models.Count('pk'))
+        for row in rows:
+            add_to_histogram(histogram, row['package_flags'], row['total'])
+        return histogram
+
+    def package_histograms(self, key):
+        """
+        Count projects per package for each value of the `key` field (e.g.
+        'client_id') in one grouped query
+
+        Returns a dictionary mapping each key value to its package histogram
+        """
+        histograms = {}
+        rows = self.order_by().values(key, 'package_flags').annotate(total=models.Count('pk'))
+        for row in rows:
+            histogram = histograms.setdefault(row[key], {name: 0 for name in PACKAGE_FLAGS})
+            add_to_histogram(histogram, row['package_flags'], row['total'])
+        return histograms
+
+
 class Project(models.Model):
     """Main project model that connects all package components"""
     STATUS_CHOICES = [
@@ -30,6 +132,23 @@ class Project(models.Model):
     includes_media = models.BooleanField(default=False)
     includes_sales = models.BooleanField(default=False)
     
+    # Packed copy of the includes_* flags, computed by the database so that
+    # QuerySet.update() and bulk_create() keep it in sync too
+    package_flags = models.GeneratedField(
+        expression=package_flags_expression(),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True, db_index=True,
+        help_text="Bitmask of included packages (see PACKAGE_FLAGS)"
+    )
+    
+    # Bumped whenever a package, milestone, page design or application changes (see projects.conditional)
+    revision = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text="Child-change counter used in the project's ETag"
+    )
+    
+    objects = ProjectQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.name} ({self.client.username})"
     
@@ -40,15 +159,10 @@ class Project(models.Model):
         """
         Recalculate project progress based on completed milestones
         """
-        milestones = self.milestones.all()
-        if not milestones.exists():
-            self.progress = 0
-        else:
-            completed = milestones.filter(is_completed=True).count()
-            total = milestones.count()
-            self.progress = int((completed / total) * 100)
+        from .milestones import refresh_project_progress
         
-        self.save(update_fields=['progress'])
+        refresh_project_progress([self.pk])
+        self.refresh_from_db(fields=['progress'])
         return self.progress
 
     def get_project_code(self):
@@ -463,6 +577,12 @@ class ProjectMilestone(models.Model):
     completion_date = models.DateTimeField(null=True, blank=True)
     is_completed = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # Due/overdue lookups for notifications and dashboards
+            models.Index(fields=['is_completed', 'due_date'], name='milestone_open_due_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.title} for {self.project.name}"
     
@@ -489,9 +609,12 @@ class ProjectMilestone(models.Model):
         self.completion_date = timezone.now()
         
         if save:
-            self.save(update_fields=['is_completed', 'completion_date'])
-            # Update project progress
-            self.project.recalculate_progress()
+            from .milestones import complete_milestones
+            
+            # Milestone and project progress in one transaction (see projects.milestones)
+            complete_milestones(ProjectMilestone.objects.filter(pk=self.pk), self.completion_date)
+            if ProjectMilestone.project.is_cached(self):
+                self.project.refresh_from_db(fields=['progress', 'revision'])
         
         return self
 
@@ -513,4 +636,69 @@ class ProjectMilestone(models.Model):
             description=description,
             due_date=due_date,
             is_completed=False
-        )
\ No newline at end of file
+        )
+
+
+class MilestoneNotification(models.Model):
+    """
+    Ledger of milestone notifications, used to avoid duplicate sends
+
+    Rows are claimed (inserted) before sending and deleted again when the
+    send fails; see projects.notifications.claim_unsent.
+    """
+    KIND_CHOICES = [
+        ('overdue', 'Overdue'),
+        ('due_soon', 'Due Soon'),
+    ]
+    
+    milestone = models.ForeignKey(ProjectMilestone, on_delete=models.CASCADE, related_name='notifications')
+    recipient = models.EmailField()
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    sent_on = models.DateField(db_index=True, help_text="Day the notification was sent for")
+    claim = models.UUIDField(
+        null=True, blank=True, editable=False, db_index=True,
+        help_text="Run that claimed the notification for sending"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['milestone', 'recipient', 'kind', 'sent_on'],
+                name='unique_milestone_notification_per_day'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} notice for {self.milestone_id} to {self.recipient}"
+
+
+class SearchDocument(models.Model):
+    """Searchable text of one project, package, page design or application (see projects.search)"""
+    KIND_CHOICES = [
+        ('project', 'Project'),
+        ('branding', 'Branding Package'),
+        ('frontend', 'Frontend Package'),
+        ('backend', 'Backend Package'),
+        ('dashboard', 'Dashboard Package'),
+        ('media', 'Media Package'),
+        ('sales', 'Sales Package'),
+        ('documentation', 'Documentation'),
+        ('page_design', 'Page Design'),
+        ('application', 'Application'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.CharField(max_length=36, help_text="Primary key of the indexed object")
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='search_documents')
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
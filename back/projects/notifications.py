@@ -0,0 +1,391 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from datetime import timedelta
+import logging
+import time
+import uuid
+
+from .models import ProjectMilestone, MilestoneNotification
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TEMPLATE = 'projects/email/milestone_digest.html'
+
+
+@lru_cache(maxsize=None)
+def get_digest_template():
+    """
+    Load and compile the digest template once per process
+    """
+    return get_template(DIGEST_TEMPLATE)
+
+
+def get_staff_recipients():
+    """
+    Get the staff inbox(es) that receive a digest of every due milestone
+    """
+    recipients = getattr(settings, 'PROJECT_NOTIFICATION_EMAIL', None)
+    if not recipients:
+        return []
+    if isinstance(recipients, str):
+        return [recipients]
+    return list(recipients)
+
+
+def get_notifiable_milestones(now=None, due_soon_days=None):
+    """
+    Get all open milestones that are overdue or due soon in a single query
+
+    Served by the (is_completed, due_date) index on ProjectMilestone.
+    """
+    now = now or timezone.now()
+    if due_soon_days is None:
+        due_soon_days = getattr(settings, 'MILESTONE_DUE_SOON_DAYS', 2)
+
+    return ProjectMilestone.objects.filter(
+        is_completed=False,
+        due_date__lte=now + timedelta(days=due_soon_days)
+    ).select_related('project', 'project__client').order_by('due_date')
+
+
+def build_digests(milestones, now=None, include_staff=True):
+    """
+    Group milestones into one digest per recipient
+
+    Each client gets a digest of their own projects' milestones and every staff
+    recipient gets a digest covering all of them (unless include_staff is False).
+    Returns a list of digest dictionaries.
+    """
+    now = now or timezone.now()
+    today = now.date()
+    staff_recipients = get_staff_recipients() if include_staff else []
+    digests = {}
+
+    for milestone in milestones:
+        client = milestone.project.client
+        kind = 'overdue' if milestone.due_date < now else 'due_soon'
+        entry = {
+            'milestone': milestone,
+            'project': milestone.project,
+            'client': client,
+            'kind': kind,
+            'days': abs((milestone.due_date.date() - today).days),
+        }
+
+        # A staff inbox that is also the client's address gets the staff view
+        recipients = {client.email: (client.get_full_name(), 'client')}
+        recipients.update({email: ('', 'staff') for email in staff_recipients})
+
+        for email, (name, audience) in recipients.items():
+            if not email:
+                continue
+            digest = digests.setdefault(email, {
+                'recipient': email,
+                'name': name,
+                'audience': audience,
+                'overdue': [],
+                'due_soon': [],
+            })
+            if audience == 'staff':
+                digest['audience'] = 'staff'
+            digest[kind].append(entry)
+
+    return list(digests.values())
+
+
+def claim_unsent(digests, sent_on):
+    """
+    Claim the digest entries not yet in the notification ledger for the day
+
+    The entries' ledger rows are inserted before anything is sent, tagged
+    with a new claim id; rows already in the ledger (sent, or claimed by an
+    overlapping run) are skipped by the unique constraint. Digests are
+    trimmed to the entries this run claimed, so two runs never send the same
+    entry. send_digests() releases the claims of digests it fails to send.
+    Returns (claim id, digests to send).
+    """
+    claim = uuid.uuid4()
+    entries = []
+    for digest in digests:
+        entries.extend(ledger_entries(digest, sent_on, claim))
+    if not entries:
+        return claim, []
+
+    with transaction.atomic():
+        MilestoneNotification.objects.bulk_create(entries, ignore_conflicts=True)
+        claimed = set(
+            MilestoneNotification.objects.filter(claim=claim).values_list('milestone_id', 'recipient', 'kind')
+        )
+
+    pending = []
+    for digest in digests:
+        for kind in ('overdue', 'due_soon'):
+            digest[kind] = [
+                entry for entry in digest[kind]
+                if (entry['milestone'].id, digest['recipient'], kind) in claimed
+            ]
+        if digest['overdue'] or digest['due_soon']:
+            pending.append(digest)
+    return claim, pending
+
+
+def release_claims(digests, claim):
+    """
+    Delete the ledger rows of digests that were claimed but not sent, so a
+    later run sends them
+    """
+    if digests:
+        MilestoneNotification.objects.filter(
+            claim=claim, recipient__in=[digest['recipient'] for digest in digests]
+        ).delete()
+
+
+def render_digest(digest, now=None):
+    """
+    Render a digest into an email message
+    """
+    now = now or timezone.now()
+    overdue_count = len(digest['overdue'])
+    due_soon_count = len(digest['due_soon'])
+
+    context = {
+        'digest': digest,
+        'overdue_milestones': digest['overdue'],
+        'due_soon_milestones': digest['due_soon'],
+        'overdue_count': overdue_count,
+        'due_soon_count': due_soon_count,
+        'is_staff_digest': digest['audience'] == 'staff',
+        'generated_at': now,
+        'site_name': getattr(settings, 'SITE_NAME', 'Our Platform'),
+    }
+    html_message = get_digest_template().render(context)
+
+    subject_parts = []
+    if overdue_count:
+        subject_parts.append(f"{overdue_count} overdue")
+    if due_soon_count:
+        subject_parts.append(f"{due_soon_count} due soon")
+
+    message = EmailMultiAlternatives(
+        subject=f"Project milestones: {', '.join(subject_parts)}",
+        body=strip_tags(html_message),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[digest['recipient']],
+    )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+
+def ledger_entries(digest, sent_on, claim):
+    """
+    Build the ledger rows that record a digest as sent, under `claim`
+    """
+    return [
+        MilestoneNotification(
+            milestone=entry['milestone'],
+            recipient=digest['recipient'],
+            kind=kind,
+            sent_on=sent_on,
+            claim=claim,
+        )
+        for kind in ('overdue', 'due_soon')
+        for entry in digest[kind]
+    ]
+
+
+def send_digests(digests, claim, now=None, connection=None, batch_size=None):
+    """
+    Render and send digests claimed under `claim` (see claim_unsent) in
+    batches over a single SMTP connection
+
+    The claims of digests that could not be sent are released, including the
+    rest of a batch that failed part way.
+    Returns a dictionary with sent and failed digest counts.
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'MILESTONE_NOTIFICATION_BATCH_SIZE', 50)
+
+    result = {'sent': 0, 'failed': 0}
+    if not digests:
+        return result
+
+    unsent = list(digests)
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+        for start in range(0, len(digests), batch_size):
+            batch = digests[start:start + batch_size]
+            sent = 0
+            try:
+                # One message per call: send_messages() stops at the first
+                # failure without saying which messages went out
+                for digest in batch:
+                    connection.send_messages([render_digest(digest, now)])
+                    sent += 1
+            except Exception as e:
+                logger.error(f"Error sending milestone digest batch: {str(e)}")
+                result['failed'] += len(batch) - sent
+                release_claims(batch[sent:], claim)
+            finally:
+                result['sent'] += sent
+                del unsent[:len(batch)]
+    except Exception as e:
+        logger.error(f"Error sending milestone digests: {str(e)}")
+        result['failed'] = len(digests) - result['sent']
+        release_claims(unsent, claim)
+    finally:
+        connection.close()
+
+    return result
+
+
+def run_milestone_notifications(now=None, shards=None, workers=None):
+    """
+    Find due and overdue milestones and send any digests not sent yet today
+
+    Safe to run repeatedly, even concurrently: entries are claimed in the
+    ledger before sending (see claim_unsent). With more than one shard the
+    work is fanned out over a process pool (see run_sharded_notifications).
+    Returns a dictionary with sent and failed digest counts.
+    """
+    now = now or timezone.now()
+    if shards is None:
+        shards = getattr(settings, 'MILESTONE_NOTIFICATION_SHARDS', 1)
+    if shards > 1:
+        return run_sharded_notifications(shards, workers=workers, now=now)
+
+    milestones = list(get_notifiable_milestones(now))
+    claim, digests = claim_unsent(build_digests(milestones, now), now.date())
+    result = send_digests(digests, claim, now=now)
+
+    logger.info(
+        f"Milestone notifications: {len(milestones)} milestones, "
+        f"{result['sent']} digests sent, {result['failed']} failed"
+    )
+    return result
+
+
+def shard_for(key, shards):
+    """
+    Map a UUID to a shard index
+    """
+    return key.int % shards
+
+
+def partition_milestones(shards, now=None):
+    """
+    Split the due and overdue milestone ids into shards
+
+    Milestones are partitioned by a hash of their project's client id, so a
+    client's digest is always built within a single shard.
+    Returns a list of milestone id lists, one per shard.
+    """
+    partitions = [[] for _ in range(shards)]
+    rows = get_notifiable_milestones(now).values_list('id', 'project__client_id')
+    for milestone_id, client_id in rows.iterator():
+        partitions[shard_for(client_id, shards)].append(milestone_id)
+    return partitions
+
+
+def _init_shard_worker():
+    """
+    Prepare a pool process: set up Django under spawn and drop any inherited
+    database connections under fork
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+
+
+def run_notification_shard(shard, milestone_ids, now=None, chunk_size=500):
+    """
+    Build and send the client digests for one shard of milestones
+
+    Runs inside a pool process. Returns a per-shard report dictionary.
+    """
+    started = time.perf_counter()
+    report = {'shard': shard, 'milestones': len(milestone_ids), 'sent': 0, 'failed': 0}
+
+    try:
+        now = now or timezone.now()
+        milestones = []
+        for start in range(0, len(milestone_ids), chunk_size):
+            milestones.extend(
+                get_notifiable_milestones(now).filter(
+                    id__in=milestone_ids[start:start + chunk_size]
+                )
+            )
+
+        claim, digests = claim_unsent(
+            build_digests(milestones, now, include_staff=False), now.date()
+        )
+        result = send_digests(digests, claim, now=now)
+        report.update(result)
+    except Exception as e:
+        logger.error(f"Error in milestone notification shard {shard}: {str(e)}")
+        report['failed'] += 1
+    finally:
+        connections.close_all()
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def run_sharded_notifications(shards, workers=None, now=None):
+    """
+    Send milestone digests in parallel, one shard per pool task
+
+    Client digests are rendered and sent by up to `workers` processes; the staff
+    digest covering every milestone is sent once by the calling process.
+    Returns a dictionary with total sent and failed counts plus per-shard reports.
+    """
+    now = now or timezone.now()
+    workers = workers or getattr(settings, 'MILESTONE_NOTIFICATION_WORKERS', None)
+    partitions = partition_milestones(shards, now)
+
+    # Forked workers must not share the parent's database connections
+    connections.close_all()
+
+    reports = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_shard_worker) as executor:
+        futures = [
+            executor.submit(run_notification_shard, shard, milestone_ids, now)
+            for shard, milestone_ids in enumerate(partitions)
+            if milestone_ids
+        ]
+        for future in futures:
+            reports.append(future.result())
+
+    result = {
+        'sent': sum(report['sent'] for report in reports),
+        'failed': sum(report['failed'] for report in reports),
+        'shards': reports,
+    }
+
+    if get_staff_recipients():
+        milestones = list(get_notifiable_milestones(now))
+        staff_digests = [
+            digest for digest in build_digests(milestones, now)
+            if digest['audience'] == 'staff'
+        ]
+        claim, staff_digests = claim_unsent(staff_digests, now.date())
+        staff_result = send_digests(staff_digests, claim, now=now)
+        result['sent'] += staff_result['sent']
+        result['failed'] += staff_result['failed']
+
+    for report in reports:
+        logger.info(
+            f"Milestone notification shard {report['shard']}: {report['milestones']} milestones, "
+            f"{report['sent']} sent, {report['failed']} failed in {report['seconds']}s"
+        )
+    return result
@@ -0,0 +1,322 @@
+"""
+Full-text search over projects and their requirements
+
+Every project, package, documentation record, page design and application has
+a SearchDocument row (title + body text) kept up to date by post_save and
+post_delete receivers (connected in ProjectsConfig.ready()). The documents are
+indexed with:
+
+- SQLite: an FTS5 external-content table (porter stemming, prefix queries)
+  kept in sync by triggers, ranked with bm25();
+- PostgreSQL: a GIN index on to_tsvector('english', title || ' ' || body),
+  ranked with ts_rank_cd().
+"""
+from django.db import connections, models
+from django.db.models.signals import post_save, post_delete
+from django.utils.html import escape
+import re
+
+DOCUMENT_TABLE = 'projects_searchdocument'
+FTS_TABLE = 'projects_search_fts'
+PG_DOCUMENT_EXPRESSION = "to_tsvector('english', title || ' ' || body)"
+
+# kind: (model name, title field or None, fixed title)
+SEARCH_SOURCES = {
+    'project': ('Project', 'name', None),
+    'branding': ('BrandingPackage', None, 'Branding package'),
+    'frontend': ('FrontEndPackage', None, 'Frontend package'),
+    'backend': ('BackEndPackage', None, 'Backend package'),
+    'dashboard': ('DashboardPackage', None, 'Dashboard package'),
+    'media': ('MediaPackage', None, 'Media package'),
+    'sales': ('SalesPackage', None, 'Sales package'),
+    'documentation': ('Documentation', None, 'Documentation'),
+    'page_design': ('PageDesign', 'page_name', None),
+    'application': ('ProjectApplication', 'application_type', None),
+}
+
+# Highlight markers, replaced by <mark> tags after the text is HTML-escaped
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SQLITE_INDEX_SQL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"title, body, content='{DOCUMENT_TABLE}', content_rowid='id', "
+    f"tokenize='porter unicode61', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, body ON {DOCUMENT_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_DROP_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_INDEX_SQL = [
+    f"CREATE INDEX IF NOT EXISTS projects_search_gin ON {DOCUMENT_TABLE} USING gin (({PG_DOCUMENT_EXPRESSION}))",
+]
+POSTGRES_DROP_SQL = [
+    "DROP INDEX IF EXISTS projects_search_gin",
+]
+
+
+def install_search_index(using='default'):
+    """
+    Create the vendor-specific full-text index and (re)build its contents
+    """
+    connection = connections[using]
+    statements = {'sqlite': SQLITE_INDEX_SQL, 'postgresql': POSTGRES_INDEX_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_search_index(using='default'):
+    connection = connections[using]
+    statements = {'sqlite': SQLITE_DROP_SQL, 'postgresql': POSTGRES_DROP_SQL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def ensure_search_index(using='default', **kwargs):
+    """
+    Reinstall the SQLite index if its triggers are missing
+
+    SQLite migrations that alter projects_searchdocument rebuild the table,
+    which drops the triggers. Connected to post_migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or DOCUMENT_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{FTS_TABLE}_%'],
+        )
+        if cursor.fetchone()[0] == 3:
+            return
+    drop_search_index(using)
+    install_search_index(using)
+
+
+def body_fields(model, title_field=None):
+    """
+    Get the free-text fields of a model that make up a document body
+    """
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if isinstance(field, (models.TextField, models.CharField))
+        and not field.choices and field.name != title_field
+    ]
+
+
+def build_document(kind, instance, title_field, title, fields):
+    """
+    Get the SearchDocument field values for an object
+    """
+    project_id = instance.pk if kind == 'project' else instance.project_id
+    return {
+        'kind': kind,
+        'object_id': str(instance.pk),
+        'project_id': project_id,
+        'title': (getattr(instance, title_field) if title_field else title) or '',
+        'body': '\n'.join(value for value in (getattr(instance, name) for name in fields) if value),
+    }
+
+
+def rebuild_search_documents(apps=None, batch_size=2000):
+    """
+    Recreate every SearchDocument from the source tables
+
+    Accepts the historical app registry when called from a migration.
+    Returns the number of documents created.
+    """
+    if apps is None:
+        from django.apps import apps
+
+    SearchDocument = apps.get_model('projects', 'SearchDocument')
+    SearchDocument.objects.all().delete()
+
+    created = 0
+    for kind, (model_name, title_field, title) in SEARCH_SOURCES.items():
+        model = apps.get_model('projects', model_name)
+        fields = body_fields(model, title_field)
+        batch = []
+        for instance in model.objects.iterator(chunk_size=batch_size):
+            batch.append(SearchDocument(**build_document(kind, instance, title_field, title, fields)))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def _source_for(sender):
+    for kind, (model_name, title_field, title) in SEARCH_SOURCES.items():
+        if sender.__name__ == model_name:
+            return kind, title_field, title
+    return None
+
+
+def index_instance(sender, instance, raw=False, **kwargs):
+    """
+    post_save receiver: create or refresh the object's SearchDocument
+    """
+    from .models import SearchDocument
+
+    source = _source_for(sender)
+    if raw or source is None:
+        return
+    kind, title_field, title = source
+    document = build_document(kind, instance, title_field, title, body_fields(sender, title_field))
+    SearchDocument.objects.update_or_create(
+        kind=kind, object_id=document.pop('object_id'), defaults=document
+    )
+
+
+def unindex_instance(sender, instance, **kwargs):
+    """
+    post_delete receiver: drop the object's SearchDocument
+    """
+    from .models import SearchDocument
+
+    source = _source_for(sender)
+    if source is not None:
+        SearchDocument.objects.filter(kind=source[0], object_id=str(instance.pk)).delete()
+
+
+def connect_search_signals():
+    from django.apps import apps
+
+    for kind, (model_name, _, _) in SEARCH_SOURCES.items():
+        model = apps.get_model('projects', model_name)
+        post_save.connect(index_instance, sender=model, dispatch_uid=f'search_index_{kind}')
+        post_delete.connect(unindex_instance, sender=model, dispatch_uid=f'search_unindex_{kind}')
+
+
+def split_terms(query):
+    """
+    Split a search query into word terms, dropping operators and punctuation
+    """
+    return re.findall(r'\w+', query.lower())
+
+
+def render_highlight(text):
+    """
+    HTML-escape highlighted text and turn the match markers into <mark> tags
+    """
+    return escape(text or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _owner_clause(user, connection, column):
+    if user is None or user.is_staff or user.is_superuser:
+        return '', []
+    from .models import Project
+    client_id = Project._meta.get_field('client').get_db_prep_value(user.pk, connection)
+    return f' AND {column} = %s', [client_id]
+
+
+def _sqlite_search(connection, terms, user, kinds, limit, offset):
+    owner_sql, owner_params = _owner_clause(user, connection, 'p.client_id')
+    kind_sql = f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})" if kinds else ''
+    match = ' AND '.join(f'"{term}"*' for term in terms)
+    sql = (
+        f"SELECT d.id, bm25({FTS_TABLE}, 5.0, 1.0) AS rank, "
+        f"highlight({FTS_TABLE}, 0, %s, %s), snippet({FTS_TABLE}, 1, %s, %s, '...', 16) "
+        f"FROM {FTS_TABLE} "
+        f"JOIN {DOCUMENT_TABLE} d ON d.id = {FTS_TABLE}.rowid "
+        f"JOIN projects_project p ON p.id = d.project_id "
+        f"WHERE {FTS_TABLE} MATCH %s{owner_sql}{kind_sql} "
+        f"ORDER BY rank LIMIT %s OFFSET %s"
+    )
+    params = [MARK_START, MARK_END, MARK_START, MARK_END, match, *owner_params, *kinds, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        # bm25() is lower-is-better; expose higher-is-better scores
+        return [(doc_id, -rank, title, snippet) for doc_id, rank, title, snippet in cursor.fetchall()]
+
+
+def _postgres_search(connection, terms, user, kinds, limit, offset):
+    owner_sql, owner_params = _owner_clause(user, connection, 'p.client_id')
+    kind_sql = f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})" if kinds else ''
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    options = f'StartSel={MARK_START}, StopSel={MARK_END}'
+    sql = (
+        f"SELECT d.id, ts_rank_cd({PG_DOCUMENT_EXPRESSION}, q) AS rank, "
+        f"ts_headline('english', d.title, q, %s), "
+        f"ts_headline('english', d.body, q, %s || ', MaxFragments=2, MaxWords=20, MinWords=5') "
+        f"FROM {DOCUMENT_TABLE} d "
+        f"JOIN projects_project p ON p.id = d.project_id, "
+        f"to_tsquery('english', %s) q "
+        f"WHERE {PG_DOCUMENT_EXPRESSION} @@ q{owner_sql}{kind_sql} "
+        f"ORDER BY rank DESC LIMIT %s OFFSET %s"
+    )
+    params = [options, options, tsquery, *owner_params, *kinds, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _fallback_search(terms, user, kinds, limit, offset):
+    from .models import SearchDocument
+
+    documents = SearchDocument.objects.all()
+    for term in terms:
+        documents = documents.filter(models.Q(title__icontains=term) | models.Q(body__icontains=term))
+    if user is not None and not (user.is_staff or user.is_superuser):
+        documents = documents.filter(project__client=user)
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+    return [
+        (doc_id, 0.0, title, body[:200])
+        for doc_id, title, body in documents.order_by('-updated_at').values_list('id', 'title', 'body')[offset:offset + limit]
+    ]
+
+
+def search(query, user=None, kinds=None, limit=20, offset=0, using='default'):
+    """
+    Search the indexed project text
+
+    Non-staff users only get documents of their own projects. Returns a list of
+    hit dictionaries, best match first, with HTML-safe highlighted title and
+    snippet.
+    """
+    from .models import SearchDocument
+
+    terms = split_terms(query)
+    if not terms:
+        return []
+    kinds = list(kinds or [])
+
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        rows = _sqlite_search(connection, terms, user, kinds, limit, offset)
+    elif connection.vendor == 'postgresql':
+        rows = _postgres_search(connection, terms, user, kinds, limit, offset)
+    else:
+        rows = _fallback_search(terms, user, kinds, limit, offset)
+
+    documents = SearchDocument.objects.select_related('project').in_bulk([row[0] for row in rows])
+    hits = []
+    for doc_id, rank, title, snippet in rows:
+        document = documents.get(doc_id)
+        if document is None:
+            continue
+        hits.append({
+            'kind': document.kind,
+            'object_id': document.object_id,
+            'project': {'id': str(document.project_id), 'name': document.project.name},
+            'title': render_highlight(title),
+            'snippet': render_highlight(snippet),
+            'rank': round(float(rank), 4),
+        })
+    return hits
@@ -0,0 +1,337 @@
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections, transaction
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+import hashlib
+import logging
+import random
+import time
+import uuid
+
+from accounts.models import CustomUser, UserProfile, Role
+from .milestones import refresh_project_progress
+from .search import rebuild_search_documents
+from .models import (
+    Project, BrandingPackage, PageDesign, FrontEndPackage, BackEndPackage,
+    DashboardPackage, MediaPackage, SalesPackage, Documentation,
+    ProjectApplication, ProjectMilestone, PACKAGE_FLAGS
+)
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = ['Ahmed', 'Sara', 'John', 'Maria', 'Omar', 'Lina', 'David', 'Aisha', 'Chen', 'Noor',
+               'Fatima', 'James', 'Yusuf', 'Elena', 'Kofi', 'Hana', 'Lucas', 'Mei', 'Ali', 'Grace']
+LAST_NAMES = ['Bashir', 'Smith', 'Garcia', 'Khan', 'Nguyen', 'Hassan', 'Brown', 'Ali', 'Lopez', 'Kim',
+              'Osei', 'Rossi', 'Haddad', 'Silva', 'Tanaka', 'Ibrahim', 'Martin', 'Novak', 'Patel', 'Ahmed']
+PROJECT_WORDS = ['Bakery', 'Clinic', 'Studio', 'Logistics', 'Academy', 'Boutique', 'Garage', 'Travel',
+                 'Realty', 'Fitness', 'Cafe', 'Legal', 'Dental', 'Farm', 'Events', 'Media']
+PROJECT_KINDS = ['Website', 'Web App', 'Rebrand', 'Portal', 'Dashboard', 'Store', 'Booking System']
+MILESTONE_TITLES = ['Project Setup', 'Requirements Review', 'Design Mockups', 'Brand Guidelines',
+                    'Frontend Build', 'API Development', 'Dashboard Setup', 'Content Upload',
+                    'Testing', 'Client Review', 'Launch', 'Handover']
+PAGE_NAMES = ['Home', 'About', 'Services', 'Contact', 'Pricing', 'Blog', 'Portfolio', 'FAQ', 'Team']
+APPLICATION_TYPES = ['Change Request', 'Bug Report', 'New Feature', 'Content Update', 'Support']
+
+# (packages, weight) - common real-world package combinations
+PACKAGE_MIXES = [
+    (('frontend', 'backend'), 30),
+    (('branding', 'frontend'), 15),
+    (('branding', 'frontend', 'backend'), 15),
+    (('frontend', 'backend', 'dashboard'), 12),
+    (('branding',), 8),
+    (('frontend',), 6),
+    (('frontend', 'backend', 'dashboard', 'sales'), 6),
+    (('media', 'frontend', 'backend'), 5),
+    (tuple(PACKAGE_FLAGS), 3),
+]
+STATUS_WEIGHTS = [('pending', 20), ('in_progress', 45), ('completed', 30), ('terminated', 5)]
+ROLE_WEIGHTS = [(Role.CLIENT, 90), (Role.STAFF, 8), (Role.ADMIN, 2)]
+
+PACKAGE_MODELS = {
+    'branding': BrandingPackage,
+    'frontend': FrontEndPackage,
+    'backend': BackEndPackage,
+    'dashboard': DashboardPackage,
+    'media': MediaPackage,
+    'sales': SalesPackage,
+}
+
+SEED_PASSWORD = 'Seed-password-1!'
+
+# Dates are generated around this moment, so a seed gives the same rows on any day
+SEED_ANCHOR = datetime(2025, 1, 1, 12, tzinfo=dt_timezone.utc)
+
+# Rows generated from one random stream; batches are whole multiples of this,
+# so the dataset only depends on the seed, not on batch size or worker count
+RNG_BLOCK = 1000
+DEFAULT_BATCH_SIZE = 5000
+
+
+def chunked(count, batch_size):
+    """
+    Yield (start, stop) ranges covering `count` items in batches
+    """
+    for start in range(0, count, batch_size):
+        yield start, min(start + batch_size, count)
+
+
+def seeded_uuid(seed, kind, index):
+    """
+    Deterministic UUID4 for the `index`-th row of a table
+    """
+    digest = hashlib.blake2b(f'{seed}:{kind}:{index}'.encode(), digest_size=16).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def block_rngs(seed, kind, start, stop):
+    """
+    Yield (index, rng) for each row, switching random stream every RNG_BLOCK rows
+    """
+    rng = None
+    for index in range(start, stop):
+        if rng is None or index % RNG_BLOCK == 0:
+            rng = random.Random(f'{seed}:{kind}:{index // RNG_BLOCK}')
+        yield index, rng
+
+
+def weighted_choice(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def seed_users(seed, start, stop, counts, context):
+    password = make_password(SEED_PASSWORD, salt=f'seeddata{seed}')
+    roles = context['roles']
+    now = context['now']
+    users = []
+    profiles = []
+
+    for index, rng in block_rngs(seed, 'users', start, stop):
+        role_name = weighted_choice(rng, ROLE_WEIGHTS)
+        user = CustomUser(
+            id=seeded_uuid(seed, 'users', index),
+            email=f'user{index}.seed{seed}@example.com',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            phone_number=f'+1555{rng.randrange(10 ** 7):07d}',
+            password=password,
+            is_active=rng.random() < 0.97,
+            is_verified=rng.random() < 0.9,
+            is_staff=role_name != Role.CLIENT,
+            date_joined=now - timedelta(days=rng.randrange(3 * 365)),
+        )
+        users.append(user)
+        profiles.append(UserProfile(
+            id=seeded_uuid(seed, 'profiles', index),
+            user=user,
+            role_id=roles[role_name],
+            location=rng.choice(['', 'Khartoum', 'Dubai', 'London', 'Nairobi', 'Toronto']),
+            last_active=now - timedelta(minutes=rng.randrange(60 * 24 * 90)),
+        ))
+
+    CustomUser.objects.bulk_create(users)
+    UserProfile.objects.bulk_create(profiles)
+    return len(users)
+
+
+def seed_projects(seed, start, stop, counts, context):
+    projects = []
+    packages = {name: [] for name in PACKAGE_MODELS}
+    documentation = []
+
+    for index, rng in block_rngs(seed, 'projects', start, stop):
+        mix = weighted_choice(rng, PACKAGE_MIXES)
+        project = Project(
+            id=seeded_uuid(seed, 'projects', index),
+            client_id=seeded_uuid(seed, 'users', rng.randrange(counts['users'])),
+            name=f'{rng.choice(PROJECT_WORDS)} {rng.choice(PROJECT_KINDS)} {index}',
+            status=weighted_choice(rng, STATUS_WEIGHTS),
+            **{f'includes_{name}': name in mix for name in PACKAGE_FLAGS}
+        )
+        projects.append(project)
+
+        for name in mix:
+            packages[name].append(PACKAGE_MODELS[name](project=project))
+        documentation.append(Documentation(project=project))
+
+    Project.objects.bulk_create(projects)
+    for name, rows in packages.items():
+        PACKAGE_MODELS[name].objects.bulk_create(rows)
+    Documentation.objects.bulk_create(documentation)
+    return len(projects)
+
+
+def seed_milestones(seed, start, stop, counts, context):
+    now = context['now']
+    milestones = []
+
+    for index, rng in block_rngs(seed, 'milestones', start, stop):
+        # Most work clusters around the present, with a long tail either side
+        due_date = now + timedelta(days=max(-365, min(365, rng.gauss(10, 45))))
+        if due_date < now:
+            is_completed = rng.random() < 0.8
+        else:
+            is_completed = rng.random() < 0.1
+        milestones.append(ProjectMilestone(
+            project_id=seeded_uuid(seed, 'projects', rng.randrange(counts['projects'])),
+            title=rng.choice(MILESTONE_TITLES),
+            description=f'Synthetic milestone {index}',
+            due_date=due_date,
+            is_completed=is_completed,
+            completion_date=due_date - timedelta(days=rng.randrange(7)) if is_completed else None,
+        ))
+
+    ProjectMilestone.objects.bulk_create(milestones)
+    return len(milestones)
+
+
+def seed_page_designs(seed, start, stop, counts, context):
+    page_designs = [
+        PageDesign(
+            project_id=seeded_uuid(seed, 'projects', rng.randrange(counts['projects'])),
+            page_name=rng.choice(PAGE_NAMES),
+            page_sections=', '.join(rng.sample(
+                ['hero banner', 'image gallery', 'testimonials', 'pricing table',
+                 'contact form', 'team photos', 'blog feed', 'map'], 3
+            )),
+        )
+        for index, rng in block_rngs(seed, 'page_designs', start, stop)
+    ]
+    PageDesign.objects.bulk_create(page_designs)
+    return len(page_designs)
+
+
+def seed_applications(seed, start, stop, counts, context):
+    applications = [
+        ProjectApplication(
+            project_id=seeded_uuid(seed, 'projects', rng.randrange(counts['projects'])),
+            applicant_id=seeded_uuid(seed, 'users', rng.randrange(counts['users'])),
+            application_type=rng.choice(APPLICATION_TYPES),
+            application_details=f'Synthetic application {index}',
+            priority_level=weighted_choice(rng, [(0, 30), (1, 45), (2, 20), (3, 5)]),
+            is_addressed=rng.random() < 0.6,
+        )
+        for index, rng in block_rngs(seed, 'applications', start, stop)
+    ]
+    ProjectApplication.objects.bulk_create(applications)
+    return len(applications)
+
+
+# Tables in dependency order
+SEED_TABLES = [
+    ('users', seed_users),
+    ('projects', seed_projects),
+    ('milestones', seed_milestones),
+    ('page_designs', seed_page_designs),
+    ('applications', seed_applications),
+]
+SEED_FUNCTIONS = dict(SEED_TABLES)
+
+
+def seed_batch(table, seed, start, stop, counts, context):
+    """
+    Create one batch of rows in its own transaction
+    """
+    with transaction.atomic():
+        return SEED_FUNCTIONS[table](seed, start, stop, counts, context)
+
+
+def _init_seed_worker():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+
+
+def refresh_seeded_progress(seed, projects, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Set the seeded projects' progress from their milestones, one UPDATE per
+    batch of projects; other projects in the database are left alone
+    """
+    updated = 0
+    for start, stop in chunked(projects, batch_size):
+        updated += refresh_project_progress(
+            [seeded_uuid(seed, 'projects', index) for index in range(start, stop)]
+        )
+    return updated
+
+
+def seed_dataset(users=100, projects=1000, milestones=5000, page_designs=0, applications=0,
+                 seed=0, batch_size=DEFAULT_BATCH_SIZE, workers=1, progress=None, anchor=SEED_ANCHOR):
+    """
+    Bulk-create a deterministic synthetic dataset
+
+    Each table is filled in batches of `batch_size` rows (rounded up to a
+    multiple of RNG_BLOCK), every batch in its own transaction. With workers > 1
+    the batches of a table run in a process pool; tables are seeded in
+    dependency order. The same seed always produces the same rows.
+    Milestone dates are spread around `anchor` (SEED_ANCHOR by default); pass
+    timezone.now() for data relative to the present.
+    `progress` is called with (table, rows, seconds) after each table.
+    Returns a dictionary of created row counts.
+    """
+    counts = {
+        'users': users,
+        'projects': projects,
+        'milestones': milestones,
+        'page_designs': page_designs,
+        'applications': applications,
+    }
+    if users < 1 and any(counts[table] for table in ('projects', 'applications')):
+        raise ValueError("At least one user is required to seed projects or applications")
+    if projects < 1 and any(counts[table] for table in ('milestones', 'page_designs', 'applications')):
+        raise ValueError("At least one project is required to seed milestones, page designs or applications")
+
+    batch_size = max(RNG_BLOCK, -(-batch_size // RNG_BLOCK) * RNG_BLOCK)
+    if workers > 1 and connection.vendor == 'sqlite':
+        logger.warning("SQLite serialises writers; seeding with a single worker")
+        workers = 1
+
+    context = {
+        'now': anchor,
+        'roles': {
+            name: Role.objects.get_or_create(name=name)[0].pk
+            for name, _ in Role.ROLE_CHOICES
+        },
+    }
+
+    executor = None
+    if workers > 1:
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_seed_worker)
+
+    try:
+        for table, _ in SEED_TABLES:
+            started = time.perf_counter()
+            batches = list(chunked(counts[table], batch_size))
+            if executor:
+                futures = [
+                    executor.submit(seed_batch, table, seed, start, stop, counts, context)
+                    for start, stop in batches
+                ]
+                for future in futures:
+                    future.result()
+            else:
+                for start, stop in batches:
+                    seed_batch(table, seed, start, stop, counts, context)
+
+            if progress:
+                progress(table, counts[table], time.perf_counter() - started)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if projects and milestones:
+        refresh_seeded_progress(seed, projects, batch_size)
+
+    # bulk_create bypasses the search index receivers
+    started = time.perf_counter()
+    documents = rebuild_search_documents()
+    if progress:
+        progress('search_index', documents, time.perf_counter() - started)
+
+    return counts
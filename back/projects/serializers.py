@@ -11,6 +11,50 @@ from .models import (
 )
 
 
+def parse_fieldset(value):
+    """
+    Parse a ?fields= value such as 'id,status,client.email' into a tree:
+    {'id': None, 'status': None, 'client': {'email': None}}
+    """
+    fieldset = {}
+    for path in value.split(','):
+        parts = [part.strip() for part in path.split('.') if part.strip()]
+        node = fieldset
+        for index, part in enumerate(parts):
+            if index == len(parts) - 1:
+                node.setdefault(part, None)
+            else:
+                if node.get(part) is None:
+                    node[part] = {}
+                node = node[part]
+    return fieldset
+
+
+def prune_fields(serializer, fieldset):
+    """
+    Drop the fields of a serializer (and of nested serializers) that are not
+    in the fieldset tree, so they are never evaluated
+    """
+    for name in list(serializer.fields):
+        if name not in fieldset:
+            serializer.fields.pop(name)
+        elif fieldset[name]:
+            nested = serializer.fields[name]
+            nested = getattr(nested, 'child', nested)
+            if isinstance(nested, serializers.Serializer):
+                prune_fields(nested, fieldset[name])
+
+
+class SparseFieldsetMixin:
+    """Restrict the serialized fields to context['fieldset'] (see parse_fieldset)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get('fieldset')
+        if fieldset:
+            prune_fields(self, fieldset)
+
+
 class ProjectMilestoneListSerializer(serializers.ModelSerializer):
     """Serializer for listing ProjectMilestone objects"""
     days_until = serializers.SerializerMethodField()
@@ -242,7 +286,7 @@ class ProjectListSerializer(serializers.ModelSerializer):
         return obj.get_project_code()
 
 
-class ProjectDetailSerializer(serializers.ModelSerializer):
+class ProjectDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Detailed serializer for Project objects with nested related data"""
     client = UserDetailSerializer(read_only=True)
     milestones = ProjectMilestoneListSerializer(many=True, read_only=True)
@@ -555,7 +599,7 @@ class CompleteProjectPackageSerializer(serializers.ModelSerializer):
 
 class CompleteMilestoneSerializer(serializers.Serializer):
     """Serializer for marking a milestone as completed"""
-    milestone_id = serializers.UUIDField()
+    milestone_id = serializers.IntegerField(min_value=1)
     
     def validate_milestone_id(self, value):
         try:
@@ -570,6 +614,47 @@ class CompleteMilestoneSerializer(serializers.Serializer):
         return milestone
 
 
+def validate_batch_size(value):
+    limit = getattr(settings, 'MILESTONE_BATCH_LIMIT', 500)
+    if len(value) > limit:
+        raise serializers.ValidationError(f"At most {limit} milestones per request.")
+    return value
+
+
+class MilestoneBatchSerializer(serializers.Serializer):
+    """Serializer for completing or deleting many milestones, across projects, at once"""
+    milestone_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
+    
+    def validate_milestone_ids(self, value):
+        return validate_batch_size(list(dict.fromkeys(value)))
+
+
+class RescheduleMilestonesSerializer(MilestoneBatchSerializer):
+    """Serializer for shifting the due dates of many milestones by a number of days"""
+    days = serializers.IntegerField(min_value=-3650, max_value=3650)
+    
+    def validate_days(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Must not be 0.")
+        return value
+
+
+class MilestoneBatchItemSerializer(serializers.Serializer):
+    """One milestone of a batch creation"""
+    project = serializers.UUIDField()
+    title = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    due_date = serializers.DateTimeField()
+
+
+class CreateMilestonesSerializer(serializers.Serializer):
+    """Serializer for creating many milestones, across projects, at once"""
+    milestones = MilestoneBatchItemSerializer(many=True, allow_empty=False)
+    
+    def validate_milestones(self, value):
+        return validate_batch_size(value)
+
+
 class ProjectStatisticsSerializer(serializers.Serializer):
     """Serializer for project statistics"""
     start_date = serializers.DateField(required=False)
@@ -630,27 +715,17 @@ class ProjectApplicationCreateSerializer(serializers.ModelSerializer):
 
 
 class ClientProjectsSerializer(serializers.ModelSerializer):
-    """Serializer for listing a client's projects"""
-    projects_count = serializers.SerializerMethodField()
-    active_projects = serializers.SerializerMethodField()
-    completed_projects = serializers.SerializerMethodField()
-    pending_projects = serializers.SerializerMethodField()
+    """Serializer for listing a client's projects (counts are annotated by ClientProjectsView)"""
+    projects_count = serializers.IntegerField(read_only=True)
+    active_projects = serializers.IntegerField(read_only=True)
+    completed_projects = serializers.IntegerField(read_only=True)
+    pending_projects = serializers.IntegerField(read_only=True)
+    last_project_date = serializers.DateTimeField(read_only=True)
     
     class Meta:
         model = CustomUser
         fields = [
             'id', 'email', 'first_name', 'last_name',
-            'projects_count', 'active_projects', 'completed_projects', 'pending_projects'
-        ]
-    
-    def get_projects_count(self, obj):
-        return obj.projects.count()
-    
-    def get_active_projects(self, obj):
-        return obj.projects.filter(status='in_progress').count()
-    
-    def get_completed_projects(self, obj):
-        return obj.projects.filter(status='completed').count()
-    
-    def get_pending_projects(self, obj):
-        return obj.projects.filter(status='pending').count()
\ No newline at end of file
+            'projects_count', 'active_projects', 'completed_projects', 'pending_projects',
+            'last_project_date'
+        ]
\ No newline at end of file
@@ -10,6 +10,7 @@ from .models import (
     DashboardPackage, MediaPackage, SalesPackage, Documentation,
     ProjectApplication, ProjectMilestone
 )
+from .milestones import refresh_project_progress
 
 
 @receiver(post_save, sender=Project)
@@ -90,7 +91,7 @@ def update_project_progress(sender, instance, **kwargs):
     """
     Update project progress when milestones are updated
     """
-    instance.project.recalculate_progress()
+    refresh_project_progress([instance.project_id])
 
 
 @receiver(post_delete, sender=ProjectMilestone)
@@ -98,12 +99,8 @@ def update_project_progress_on_delete(sender, instance, **kwargs):
     """
     Update project progress when milestones are deleted
     """
-    try:
-        # The milestone is already deleted, but we can still reference the project
-        instance.project.recalculate_progress()
-    except Project.DoesNotExist:
-        # Project might have been deleted as well
-        pass
+    # A no-op when the project was deleted as well
+    refresh_project_progress([instance.project_id])
 
 
 @receiver(pre_save, sender=Project)
@@ -1,3 +1,729 @@
+from django.core import mail
+from django.core.cache import caches
+from django.db import DatabaseError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from unittest import mock
+from datetime import timedelta
 
-# Create your tests here.
+from accounts.models import CustomUser
+from accounts.utils import get_tokens_for_user
+from back.caching import CACHE_ALIASES
+from .fast_serializers import (
+    CompiledProjectListSerializer, CompiledProjectMilestoneListSerializer,
+    CompiledProjectApplicationListSerializer
+)
+from .models import (
+    Project, ProjectMilestone, ProjectApplication, MilestoneNotification, BrandingPackage, FrontEndPackage
+)
+from .milestones import complete_milestones, create_milestones, delete_milestones
+from .notifications import build_digests, claim_unsent, run_milestone_notifications, send_digests
+from .search import search
+from .seeding import seed_dataset
+from .views import ProjectViewSet
+
+
+class CompiledListSerializerParityTests(TestCase):
+    """The compiled list serializers must render exactly like the DRF ones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=20, projects=60, milestones=200, applications=60, seed=7)
+
+        # Edge cases the random data may miss
+        # No profile, so no role
+        client = CustomUser.objects.create_user(
+            email='parity@example.com', password='x', first_name='Solo', last_name='Client'
+        )
+        now = timezone.now()
+        for progress in (0, 20, 60, 90):
+            Project.objects.create(client=client, name=f'No milestones {progress}', progress=progress)
+        completed = Project.objects.create(
+            client=client, name='Completed', status='completed', progress=100, finished_date=now
+        )
+        ProjectMilestone.objects.create(
+            project=completed, title='Done', due_date=now, is_completed=True, completion_date=now
+        )
+        ProjectApplication.objects.create(project=completed, applicant=client, application_type='Edge')
+
+    def assertSameOutput(self, compiled_class, queryset):
+        # Freeze "now" so date-relative fields agree
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            expected = compiled_class.serializer_class(queryset, many=True).data
+            actual = compiled_class(compiled_class.get_rows(queryset)).data
+
+        self.assertEqual(len(actual), queryset.count())
+        renderer = JSONRenderer()
+        for expected_item, actual_item in zip(expected, actual):
+            self.assertEqual(renderer.render(actual_item), renderer.render(expected_item))
+
+    def test_project_list(self):
+        self.assertSameOutput(CompiledProjectListSerializer, Project.objects.order_by('pk'))
+
+    def test_milestone_list(self):
+        self.assertSameOutput(CompiledProjectMilestoneListSerializer, ProjectMilestone.objects.order_by('pk'))
+
+    def test_application_list(self):
+        self.assertSameOutput(CompiledProjectApplicationListSerializer, ProjectApplication.objects.order_by('pk'))
+
+
+def clear_caches():
+    for alias in CACHE_ALIASES:
+        caches[alias].clear()
+
+
+class AsyncProjectViewTests(TestCase):
+    """The ASGI-native project reads answer like ProjectViewSet"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=5, projects=25, milestones=60, applications=10, seed=3)
+        cls.admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', password='x', first_name='Ada', last_name='Admin'
+        )
+        cls.project = Project.objects.order_by('pk').first()
+
+    def setUp(self):
+        clear_caches()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.jwt_headers = {'Authorization': f"Bearer {get_tokens_for_user(self.admin)['access']}"}
+
+    def sync_response(self, actions, path, user, **kwargs):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, user=user)
+        return ProjectViewSet.as_view(actions)(request, **kwargs).render()
+
+    def test_list_matches_sync_view(self):
+        path = reverse('projects:project-list') + '?page=2'
+
+        # Freeze "now" so date-relative fields agree
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            response = self.api.get(path)
+            expected = self.sync_response({'get': 'list'}, path, self.admin)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.json()['count'], Project.objects.count())
+
+    def test_list_shows_clients_their_own_projects(self):
+        client = self.project.client
+        self.api.force_authenticate(client)
+
+        response = self.api.get(reverse('projects:project-list'), {'page_size': 100})
+
+        self.assertEqual(response.json()['count'], Project.objects.filter(client=client).count())
+
+    def test_list_rejects_out_of_range_page(self):
+        response = self.api.get(reverse('projects:project-list'), {'page': 99})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_detail_matches_sync_view(self):
+        path = reverse('projects:project-detail', kwargs={'pk': self.project.pk})
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now()):
+            response = self.api.get(path)
+            expected = self.sync_response({'get': 'retrieve'}, path, self.admin, pk=self.project.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_detail_answers_304_to_current_etag(self):
+        path = reverse('projects:project-detail', kwargs={'pk': self.project.pk})
+        etag = self.api.get(path)['ETag']
+
+        response = self.api.get(path, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_is_hidden_from_other_clients(self):
+        other = CustomUser.objects.exclude(pk=self.project.client_id).filter(is_staff=False).first()
+        self.api.force_authenticate(other)
+
+        response = self.api.get(reverse('projects:project-detail', kwargs={'pk': self.project.pk}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_go_to_project_viewset(self):
+        path = reverse('projects:project-detail', kwargs={'pk': self.project.pk})
+
+        response = self.api.patch(path, {'name': 'Renamed'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Renamed')
+
+    async def test_reads_under_asgi(self):
+        headers = self.jwt_headers
+
+        list_response = await self.async_client.get(reverse('projects:project-list'), headers=headers)
+        detail_response = await self.async_client.get(
+            reverse('projects:project-detail', kwargs={'pk': self.project.pk}), headers=headers
+        )
+
+        self.assertEqual(list_response.status_code, 200)
+        self.assertEqual(detail_response.status_code, 200)
+        self.assertEqual(detail_response.json()['id'], str(self.project.pk))
+
+    def test_dashboard_requires_admin(self):
+        self.api.force_authenticate(self.project.client)
+
+        response = self.api.get(reverse('projects:dashboard-data'))
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_dashboard(self):
+        response = self.api.get(reverse('projects:dashboard-data'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['projects']['total'], Project.objects.count())
+
+
+
+class PackageFilterTests(TestCase):
+    """?packages= narrows the project listing only"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', password='x', first_name='Ada', last_name='Admin'
+        )
+        cls.sales = Project.objects.create(client=cls.admin, name='Sales', includes_sales=True)
+        cls.frontend = Project.objects.create(client=cls.admin, name='Frontend', includes_frontend=True)
+
+    def setUp(self):
+        clear_caches()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def test_list_is_filtered(self):
+        response = self.api.get(reverse('projects:project-list') + '?packages=frontend')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [str(self.frontend.pk)])
+
+    def test_detail_ignores_filter(self):
+        path = reverse('projects:project-detail', kwargs={'pk': self.sales.pk}) + '?packages=frontend'
+
+        self.assertEqual(self.api.get(path).status_code, 200)
+        response = self.api.patch(path, {'name': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.api.delete(path).status_code, 204)
+
+class CompressedETagTests(TestCase):
+    """ETags of compressed responses stay usable for conditional writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=2, projects=1, milestones=20, applications=5, seed=5)
+        cls.admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', password='x', first_name='Ada', last_name='Admin'
+        )
+        cls.project = Project.objects.get()
+
+    def setUp(self):
+        clear_caches()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.path = reverse('projects:project-detail', kwargs={'pk': self.project.pk})
+
+    def get_compressed_etag(self):
+        response = self.api.get(self.path, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        return response['ETag']
+
+    def test_patch_with_etag_of_compressed_response(self):
+        etag = self.get_compressed_etag()
+
+        response = self.api.patch(self.path, {'name': 'Renamed'}, format='json', headers={'If-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Renamed')
+
+    def test_get_with_etag_of_compressed_response(self):
+        etag = self.get_compressed_etag()
+
+        response = self.api.get(self.path, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_stale_weak_etag_is_rejected(self):
+        etag = self.get_compressed_etag()
+        self.api.patch(self.path, {'name': 'Renamed'}, format='json')
+
+        response = self.api.patch(self.path, {'name': 'Lost update'}, format='json', headers={'If-Match': etag})
+
+        self.assertEqual(response.status_code, 412)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Renamed')
+
+
+class MilestoneNotificationClaimTests(TestCase):
+    """Digest entries are claimed in the ledger before they are sent"""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = CustomUser.objects.create_user(
+            email='due@example.com', password='x', first_name='Due', last_name='Client'
+        )
+        project = Project.objects.create(client=client, name='Due project')
+        cls.milestone = ProjectMilestone.objects.create(
+            project=project, title='Overdue', due_date=timezone.now() - timedelta(days=1)
+        )
+
+    def setUp(self):
+        self.now = timezone.now()
+
+    def build(self):
+        return build_digests([ProjectMilestone.objects.select_related('project__client').get()], self.now)
+
+    def test_overlapping_runs_claim_disjoint_entries(self):
+        _, first = claim_unsent(self.build(), self.now.date())
+        _, second = claim_unsent(self.build(), self.now.date())
+
+        self.assertEqual([digest['recipient'] for digest in first], ['due@example.com'])
+        self.assertEqual(second, [])
+
+    def test_run_sends_each_digest_once(self):
+        with self.settings(PROJECT_NOTIFICATION_EMAIL=None):
+            first = run_milestone_notifications(now=self.now, shards=1)
+            second = run_milestone_notifications(now=self.now, shards=1)
+
+        self.assertEqual(first, {'sent': 1, 'failed': 0})
+        self.assertEqual(second, {'sent': 0, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failed_send_releases_claim(self):
+        claim, digests = claim_unsent(self.build(), self.now.date())
+        connection = mock.Mock()
+        connection.send_messages.side_effect = OSError('connection reset')
+
+        result = send_digests(digests, claim, now=self.now, connection=connection)
+
+        self.assertEqual(result, {'sent': 0, 'failed': 1})
+        self.assertFalse(MilestoneNotification.objects.exists())
+        _, retried = claim_unsent(self.build(), self.now.date())
+        self.assertEqual(len(retried), 1)
+
+
+class ConditionalRequestTests(TestCase):
+    """Project and package resources answer 304 and 412 from their version stamp"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = CustomUser.objects.create_user(
+            email='owner@example.com', password='x', first_name='Owner', last_name='Client'
+        )
+        cls.other = CustomUser.objects.create_user(
+            email='other@example.com', password='x', first_name='Other', last_name='Client'
+        )
+        cls.project = Project.objects.create(client=cls.client_user, name='Versioned')
+        FrontEndPackage.objects.create(project=cls.project)
+
+    def setUp(self):
+        clear_caches()
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+        self.path = reverse('projects:project-detail', kwargs={'pk': self.project.pk})
+
+    def test_unchanged_project_is_not_modified(self):
+        etag = self.api.get(self.path)['ETag']
+
+        response = self.api.get(self.path, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_child_change_invalidates_etag(self):
+        etag = self.api.get(self.path)['ETag']
+        ProjectMilestone.objects.create(project=self.project, title='New', due_date=timezone.now())
+
+        response = self.api.get(self.path, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_summary_is_not_modified(self):
+        path = reverse('projects:project-summary', kwargs={'pk': self.project.pk})
+        etag = self.api.get(path)['ETag']
+
+        self.assertEqual(self.api.get(path, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_write_with_current_etag(self):
+        etag = self.api.get(self.path)['ETag']
+
+        response = self.api.patch(self.path, {'name': 'Renamed'}, format='json', headers={'If-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_write_with_stale_etag(self):
+        etag = self.api.get(self.path)['ETag']
+        self.api.patch(self.path, {'name': 'Renamed'}, format='json')
+
+        response = self.api.patch(self.path, {'name': 'Lost update'}, format='json', headers={'If-Match': etag})
+
+        self.assertEqual(response.status_code, 412)
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.name, 'Renamed')
+
+    def test_package_write_bumps_project_etag(self):
+        package_path = reverse('projects:frontend-package', kwargs={'pk': self.project.pk})
+        project_etag = self.api.get(self.path)['ETag']
+        package_etag = self.api.get(package_path)['ETag']
+
+        response = self.api.patch(
+            package_path, {'needs_web_template': True}, format='json', headers={'If-Match': package_etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.api.patch(package_path, {}, format='json', headers={'If-Match': package_etag}).status_code, 412
+        )
+        self.assertEqual(self.api.get(self.path, headers={'If-None-Match': project_etag}).status_code, 200)
+
+    def test_invisible_project_is_not_found(self):
+        etag = self.api.get(self.path)['ETag']
+        self.api.force_authenticate(self.other)
+
+        response = self.api.get(self.path, headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= and ?expand= shape the project detail payload"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=2, projects=1, milestones=5, applications=2, seed=7)
+        cls.admin = CustomUser.objects.create_superuser(
+            email='admin@example.com', password='x', first_name='Ada', last_name='Admin'
+        )
+        cls.project = Project.objects.get()
+
+    def setUp(self):
+        clear_caches()
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+        self.path = reverse('projects:project-detail', kwargs={'pk': self.project.pk})
+
+    def test_selected_fields(self):
+        response = self.api.get(self.path + '?fields=id,status,client.email')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'id': str(self.project.pk),
+            'status': self.project.status,
+            'client': {'email': self.project.client.email},
+        })
+
+    def test_expand_adds_relations_to_plain_fields(self):
+        data = self.api.get(self.path + '?expand=milestones').json()
+
+        self.assertIn('name', data)
+        self.assertEqual(len(data['milestones']), self.project.milestones.count())
+        self.assertNotIn('client', data)
+        self.assertNotIn('applications', data)
+
+    def test_expand_adds_relations_to_selected_fields(self):
+        data = self.api.get(self.path + '?fields=id&expand=client').json()
+
+        self.assertEqual(set(data), {'id', 'client'})
+
+    def test_unknown_field(self):
+        response = self.api.get(self.path + '?fields=id,secret')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['fields'])
+
+    def test_unknown_relation(self):
+        response = self.api.get(self.path + '?expand=name')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('expand', response.json())
+
+    def test_sparse_read_skips_unused_relations(self):
+        with self.assertNumQueries(2):
+            # Version stamp, then the project row alone
+            self.api.get(self.path + '?fields=id,name')
+
+
+class MilestoneProgressTests(TestCase):
+    """Completing milestones updates project progress in the same transaction"""
+
+    @classmethod
+    def setUpTestData(cls):
+        client = CustomUser.objects.create_user(
+            email='progress@example.com', password='x', first_name='Pro', last_name='Gress'
+        )
+        cls.projects = [Project.objects.create(client=client, name=f'Project {n}') for n in range(2)]
+        for project in cls.projects:
+            ProjectMilestone.objects.bulk_create([
+                ProjectMilestone(project=project, title=f'Step {n}', due_date=timezone.now()) for n in range(4)
+            ])
+
+    def progress(self):
+        return list(Project.objects.filter(pk__in=[project.pk for project in self.projects])
+                    .order_by('name').values_list('progress', flat=True))
+
+    def test_mark_completed(self):
+        milestone = ProjectMilestone.objects.filter(project=self.projects[0]).first()
+        revision = self.projects[0].revision
+
+        milestone.mark_completed()
+
+        milestone.refresh_from_db()
+        self.assertTrue(milestone.is_completed)
+        self.assertEqual(self.progress(), [25, 0])
+        self.assertEqual(Project.objects.get(pk=self.projects[0].pk).revision, revision + 1)
+
+    def test_complete_across_projects(self):
+        first, second = (ProjectMilestone.objects.filter(project=project) for project in self.projects)
+        complete_milestones(first.filter(pk=first.first().pk))
+
+        completed = complete_milestones(ProjectMilestone.objects.filter(
+            pk__in=[*first.values_list('pk', flat=True)[:2], *second.values_list('pk', flat=True)[:3]]
+        ))
+
+        # The milestone completed earlier is left alone
+        self.assertEqual(len(completed), 4)
+        self.assertEqual(self.progress(), [50, 75])
+
+    def test_statements_do_not_grow_with_milestones(self):
+        def statements(milestones):
+            with CaptureQueriesContext(connection) as queries:
+                complete_milestones(milestones)
+            return len(queries)
+
+        first = ProjectMilestone.objects.filter(project=self.projects[0]).first()
+        one = statements(ProjectMilestone.objects.filter(pk=first.pk))
+        many = statements(ProjectMilestone.objects.filter(is_completed=False))
+
+        self.assertEqual(one, many)
+        self.assertEqual(self.progress(), [100, 100])
+
+    def test_failed_progress_update_rolls_back(self):
+        with mock.patch('projects.milestones.refresh_project_progress', side_effect=DatabaseError('boom')):
+            with self.assertRaises(DatabaseError):
+                complete_milestones(ProjectMilestone.objects.filter(project=self.projects[0]))
+
+        self.assertFalse(ProjectMilestone.objects.filter(is_completed=True).exists())
+        self.assertEqual(self.progress(), [0, 0])
+
+    def test_create_and_delete_refresh_progress(self):
+        complete_milestones(ProjectMilestone.objects.filter(project=self.projects[0]))
+
+        create_milestones([
+            ProjectMilestone(project=self.projects[0], title=f'Extra {n}', due_date=timezone.now()) for n in range(4)
+        ])
+        self.assertEqual(self.progress(), [50, 0])
+
+        delete_milestones(ProjectMilestone.objects.filter(project=self.projects[0], is_completed=False))
+        self.assertEqual(self.progress(), [100, 0])
+
+        delete_milestones(ProjectMilestone.objects.filter(project=self.projects[0]))
+        self.assertEqual(self.progress(), [0, 0])
+
+
+class MilestoneBatchTests(TestCase):
+    """Batch milestone endpoints apply all of a request or none of it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user(
+            email='owner@example.com', password='x', first_name='Owner', last_name='Client'
+        )
+        other = CustomUser.objects.create_user(
+            email='other@example.com', password='x', first_name='Other', last_name='Client'
+        )
+        cls.project = Project.objects.create(client=cls.owner, name='Mine')
+        cls.foreign = Project.objects.create(client=other, name='Theirs')
+        cls.due = timezone.now()
+        cls.mine = ProjectMilestone.objects.bulk_create([
+            ProjectMilestone(project=cls.project, title=f'Step {n}', due_date=cls.due) for n in range(3)
+        ])
+        cls.theirs = ProjectMilestone.objects.create(project=cls.foreign, title='Hidden', due_date=cls.due)
+
+    def setUp(self):
+        clear_caches()
+        self.api = APIClient()
+        self.api.force_authenticate(self.owner)
+
+    def post(self, name, data):
+        return self.api.post(reverse(f'projects:milestone-{name}'), data, format='json')
+
+    def test_complete_batch(self):
+        self.mine[0].mark_completed()
+
+        response = self.post('complete-batch', {'milestone_ids': [m.pk for m in self.mine]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['completed'], [m.pk for m in self.mine[1:]])
+        self.assertEqual(response.json()['already_completed'], [self.mine[0].pk])
+        self.assertEqual(response.json()['projects'], [{'id': str(self.project.pk), 'progress': 100}])
+
+    def test_invisible_milestone_fails_whole_batch(self):
+        response = self.post('complete-batch', {'milestone_ids': [self.mine[0].pk, self.theirs.pk, 999999]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.theirs.pk), response.json()['milestone_ids'][0])
+        self.assertIn('999999', response.json()['milestone_ids'][0])
+        self.assertFalse(ProjectMilestone.objects.filter(is_completed=True).exists())
+
+    def test_create_batch(self):
+        response = self.post('create-batch', {'milestones': [
+            {'project': str(self.project.pk), 'title': 'Launch', 'due_date': self.due.isoformat()},
+            {'project': str(self.project.pk), 'title': 'Review', 'due_date': self.due.isoformat()},
+        ]})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['created']), 2)
+        self.assertEqual(self.project.milestones.count(), 5)
+
+    def test_create_batch_with_invisible_project_creates_nothing(self):
+        response = self.post('create-batch', {'milestones': [
+            {'project': str(self.project.pk), 'title': 'Launch', 'due_date': self.due.isoformat()},
+            {'project': str(self.foreign.pk), 'title': 'Sneak', 'due_date': self.due.isoformat()},
+        ]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProjectMilestone.objects.count(), 4)
+
+    def test_invalid_item_creates_nothing(self):
+        response = self.post('create-batch', {'milestones': [
+            {'project': str(self.project.pk), 'title': 'Launch', 'due_date': self.due.isoformat()},
+            {'project': str(self.project.pk), 'title': 'No date'},
+        ]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(ProjectMilestone.objects.count(), 4)
+
+    def test_reschedule_batch(self):
+        response = self.post('reschedule-batch', {'milestone_ids': [self.mine[0].pk], 'days': -3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ProjectMilestone.objects.get(pk=self.mine[0].pk).due_date, self.due - timedelta(days=3))
+        self.assertEqual(ProjectMilestone.objects.get(pk=self.mine[1].pk).due_date, self.due)
+
+    def test_reschedule_batch_rejects_zero_days(self):
+        response = self.post('reschedule-batch', {'milestone_ids': [self.mine[0].pk], 'days': 0})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_batch(self):
+        self.mine[0].mark_completed()
+
+        response = self.post('delete-batch', {'milestone_ids': [self.mine[1].pk, self.mine[2].pk]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['projects'], [{'id': str(self.project.pk), 'progress': 100}])
+        self.assertEqual(list(self.project.milestones.values_list('pk', flat=True)), [self.mine[0].pk])
+
+    def test_batch_size_limit(self):
+        with self.settings(MILESTONE_BATCH_LIMIT=2):
+            response = self.post('delete-batch', {'milestone_ids': [m.pk for m in self.mine]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.project.milestones.count(), 3)
+
+
+class SearchTests(TestCase):
+    """Full-text project search ranks, highlights and scopes its hits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = CustomUser.objects.create_user(
+            email='owner@example.com', password='x', first_name='Owner', last_name='Client'
+        )
+        cls.other = CustomUser.objects.create_user(
+            email='other@example.com', password='x', first_name='Other', last_name='Client'
+        )
+        cls.staff = CustomUser.objects.create_superuser(
+            email='admin@example.com', password='x', first_name='Ada', last_name='Admin'
+        )
+        cls.solar = Project.objects.create(client=cls.owner, name='Solar <b>panels</b>')
+        cls.bakery = Project.objects.create(client=cls.owner, name='Bakery')
+        BrandingPackage.objects.create(project=cls.bakery, brand_design_details='Logo with a solar motif, designing menus')
+        cls.hidden = Project.objects.create(client=cls.other, name='Solar farm')
+        # Non-matching documents, so bm25 gives the search terms weight
+        for n in range(10):
+            Project.objects.create(client=cls.other, name=f'Unrelated {n}')
+
+    def kinds_and_projects(self, hits):
+        return [(hit['kind'], hit['project']['id']) for hit in hits]
+
+    def test_title_match_ranks_first(self):
+        hits = search('solar', user=self.owner)
+
+        self.assertEqual(self.kinds_and_projects(hits), [
+            ('project', str(self.solar.pk)), ('branding', str(self.bakery.pk)),
+        ])
+        self.assertGreater(hits[0]['rank'], hits[1]['rank'])
+
+    def test_highlights_are_escaped(self):
+        hit = search('solar', user=self.owner)[0]
+
+        self.assertEqual(hit['title'], '<mark>Solar</mark> &lt;b&gt;panels&lt;/b&gt;')
+
+    def test_stemmed_and_prefix_terms(self):
+        stemmed = search('designed', user=self.owner)
+        prefix = search('bak', user=self.owner)
+
+        self.assertEqual(self.kinds_and_projects(stemmed), [('branding', str(self.bakery.pk))])
+        self.assertEqual(self.kinds_and_projects(prefix), [('project', str(self.bakery.pk))])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(len(search('solar logo', user=self.owner)), 1)
+        self.assertEqual(search('solar nothing', user=self.owner), [])
+
+    def test_scoped_to_own_projects(self):
+        self.assertNotIn(str(self.hidden.pk), [hit['project']['id'] for hit in search('solar', user=self.owner)])
+        self.assertEqual(len(search('solar', user=self.staff)), 3)
+
+    def test_kind_filter(self):
+        self.assertEqual(self.kinds_and_projects(search('solar', user=self.owner, kinds=['branding'])), [
+            ('branding', str(self.bakery.pk)),
+        ])
+
+    def test_operators_are_not_interpreted(self):
+        self.assertEqual(len(search('solar "motif" -', user=self.owner)), 1)
+        self.assertEqual(search('"* -', user=self.owner), [])
+
+    def test_index_follows_updates(self):
+        self.bakery.name = 'Patisserie'
+        self.bakery.save()
+
+        self.assertEqual(search('bakery', user=self.owner), [])
+        self.assertEqual(len(search('patisserie', user=self.owner)), 1)
+        self.bakery.delete()
+        self.assertEqual(search('patisserie', user=self.owner), [])
+
+    def test_fallback_without_full_text_index(self):
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            hits = search('solar', user=self.owner)
+
+        self.assertEqual(sorted(self.kinds_and_projects(hits)), sorted([
+            ('project', str(self.solar.pk)), ('branding', str(self.bakery.pk)),
+        ]))
+        self.assertEqual({hit['rank'] for hit in hits}, {0.0})
+
+    def test_view(self):
+        api = APIClient()
+        api.force_authenticate(self.owner)
+
+        response = api.get(reverse('projects:search'), {'q': 'solar', 'limit': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertEqual(response.json()['next_offset'], 1)
+        self.assertEqual(api.get(reverse('projects:search')).status_code, 400)
+        self.assertEqual(api.get(reverse('projects:search'), {'q': 'solar', 'kind': 'secret'}).status_code, 400)
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from back.async_api import async_reads
 from . import views
 
 # Set application namespace
@@ -14,6 +15,18 @@ router.register(r'page-designs', views.PageDesignViewSet, basename='page-design'
 
 # URL patterns
 urlpatterns = [
+    # ASGI-native reads; the other methods go to ProjectViewSet
+    path('projects/', async_reads(
+        views.AsyncProjectViewSet.as_view({'get': 'list'}, basename='project', detail=False),
+        views.ProjectViewSet.as_view({'post': 'create'}, basename='project', detail=False),
+    ), name='project-list'),
+    path('projects/<uuid:pk>/', async_reads(
+        views.AsyncProjectViewSet.as_view({'get': 'retrieve'}, basename='project', detail=True),
+        views.ProjectViewSet.as_view(
+            {'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}, basename='project', detail=True
+        ),
+    ), name='project-detail'),
+    
     # Include router URLs
     path('', include(router.urls)),
     
@@ -33,9 +46,10 @@ urlpatterns = [
     path('complete-milestone/', views.CompleteMilestoneView.as_view(), name='complete-milestone'),
     
     # Utility views
-    path('dashboard-data/', views.DashboardDataView.as_view(), name='dashboard-data'),
+    path('dashboard-data/', views.AsyncDashboardDataView.as_view(), name='dashboard-data'),
     path('project-statistics/', views.ProjectStatisticsView.as_view(), name='project-statistics'),
     path('project-statistics-by-client/', views.ProjectStatisticsByClientView.as_view(), name='project-statistics-by-client'),
     path('client-projects/', views.ClientProjectsView.as_view(), name='client-projects'),
+    path('search/', views.SearchView.as_view(), name='search'),
     path('send-milestone-notifications/', views.SendMilestoneNotificationsView.as_view(), name='send-milestone-notifications'),
 ]
\ No newline at end of file
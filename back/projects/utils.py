@@ -1,5 +1,7 @@
 from django.utils import timezone
 from django.db.models import Q, Count, Avg, Sum, F, ExpressionWrapper, fields
+from django.db.models.functions import ExtractMonth
+from django.forms.models import model_to_dict
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
@@ -10,12 +12,13 @@ import uuid
 import calendar
 import logging
 import json
+from collections import defaultdict
 from datetime import timedelta, datetime
 
 from .models import (
     Project, BrandingPackage, PageDesign, FrontEndPackage, BackEndPackage,
     DashboardPackage, MediaPackage, SalesPackage, Documentation,
-    ProjectApplication, ProjectMilestone
+    ProjectApplication, ProjectMilestone, PACKAGE_FLAGS
 )
 
 logger = logging.getLogger(__name__)
@@ -174,6 +177,176 @@ def generate_project_summary(project_id):
         return None
 
 
+def generate_project_timeline(project):
+    """
+    Generate the timeline of a project: its creation, each milestone (due or
+    completed) and its completion, in date order
+    
+    Returns a dictionary with the timeline's date range and events
+    """
+    events = [{
+        'date': project.created_date.strftime('%Y-%m-%d'),
+        'type': 'project_created',
+        'title': f"{project.name} created",
+    }]
+    
+    for milestone in project.milestones.all().order_by('due_date'):
+        event_date = milestone.completion_date if milestone.is_completed and milestone.completion_date else milestone.due_date
+        events.append({
+            'date': event_date.strftime('%Y-%m-%d'),
+            'type': 'milestone_completed' if milestone.is_completed else 'milestone_due',
+            'title': milestone.title,
+            'milestone_id': str(milestone.id),
+            'due_date': milestone.due_date.strftime('%Y-%m-%d'),
+            'is_completed': milestone.is_completed,
+            'is_overdue': milestone.is_overdue(),
+        })
+    
+    if project.finished_date:
+        events.append({
+            'date': project.finished_date.strftime('%Y-%m-%d'),
+            'type': 'project_finished',
+            'title': f"{project.name} finished",
+        })
+    
+    events.sort(key=lambda event: event['date'])
+    return {
+        'start_date': project.created_date.strftime('%Y-%m-%d'),
+        'end_date': project.get_estimated_completion_date().strftime('%Y-%m-%d'),
+        'status': project.status,
+        'progress': project.progress,
+        'events': events,
+    }
+
+
+def get_recorded_requirements(instance):
+    """
+    Get the fields of a package (or documentation) record that hold a
+    requirement: checked options and filled-in details
+    """
+    fields = model_to_dict(instance, exclude=['id', 'project'])
+    return {name: value for name, value in fields.items() if value not in (None, '', False)}
+
+
+def generate_project_requirements_document(project):
+    """
+    Generate a requirements document for a project from its packages, page
+    designs and milestones
+    
+    Returns a dictionary with the document sections
+    """
+    packages = [
+        {
+            'name': package['name'],
+            'requirements': get_recorded_requirements(package['details']) if package['has_record'] else {},
+        }
+        for package in project.get_packages_summary()
+    ]
+    
+    documentation = {}
+    if hasattr(project, 'documentation'):
+        documentation = get_recorded_requirements(project.documentation)
+    
+    return {
+        'project': {
+            'id': str(project.id),
+            'name': project.name,
+            'code': project.get_project_code(),
+            'client': project.client.get_full_name() or project.client.email,
+            'status': project.status,
+            'created': project.created_date.strftime('%Y-%m-%d'),
+        },
+        'packages': packages,
+        'documentation': documentation,
+        'page_designs': [
+            {
+                'page_name': page_design.page_name,
+                'page_sections': page_design.page_sections or "",
+            }
+            for page_design in project.page_designs.all()
+        ],
+        'milestones': [
+            {
+                'title': milestone.title,
+                'description': milestone.description or "",
+                'due_date': milestone.due_date.strftime('%Y-%m-%d'),
+                'is_completed': milestone.is_completed,
+            }
+            for milestone in project.milestones.all().order_by('due_date')
+        ],
+    }
+
+
+CSV_EXPORT_HEADER = [
+    'Project ID', 'Name', 'Client Name', 'Client Email', 'Status', 
+    'Progress', 'Created Date', 'Finished Date', 'Days Active',
+    'Project Code', 'Includes Branding', 'Includes Frontend', 
+    'Includes Backend', 'Includes Dashboard', 'Includes Media', 
+    'Includes Sales', 'Milestones Total', 'Milestones Completed', 
+    'Milestones Overdue', 'Page Designs Count', 'Applications Count'
+]
+
+
+class _LineBuffer:
+    """File-like object handing back what csv.writer writes"""
+    def write(self, value):
+        return value
+
+
+def iter_projects_csv(chunk_size=2000, using=None):
+    """
+    Generate the CSV export of all projects line by line
+    
+    Projects are read in chunks of chunk_size (with their related objects
+    prefetched per chunk), so memory use does not grow with the table.
+    `using` selects the database alias (default: routed).
+    """
+    projects = Project.objects.using(using).select_related(
+        'client', 
+    ).prefetch_related(
+        'milestones',
+        'page_designs',
+        'applications',
+    )
+    
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(CSV_EXPORT_HEADER)
+    
+    for project in projects.iterator(chunk_size=chunk_size):
+        # Get related counts
+        milestones = list(project.milestones.all())
+        milestones_total = len(milestones)
+        milestones_completed = sum(1 for m in milestones if m.is_completed)
+        milestones_overdue = sum(1 for m in milestones if m.is_overdue())
+        page_designs_count = len(project.page_designs.all())
+        applications_count = len(project.applications.all())
+        
+        # Format data
+        yield writer.writerow([
+            str(project.id),
+            project.name,
+            project.client.get_full_name(),
+            project.client.email,
+            project.status,
+            f"{project.progress}%",
+            project.created_date.strftime('%Y-%m-%d'),
+            project.finished_date.strftime('%Y-%m-%d') if project.finished_date else 'N/A',
+            project.days_since_created(),
+            project.get_project_code(),
+            'Yes' if project.includes_branding else 'No',
+            'Yes' if project.includes_frontend else 'No',
+            'Yes' if project.includes_backend else 'No',
+            'Yes' if project.includes_dashboard else 'No',
+            'Yes' if project.includes_media else 'No',
+            'Yes' if project.includes_sales else 'No',
+            milestones_total,
+            milestones_completed,
+            milestones_overdue,
+            page_designs_count,
+            applications_count,
+        ])
+
+
 def export_projects_to_csv():
     """
     Export all projects to CSV
@@ -181,67 +354,7 @@ def export_projects_to_csv():
     Returns a CSV string with project data
     """
     try:
-        # Get all projects with related data
-        projects = Project.objects.all().select_related(
-            'client', 
-        ).prefetch_related(
-            'milestones',
-            'page_designs',
-            'applications',
-        )
-        
-        # Create CSV file
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header row
-        header = [
-            'Project ID', 'Name', 'Client Name', 'Client Email', 'Status', 
-            'Progress', 'Created Date', 'Finished Date', 'Days Active',
-            'Project Code', 'Includes Branding', 'Includes Frontend', 
-            'Includes Backend', 'Includes Dashboard', 'Includes Media', 
-            'Includes Sales', 'Milestones Total', 'Milestones Completed', 
-            'Milestones Overdue', 'Page Designs Count', 'Applications Count'
-        ]
-        writer.writerow(header)
-        
-        # Write data rows
-        for project in projects:
-            # Get related counts
-            milestones = list(project.milestones.all())
-            milestones_total = len(milestones)
-            milestones_completed = sum(1 for m in milestones if m.is_completed)
-            milestones_overdue = sum(1 for m in milestones if m.is_overdue())
-            page_designs_count = project.page_designs.count()
-            applications_count = project.applications.count()
-            
-            # Format data
-            row = [
-                str(project.id),
-                project.name,
-                project.client.get_full_name(),
-                project.client.email,
-                project.status,
-                f"{project.progress}%",
-                project.created_date.strftime('%Y-%m-%d'),
-                project.finished_date.strftime('%Y-%m-%d') if project.finished_date else 'N/A',
-                project.days_since_created(),
-                project.get_project_code(),
-                'Yes' if project.includes_branding else 'No',
-                'Yes' if project.includes_frontend else 'No',
-                'Yes' if project.includes_backend else 'No',
-                'Yes' if project.includes_dashboard else 'No',
-                'Yes' if project.includes_media else 'No',
-                'Yes' if project.includes_sales else 'No',
-                milestones_total,
-                milestones_completed,
-                milestones_overdue,
-                page_designs_count,
-                applications_count,
-            ]
-            writer.writerow(row)
-        
-        return output.getvalue()
+        return ''.join(iter_projects_csv())
     
     except Exception as e:
         logger.error(f"Error exporting projects to CSV: {str(e)}")
@@ -273,35 +386,30 @@ def get_project_statistics_by_client(client_id=None):
         if client_id:
             clients_query = clients_query.filter(id=client_id)
         
+        # Every client listed has projects, so the per-client figures come from
+        # two grouped queries over the same projects rather than a few per client
+        projects = Project.objects.all()
+        if client_id:
+            projects = projects.filter(client_id=client_id)
+        
+        # Completion times of each client's completed projects
+        completion_days = defaultdict(list)
+        completed = projects.filter(
+            status='completed',
+            created_date__isnull=False,
+            finished_date__isnull=False
+        ).values_list('client_id', 'created_date', 'finished_date')
+        for project_client_id, created_date, finished_date in completed:
+            completion_days[project_client_id].append((finished_date - created_date).days)
+        
+        # Package distribution of each client's projects
+        package_distributions = projects.package_histograms('client_id')
+        
         # Get statistics for each client
         client_stats = []
         for client in clients_query:
-            # Get average completion time for this client's completed projects
-            completed_projects = Project.objects.filter(
-                client=client,
-                status='completed',
-                created_date__isnull=False,
-                finished_date__isnull=False
-            )
-            
-            avg_completion_days = 0
-            if completed_projects.exists():
-                completion_days = [
-                    (p.finished_date - p.created_date).days
-                    for p in completed_projects
-                ]
-                avg_completion_days = sum(completion_days) / len(completion_days)
-            
-            # Get package distribution for this client
-            projects = Project.objects.filter(client=client)
-            package_distribution = {
-                'branding': projects.filter(includes_branding=True).count(),
-                'frontend': projects.filter(includes_frontend=True).count(),
-                'backend': projects.filter(includes_backend=True).count(),
-                'dashboard': projects.filter(includes_dashboard=True).count(),
-                'media': projects.filter(includes_media=True).count(),
-                'sales': projects.filter(includes_sales=True).count(),
-            }
+            days = completion_days.get(client.id)
+            avg_completion_days = sum(days) / len(days) if days else 0
             
             # Add client statistics to the list
             client_stats.append({
@@ -316,7 +424,9 @@ def get_project_statistics_by_client(client_id=None):
                     'terminated': client.terminated_projects,
                 },
                 'avg_completion_days': round(avg_completion_days, 1),
-                'package_distribution': package_distribution,
+                'package_distribution': package_distributions.get(
+                    client.id, {name: 0 for name in PACKAGE_FLAGS}
+                ),
             })
         
         return client_stats
@@ -328,107 +438,49 @@ def get_project_statistics_by_client(client_id=None):
 
 def send_milestone_notifications():
     """
-    Send email notifications for upcoming and overdue milestones
+    Send digest notifications for upcoming and overdue milestones
     
-    This function should be run daily by a scheduled task
+    Runs on a schedule via the run_milestone_scheduler management command and can
+    be triggered manually; already-sent notifications are skipped.
     
-    Returns the number of notifications sent
+    Returns the number of digest emails sent
     """
-    if not hasattr(settings, 'PROJECT_NOTIFICATION_EMAIL'):
-        logger.warning("PROJECT_NOTIFICATION_EMAIL not set in settings")
-        return 0
+    from .notifications import run_milestone_notifications
     
     try:
-        notifications_sent = 0
-        
-        # Get overdue milestones
-        overdue_milestones = ProjectMilestone.objects.filter(
-            is_completed=False,
-            due_date__lt=timezone.now()
-        ).select_related('project', 'project__client')
-        
-        # Get milestones due soon (in the next 2 days)
-        due_soon_milestones = ProjectMilestone.objects.filter(
-            is_completed=False,
-            due_date__gte=timezone.now(),
-            due_date__lte=timezone.now() + timedelta(days=2)
-        ).select_related('project', 'project__client')
-        
-        # Send notifications for overdue milestones
-        if overdue_milestones.exists():
-            overdue_data = []
-            for milestone in overdue_milestones:
-                days_overdue = (timezone.now().date() - milestone.due_date.date()).days
-                overdue_data.append({
-                    'project': milestone.project.name,
-                    'milestone': milestone.title,
-                    'due_date': milestone.due_date.strftime('%Y-%m-%d'),
-                    'days_overdue': days_overdue,
-                    'client': milestone.project.client.get_full_name(),
-                    'client_email': milestone.project.client.email,
-                })
-            
-            # Render email template
-            context = {
-                'overdue_milestones': overdue_data,
-                'count': len(overdue_data),
-            }
-            html_message = render_to_string('projects/email/overdue_milestones_notification.html', context)
-            plain_message = strip_tags(html_message)
-            
-            # Send email
-            send_mail(
-                subject=f"{len(overdue_data)} Overdue Project Milestones",
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[settings.PROJECT_NOTIFICATION_EMAIL],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            
-            notifications_sent += 1
-        
-        # Send notifications for milestones due soon
-        if due_soon_milestones.exists():
-            due_soon_data = []
-            for milestone in due_soon_milestones:
-                days_until = (milestone.due_date.date() - timezone.now().date()).days
-                due_soon_data.append({
-                    'project': milestone.project.name,
-                    'milestone': milestone.title,
-                    'due_date': milestone.due_date.strftime('%Y-%m-%d'),
-                    'days_until': days_until,
-                    'client': milestone.project.client.get_full_name(),
-                    'client_email': milestone.project.client.email,
-                })
-            
-            # Render email template
-            context = {
-                'due_soon_milestones': due_soon_data,
-                'count': len(due_soon_data),
-            }
-            html_message = render_to_string('projects/email/upcoming_milestones_notification.html', context)
-            plain_message = strip_tags(html_message)
-            
-            # Send email
-            send_mail(
-                subject=f"{len(due_soon_data)} Upcoming Project Milestones",
-                message=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[settings.PROJECT_NOTIFICATION_EMAIL],
-                html_message=html_message,
-                fail_silently=False,
-            )
-            
-            notifications_sent += 1
-        
-        return notifications_sent
+        return run_milestone_notifications()['sent']
     
     except Exception as e:
         logger.error(f"Error sending milestone notifications: {str(e)}")
         return 0
 
 
+def get_monthly_projects_data(year):
+    """
+    Count the projects created and finished in each month of a year
+    
+    Returns a list of twelve dictionaries, January first
+    """
+    created = dict(
+        Project.objects.filter(created_date__year=year).order_by()
+        .annotate(month=ExtractMonth('created_date')).values('month')
+        .annotate(total=Count('pk')).values_list('month', 'total')
+    )
+    finished = dict(
+        Project.objects.filter(finished_date__year=year).order_by()
+        .annotate(month=ExtractMonth('finished_date')).values('month')
+        .annotate(total=Count('pk')).values_list('month', 'total')
+    )
+    return [
+        {
+            'month': calendar.month_abbr[month],
+            'created': created.get(month, 0),
+            'finished': finished.get(month, 0),
+        }
+        for month in range(1, 13)
+    ]
+
+
 def get_dashboard_data():
     """
     Get data for the admin dashboard
@@ -461,14 +513,7 @@ def get_dashboard_data():
         )
         
         # Get package statistics
-        package_stats = {
-            'branding': Project.objects.filter(includes_branding=True).count(),
-            'frontend': Project.objects.filter(includes_frontend=True).count(),
-            'backend': Project.objects.filter(includes_backend=True).count(),
-            'dashboard': Project.objects.filter(includes_dashboard=True).count(),
-            'media': Project.objects.filter(includes_media=True).count(),
-            'sales': Project.objects.filter(includes_sales=True).count(),
-        }
+        package_stats = Project.objects.package_histogram()
         
         # Get monthly project data for current year
         monthly_data = get_monthly_projects_data(timezone.now().year)
@@ -1,14 +1,21 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Q, Count
+from datetime import date, datetime, time, timedelta
+from django.db.models import Q, Count, Max, Prefetch
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets, generics, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 
 from accounts.models import CustomUser
+from back.async_api import AsyncViewMixin
+from back.compression import cached_json_response, acached_json_response
+from back.db_routing import ReplicaReadsMixin, get_read_database
 from .models import (
     Project, BrandingPackage, PageDesign, FrontEndPackage, BackEndPackage,
     DashboardPackage, MediaPackage, SalesPackage, Documentation,
@@ -21,12 +28,20 @@ from .serializers import (
     PageDesignSerializer, BrandingPackageSerializer, FrontEndPackageSerializer,
     BackEndPackageSerializer, DashboardPackageSerializer, MediaPackageSerializer,
     SalesPackageSerializer, DocumentationSerializer, ProjectTimelineSerializer,
-    CompleteProjectPackageSerializer, CompleteMilestoneSerializer,
+    CompleteProjectPackageSerializer, CompleteMilestoneSerializer, MilestoneBatchSerializer,
+    RescheduleMilestonesSerializer, CreateMilestonesSerializer,
     ProjectStatisticsSerializer, ProjectRequirementsDocumentSerializer,
-    ProjectApplicationCreateSerializer, ClientProjectsSerializer
+    ProjectApplicationCreateSerializer, ClientProjectsSerializer, parse_fieldset
+)
+from .search import search, SEARCH_SOURCES
+from .milestones import complete_milestones, create_milestones, reschedule_milestones, delete_milestones
+from .conditional import ConditionalProjectMixin, make_etag
+from .fast_serializers import (
+    CompiledListMixin, CompiledProjectListSerializer,
+    CompiledProjectMilestoneListSerializer, CompiledProjectApplicationListSerializer
 )
 from .utils import (
-    generate_project_summary, export_projects_to_csv,
+    generate_project_summary, iter_projects_csv,
     get_project_statistics_by_client, send_milestone_notifications,
     get_dashboard_data
 )
@@ -56,21 +71,137 @@ class IsOwnerOrAdmin(IsAuthenticated):
 
 
 # Project Views
-class ProjectViewSet(viewsets.ModelViewSet):
+def visible_projects(user):
+    """Get the projects a user may see: all for admins, their own otherwise"""
+    queryset = Project.objects.all()
+    if not (user.is_staff or user.is_superuser):
+        queryset = queryset.filter(client=user)
+    return queryset
+
+
+class ProjectViewSet(ReplicaReadsMixin, CompiledListMixin, ConditionalProjectMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing Project instances"""
     permission_classes = [IsAuthenticated]
+    replica_actions = ('list',)
+    compiled_list_serializer = CompiledProjectListSerializer
+    
+    # Relations of ProjectDetailSerializer that cost queries:
+    # field name -> (select_related paths, prefetch_related lookups)
+    detail_relations = {
+        'client': (['client__profile__role'], []),
+        'milestones': ([], ['milestones']),
+        'page_designs': ([], ['page_designs']),
+        'applications': ([], [Prefetch(
+            'applications', queryset=ProjectApplication.objects.select_related('applicant__profile__role')
+        )]),
+        'branding_package': (['branding_package'], []),
+        'frontend_package': (['frontend_package'], []),
+        'backend_package': (['backend_package'], []),
+        'dashboard_package': (['dashboard_package'], []),
+        'media_package': (['media_package'], []),
+        'sales_package': (['sales_package'], []),
+        'documentation': (['documentation'], []),
+        # Computed from milestone queries
+        'completion_estimated': ([], []),
+        'has_overdue_milestones': ([], []),
+    }
     
     def get_queryset(self):
-        # Filter projects for regular users, show all for admins
-        user = self.request.user
-        if user.is_staff or user.is_superuser:
-            return Project.objects.all().select_related('client').prefetch_related(
+        queryset = visible_projects(self.request.user)
+        if self.action == 'retrieve':
+            queryset = self.load_detail_relations(queryset)
+        else:
+            queryset = queryset.select_related('client').prefetch_related(
                 'milestones', 'page_designs', 'applications'
             )
-        # Regular users only see their own projects
-        return Project.objects.filter(client=user).select_related('client').prefetch_related(
-            'milestones', 'page_designs', 'applications'
-        )
+        # ?packages= narrows the listing only; detail and batch lookups ignore it
+        if self.action == 'list':
+            queryset = self.filter_by_packages(queryset)
+        return queryset
+    
+    def get_fieldset(self):
+        """
+        Resolve ?fields= and ?expand= for the detail serializer
+        
+        ?fields=id,status,client.email selects fields (dotted paths reach into
+        nested serializers); ?expand=milestones,client adds relations, to the
+        selected fields or, without ?fields=, to the non-relation fields.
+        Returns None (every field) when neither parameter is given.
+        """
+        if hasattr(self, '_fieldset'):
+            return self._fieldset
+        
+        params = self.request.query_params
+        self._fieldset = None
+        if 'fields' not in params and 'expand' not in params:
+            return None
+        
+        all_fields = ProjectDetailSerializer.Meta.fields
+        if 'fields' in params:
+            fieldset = parse_fieldset(params['fields'])
+        else:
+            fieldset = {name: None for name in all_fields if name not in self.detail_relations}
+        
+        expand = [name.strip() for name in params.get('expand', '').split(',') if name.strip()]
+        unknown = set(expand) - set(self.detail_relations)
+        if unknown:
+            raise ValidationError({
+                "expand": f"Unknown relation(s): {', '.join(sorted(unknown))}. Valid: {', '.join(self.detail_relations)}"
+            })
+        for name in expand:
+            fieldset.setdefault(name, None)
+        
+        unknown = set(fieldset) - set(all_fields)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        
+        self._fieldset = fieldset
+        return fieldset
+    
+    def load_detail_relations(self, queryset):
+        """
+        Join or prefetch only the relations the requested fieldset uses
+        """
+        fieldset = self.get_fieldset()
+        names = self.detail_relations if fieldset is None else [
+            name for name in fieldset if name in self.detail_relations
+        ]
+        
+        select_related, prefetch_related = [], []
+        for name in names:
+            paths, lookups = self.detail_relations[name]
+            select_related.extend(paths)
+            prefetch_related.extend(lookups)
+        
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'retrieve':
+            context['fieldset'] = self.get_fieldset()
+        return context
+    
+    def filter_by_packages(self, queryset):
+        """
+        Apply ?packages=frontend,backend&exclude_packages=sales as a single
+        predicate on the package bitmask
+        """
+        include = self.request.query_params.get('packages')
+        exclude = self.request.query_params.get('exclude_packages')
+        if not include and not exclude:
+            return queryset
+        
+        try:
+            return queryset.with_packages(
+                include=[name.strip() for name in (include or '').split(',') if name.strip()],
+                exclude=[name.strip() for name in (exclude or '').split(',') if name.strip()],
+            )
+        except ValueError as e:
+            raise ValidationError({"packages": str(e)})
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -79,13 +210,27 @@ class ProjectViewSet(viewsets.ModelViewSet):
             return ProjectCreateUpdateSerializer
         return ProjectDetailSerializer
     
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+    
+    def update(self, request, *args, **kwargs):
+        # Also serves partial_update; honours If-Match
+        return self.conditional_response(super().update, request, *args, **kwargs)
+    
     @action(detail=True, methods=['get'])
     def summary(self, request, pk=None):
         """Get comprehensive project summary"""
+        return self.conditional_response(self.summary_response, request, pk=pk)
+    
+    def summary_response(self, request, pk=None):
         project = self.get_object()
-        summary = generate_project_summary(project.id)
-        if summary:
-            return Response(summary)
+        # Keyed by the version stamp, so any change to the project starts a new entry
+        stamp = make_etag(project.pk, project.updated_date, project.revision).strip('"')
+        response = cached_json_response(
+            f'project-summary:{stamp}', lambda: generate_project_summary(project.id)
+        )
+        if response is not None:
+            return response
         return Response(
             {"detail": "Could not generate project summary"},
             status=status.HTTP_404_NOT_FOUND
@@ -94,6 +239,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def timeline(self, request, pk=None):
         """Get project timeline for visualization"""
+        return self.conditional_response(self.timeline_response, request, pk=pk)
+    
+    def timeline_response(self, request, pk=None):
         project = self.get_object()
         serializer = ProjectTimelineSerializer(project)
         return Response(serializer.data)
@@ -114,22 +262,43 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        csv_data = export_projects_to_csv()
-        if csv_data:
-            response = HttpResponse(csv_data, content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="projects_export.csv"'
-            return response
+        # Streamed so large exports are never held in memory (compressed on the
+        # fly); rows are read after the view returns, so the database is explicit
+        response = StreamingHttpResponse(
+            iter_projects_csv(using=get_read_database(request)), content_type='text/csv'
+        )
+        response['Content-Disposition'] = 'attachment; filename="projects_export.csv"'
+        return response
+
+
+class AsyncProjectViewSet(AsyncViewMixin, ProjectViewSet):
+    """
+    ASGI-native project list and detail reads (see back.async_api); routed
+    for GET and HEAD only, ProjectViewSet serves the other methods
+    """
+    
+    async def list(self, request, *args, **kwargs):
+        rows = self.compiled_list_serializer.get_rows(self.filter_queryset(self.get_queryset()))
         
-        return Response(
-            {"detail": "Could not generate CSV export"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        page = await self.apaginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.compiled_list_serializer(page).data)
+        return Response(self.compiled_list_serializer([row async for row in rows]).data)
+    
+    async def retrieve(self, request, *args, **kwargs):
+        # 304s are answered from the stamp query alone; full payloads are
+        # serialized in a worker thread (the detail serializer queries milestones)
+        return await self.aconditional_response(
+            sync_to_async(super(ProjectViewSet, self).retrieve), request, *args, **kwargs
         )
 
 
 # Project Milestone Views
-class ProjectMilestoneViewSet(viewsets.ModelViewSet):
+class ProjectMilestoneViewSet(ReplicaReadsMixin, CompiledListMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing ProjectMilestone instances"""
     permission_classes = [IsAuthenticated]
+    replica_actions = ('list',)
+    compiled_list_serializer = CompiledProjectMilestoneListSerializer
     
     def get_queryset(self):
         # Filter milestones for regular users, show all for admins
@@ -152,6 +321,91 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(milestone)
         return Response(serializer.data)
     
+    # Batch operations: many milestones, across projects, in one request and
+    # one transaction (see projects.milestones). All or nothing: an unknown or
+    # not visible milestone or project fails the whole request.
+    
+    def get_batch_milestones(self, ids):
+        """
+        Get the milestones with the given ids as a queryset, checking they are all visible
+        """
+        found = set(self.get_queryset().filter(pk__in=ids).values_list('pk', flat=True))
+        missing = [pk for pk in ids if pk not in found]
+        if missing:
+            raise ValidationError({"milestone_ids": [f"Milestone(s) not found: {', '.join(map(str, missing))}"]})
+        return ProjectMilestone.objects.filter(pk__in=ids)
+    
+    def get_projects_progress(self, project_ids):
+        return [
+            {"id": str(project_id), "progress": progress}
+            for project_id, progress in Project.objects.filter(pk__in=project_ids).values_list('pk', 'progress')
+        ]
+    
+    @action(detail=False, methods=['post'], url_path='create-batch')
+    def create_batch(self, request):
+        """Create many milestones across projects"""
+        serializer = CreateMilestonesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['milestones']
+        
+        project_ids = {item['project'] for item in items}
+        found = set(visible_projects(request.user).filter(pk__in=project_ids).values_list('pk', flat=True))
+        if project_ids - found:
+            raise ValidationError({
+                "milestones": [f"Project(s) not found: {', '.join(sorted(map(str, project_ids - found)))}"]
+            })
+        
+        created = create_milestones([
+            ProjectMilestone(
+                project_id=item['project'], title=item['title'],
+                description=item.get('description'), due_date=item['due_date']
+            )
+            for item in items
+        ])
+        return Response({
+            "created": [milestone.pk for milestone in created],
+            "projects": self.get_projects_progress(project_ids),
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], url_path='complete-batch')
+    def complete_batch(self, request):
+        """Mark many milestones as completed"""
+        serializer = MilestoneBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['milestone_ids']
+        
+        completed = complete_milestones(self.get_batch_milestones(ids))
+        completed_ids = {pk for pk, _ in completed}
+        return Response({
+            "completed": [pk for pk, _ in completed],
+            "already_completed": [pk for pk in ids if pk not in completed_ids],
+            "projects": self.get_projects_progress({project_id for _, project_id in completed}),
+        })
+    
+    @action(detail=False, methods=['post'], url_path='reschedule-batch')
+    def reschedule_batch(self, request):
+        """Shift the due dates of many milestones by a number of days"""
+        serializer = RescheduleMilestonesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        rescheduled = reschedule_milestones(
+            self.get_batch_milestones(serializer.validated_data['milestone_ids']),
+            serializer.validated_data['days']
+        )
+        return Response({"rescheduled": [pk for pk, _ in rescheduled]})
+    
+    @action(detail=False, methods=['post'], url_path='delete-batch')
+    def delete_batch(self, request):
+        """Delete many milestones"""
+        serializer = MilestoneBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        deleted = delete_milestones(self.get_batch_milestones(serializer.validated_data['milestone_ids']))
+        return Response({
+            "deleted": [pk for pk, _ in deleted],
+            "projects": self.get_projects_progress({project_id for _, project_id in deleted}),
+        })
+    
     @action(detail=True, methods=['post'])
     def create_next(self, request, pk=None):
         """Create a new milestone after this one"""
@@ -178,9 +432,11 @@ class ProjectMilestoneViewSet(viewsets.ModelViewSet):
 
 
 # Project Application Views
-class ProjectApplicationViewSet(viewsets.ModelViewSet):
+class ProjectApplicationViewSet(ReplicaReadsMixin, CompiledListMixin, viewsets.ModelViewSet):
     """ViewSet for viewing and editing ProjectApplication instances"""
     permission_classes = [IsAuthenticated]
+    replica_actions = ('list',)
+    compiled_list_serializer = CompiledProjectApplicationListSerializer
     
     def get_queryset(self):
         user = self.request.user
@@ -203,9 +459,19 @@ class ProjectApplicationViewSet(viewsets.ModelViewSet):
 
 
 # Package View Base Class
-class PackageBaseView(generics.RetrieveUpdateAPIView):
+class PackageBaseView(ConditionalProjectMixin, generics.RetrieveUpdateAPIView):
     """Base view for retrieving and updating package instances"""
     permission_classes = [IsAuthenticated]
+    # Packages are addressed by their project's id (one package of each kind per project)
+    lookup_field = 'project'
+    lookup_url_kwarg = 'pk'
+    etag_project_path = 'project'
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+    
+    def update(self, request, *args, **kwargs):
+        return self.conditional_response(super().update, request, *args, **kwargs)
     
     def get_queryset(self):
         user = self.request.user
@@ -293,16 +559,26 @@ class CompleteMilestoneView(APIView):
 
 
 # Utility Views
-class DashboardDataView(APIView):
+class DashboardDataView(ReplicaReadsMixin, APIView):
     """View for retrieving dashboard data"""
     permission_classes = [IsAuthenticated, IsAdminUser]
     
     def get(self, request):
-        dashboard_data = get_dashboard_data()
-        return Response(dashboard_data)
+        # Served with its precompressed variants; refreshed every PRECOMPRESSED_CACHE_TIMEOUT
+        response = cached_json_response('dashboard-data', get_dashboard_data)
+        return response or Response({})
+
+
+class AsyncDashboardDataView(AsyncViewMixin, DashboardDataView):
+    """ASGI-native DashboardDataView (see back.async_api)"""
+    
+    async def get(self, request):
+        # Built in a worker thread on a miss
+        response = await acached_json_response('dashboard-data', sync_to_async(get_dashboard_data))
+        return response or Response({})
 
 
-class ProjectStatisticsView(APIView):
+class ProjectStatisticsView(ReplicaReadsMixin, APIView):
     """View for retrieving project statistics"""
     permission_classes = [IsAuthenticated]
     
@@ -336,7 +612,7 @@ class ProjectStatisticsView(APIView):
         return Response(serializer.data)
 
 
-class ProjectStatisticsByClientView(APIView):
+class ProjectStatisticsByClientView(ReplicaReadsMixin, APIView):
     """View for retrieving project statistics grouped by client"""
     permission_classes = [IsAuthenticated, IsAdminUser]
     
@@ -346,15 +622,71 @@ class ProjectStatisticsByClientView(APIView):
         return Response(statistics)
 
 
-class ClientProjectsView(generics.ListAPIView):
+class ClientProjectsView(ReplicaReadsMixin, generics.ListAPIView):
     """View for listing clients with their projects"""
     serializer_class = ClientProjectsSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
+    ordering_fields = [
+        'projects_count', 'active_projects', 'completed_projects',
+        'pending_projects', 'last_project_date', 'email'
+    ]
     
     def get_queryset(self):
-        return CustomUser.objects.annotate(
-            projects_count=Count('projects')
+        # All per-client counts come from one grouped query
+        queryset = CustomUser.objects.annotate(
+            projects_count=Count('projects'),
+            active_projects=Count('projects', filter=Q(projects__status='in_progress')),
+            completed_projects=Count('projects', filter=Q(projects__status='completed')),
+            pending_projects=Count('projects', filter=Q(projects__status='pending')),
+            last_project_date=Max('projects__created_date'),
         ).filter(projects_count__gt=0)
+        return self.sort(self.filter_by_annotations(queryset))
+    
+    def filter_by_annotations(self, queryset):
+        """
+        Apply ?min_active=&max_active=&last_project_after=&last_project_before=
+        (dates as YYYY-MM-DD, both bounds inclusive)
+        """
+        params = self.request.query_params
+        
+        for param, lookup in (('min_active', 'active_projects__gte'), ('max_active', 'active_projects__lte')):
+            if params.get(param):
+                try:
+                    queryset = queryset.filter(**{lookup: int(params[param])})
+                except ValueError:
+                    raise ValidationError({param: "Must be an integer."})
+        
+        for param, lookup, offset in (
+            ('last_project_after', 'last_project_date__gte', 0),
+            ('last_project_before', 'last_project_date__lt', 1),
+        ):
+            if params.get(param):
+                try:
+                    day = parse_date(params[param]) if len(params[param]) == 10 else None
+                except ValueError:
+                    # Well formed but impossible, e.g. 2025-02-30
+                    day = None
+                if day is None:
+                    raise ValidationError({param: "Must be a date in YYYY-MM-DD format."})
+                if offset and day == date.max:
+                    # No day after the last one to bound by; every date is before it
+                    continue
+                bound = timezone.make_aware(datetime.combine(day + timedelta(days=offset), time.min))
+                queryset = queryset.filter(**{lookup: bound})
+        
+        return queryset
+    
+    def sort(self, queryset):
+        """
+        Apply ?ordering=<field> or ?ordering=-<field> (default: most recent project first)
+        """
+        ordering = self.request.query_params.get('ordering', '-last_project_date')
+        if ordering.lstrip('-') not in self.ordering_fields:
+            raise ValidationError({
+                "ordering": f"Must be one of: {', '.join(self.ordering_fields)} (prefix with - for descending)."
+            })
+        # Tie-break on id so pages are stable
+        return queryset.order_by(ordering, 'id')
 
 
 class SendMilestoneNotificationsView(APIView):
@@ -366,4 +698,38 @@ class SendMilestoneNotificationsView(APIView):
         return Response({
             "notifications_sent": notifications_sent,
             "message": f"Sent {notifications_sent} notification emails"
-        })
\ No newline at end of file
+        })
+
+
+class SearchView(APIView):
+    """Full-text search across projects, packages, page designs and applications"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """
+        Search with ?q=<text>, optionally ?kind=branding,page_design&limit=&offset=
+        
+        Staff search every project; other users only their own.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({"q": "This parameter is required."})
+        
+        kinds = [kind.strip() for kind in request.query_params.get('kind', '').split(',') if kind.strip()]
+        unknown = set(kinds) - set(SEARCH_SOURCES)
+        if unknown:
+            raise ValidationError({
+                "kind": f"Unknown kind(s): {', '.join(sorted(unknown))}. Valid: {', '.join(SEARCH_SOURCES)}"
+            })
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            raise ValidationError({"detail": "limit and offset must be integers."})
+        
+        hits = search(query, user=request.user, kinds=kinds, limit=limit + 1, offset=offset)
+        return Response({
+            "results": hits[:limit],
+            "next_offset": offset + limit if len(hits) > limit else None,
+        })